@@ -0,0 +1,211 @@
+""" Batch evaluation for the calculator model,
+     applies add/subtract/multiply/divide to whole columns of operands
+       at once and streams the results back chunk by chunk."""
+
+import csv
+import sys
+import math
+import time
+import random
+import argparse
+import operator
+from itertools import islice
+
+from functions import add, subtract, multiply, divide
+
+try:
+    import numpy as np
+except ImportError:  # The pure-Python path below covers everything.
+    np = None
+
+OPERATIONS = {'+': add, '-': subtract, '*': multiply, '/': divide}
+DIVISION_ERROR = divide(1, 0)
+INVALID_OPERATION = "Error: Invalid operation."
+INVALID_NUMBER = "Error: {!r} is not a number."
+
+
+# Scalar kernels for the fallback path. Zero divisors are caught before
+# the call so a batch never raises; the row gets NaN and an error entry.
+_KERNELS = {'+': operator.add, '-': operator.sub,
+            '*': operator.mul, '/': operator.truediv}
+
+
+def _evaluate_python(a, ops, b):
+    # Ledger files usually apply one operator to a whole column; then the
+    # kernel can be mapped over the operands without a Python-level loop.
+    kinds = set(ops)
+    if len(kinds) == 1:
+        op = kinds.pop()
+        kernel = _KERNELS.get(op)
+        if kernel is not None and (op != '/' or 0 not in b):
+            return list(map(kernel, a, b)), []
+
+    values = []
+    errors = []
+    append = values.append
+    for index, (x, op, y) in enumerate(zip(a, ops, b)):
+        kernel = _KERNELS.get(op)
+        if kernel is None:
+            append(math.nan)
+            errors.append((index, INVALID_OPERATION))
+        elif op == '/' and y == 0:
+            append(math.nan)
+            errors.append((index, DIVISION_ERROR))
+        else:
+            append(kernel(x, y))
+    return values, errors
+
+
+def _evaluate_numpy(a, ops, b):
+    a = np.asarray(a, dtype=np.float64)
+    b = np.asarray(b, dtype=np.float64)
+    ops = np.asarray(ops)
+    values = np.full(a.shape, np.nan)
+    known = np.zeros(a.shape, dtype=bool)
+    for symbol, ufunc in (('+', np.add), ('-', np.subtract),
+                          ('*', np.multiply)):
+        mask = ops == symbol
+        ufunc(a, b, out=values, where=mask)
+        known |= mask
+    divide_mask = ops == '/'
+    zero_mask = divide_mask & (b == 0)
+    np.divide(a, b, out=values, where=divide_mask & ~zero_mask)
+    known |= divide_mask
+
+    errors = [(int(index), DIVISION_ERROR)
+              for index in np.flatnonzero(zero_mask)]
+    errors += [(int(index), INVALID_OPERATION)
+               for index in np.flatnonzero(~known)]
+    errors.sort()
+    return values, errors
+
+
+def evaluate_batch(a, ops, b, use_numpy: bool = True):
+    """Evaluate a[i] ops[i] b[i] for every i.
+
+    Returns (values, errors): values holds one float per row (NaN where
+    the row failed) and errors lists (index, message) for the failed rows,
+    so a division by zero costs one entry instead of an exception.
+    """
+    if use_numpy and np is not None:
+        return _evaluate_numpy(a, ops, b)
+    return _evaluate_python(a, ops, b)
+
+
+def evaluate_stream(rows, chunk_size: int = 65_536, use_numpy: bool = True):
+    """Evaluate an iterable of (a, op, b) rows, one chunk at a time.
+
+    Yields (offset, values, errors) per chunk; error indexes are relative
+    to the whole stream, not to the chunk.
+    """
+    rows = iter(rows)
+    offset = 0
+    while True:
+        chunk = list(islice(rows, chunk_size))
+        if not chunk:
+            return
+        a, ops, b = zip(*chunk)
+        values, errors = evaluate_batch(a, ops, b, use_numpy)
+        yield offset, values, [(offset + index, message)
+                               for index, message in errors]
+        offset += len(chunk)
+
+
+def _parse_operands(cells):
+    # One bad cell must not abort the file: it becomes NaN plus an error.
+    values = []
+    errors = {}
+    for index, cell in enumerate(cells):
+        try:
+            values.append(float(cell))
+        except (TypeError, ValueError):
+            values.append(math.nan)
+            errors[index] = INVALID_NUMBER.format(cell)
+    return values, errors
+
+
+def evaluate_csv(input_path: str, output_path: str, a_column: str = 'a',
+                 op_column: str = 'op', b_column: str = 'b',
+                 chunk_size: int = 65_536) -> int:
+    """Read operand/operator columns from a CSV and write a result column.
+
+    Rows that fail keep their input and carry the error message instead
+    of a result. Returns the number of rows written.
+    """
+    with open(input_path, newline='', encoding='utf-8') as source, \
+            open(output_path, 'w', newline='', encoding='utf-8') as sink:
+        reader = csv.DictReader(source)
+        fieldnames = list(reader.fieldnames or []) + ['result', 'error']
+        writer = csv.DictWriter(sink, fieldnames=fieldnames)
+        writer.writeheader()
+        written = 0
+        while True:
+            chunk = list(islice(reader, chunk_size))
+            if not chunk:
+                return written
+            a, bad_a = _parse_operands(row[a_column] for row in chunk)
+            b, bad_b = _parse_operands(row[b_column] for row in chunk)
+            ops = [(row[op_column] or '').strip() for row in chunk]
+            values, errors = evaluate_batch(a, ops, b)
+            failed = dict(errors)
+            failed.update(bad_b)
+            failed.update(bad_a)
+            for index, (row, value) in enumerate(zip(chunk, values)):
+                row['error'] = failed.get(index, '')
+                row['result'] = '' if index in failed else value
+            writer.writerows(chunk)
+            written += len(chunk)
+
+
+def benchmark(rows: int = 1_000_000) -> dict:
+    """Operations per second: scalar functions vs. each batch path."""
+    a = [random.uniform(-1000, 1000) for _ in range(rows)]
+    b = [random.choice((0.0, random.uniform(-1000, 1000)))
+         for _ in range(rows)]
+    ops = [random.choice('+-*/') for _ in range(rows)]
+    results = {}
+
+    start = time.perf_counter()
+    for x, op, y in zip(a, ops, b):
+        OPERATIONS[op](x, y)
+    results['scalar'] = rows / (time.perf_counter() - start)
+
+    start = time.perf_counter()
+    evaluate_batch(a, ops, b, use_numpy=False)
+    results['python_batch'] = rows / (time.perf_counter() - start)
+
+    same_ops = ['+'] * rows
+    start = time.perf_counter()
+    evaluate_batch(a, same_ops, b, use_numpy=False)
+    results['python_batch_one_operator'] = (
+        rows / (time.perf_counter() - start))
+
+    if np is not None:
+        a_array, b_array = np.array(a), np.array(b)
+        ops_array = np.array(ops)
+        start = time.perf_counter()
+        evaluate_batch(a_array, ops_array, b_array)
+        results['numpy_batch'] = rows / (time.perf_counter() - start)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Batch calculator.")
+    parser.add_argument("input", nargs="?", help="CSV with a, op, b columns")
+    parser.add_argument("output", nargs="?", help="CSV to write results to")
+    parser.add_argument("--bench", type=int, metavar="ROWS",
+                        help="benchmark ROWS random operations")
+    args = parser.parse_args()
+
+    if args.bench:
+        for name, rate in benchmark(args.bench).items():
+            print(f"{name}: {rate:,.0f} ops/sec")
+    elif args.input and args.output:
+        count = evaluate_csv(args.input, args.output)
+        print(f"Evaluated {count} rows into {args.output}")
+    else:
+        parser.print_usage(sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
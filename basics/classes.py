@@ -136,9 +136,12 @@ class open_bank:
         clean_name = "".join(name.split()).lower()
 
         chars = string.ascii_letters + string.digits
-        random_suffix = ''.join(random.choice(chars) for _ in range(suffix_length))
-
-        return f"{clean_name}_{random_suffix}"
+        # Draw again if the id is taken, so two users never share a record.
+        while True:
+            random_suffix = ''.join(random.choice(chars) for _ in range(suffix_length))
+            user_id = f"{clean_name}_{random_suffix}"
+            if user_id not in bank_users_db:
+                return user_id
     
     # Validate the password.
     def password_validator(self):
@@ -240,8 +243,11 @@ class Library:
     def gen_user_id(name: str, suffix_length=4) -> str:
         clean_name = "".join(name.split()).lower()
         chars = string.ascii_letters + string.digits
-        random_suffix = ''.join(random.choice(chars) for _ in range(suffix_length))
-        return f"{clean_name}_{random_suffix}"
+        while True:
+            random_suffix = ''.join(random.choice(chars) for _ in range(suffix_length))
+            user_id = f"{clean_name}_{random_suffix}"
+            if user_id not in library_users_db:
+                return user_id
 
 # The bank account functionality and the library system are implemented in the above classes. Below are the functions to interact with these systems.
 # Here  is the main function to interact with the bank.
@@ -0,0 +1,258 @@
+""" An arithmetic expression subsystem for the calculator,
+     parses formulas with precedence and parentheses, compiles them
+       into cached Python functions and evaluates them with variables."""
+
+import re
+import time
+import keyword
+from functools import lru_cache
+
+_TOKEN = re.compile(r"""
+    \s*(?:
+        (?P<number>\d+\.\d*|\.\d+|\d+)(?:[eE][+-]?\d+)?
+      | (?P<name>[A-Za-z_]\w*)
+      | (?P<op>\*\*|[-+*/()])
+    )""", re.VERBOSE)
+
+
+class ExpressionError(ValueError):
+    """Raised for formulas that cannot be tokenized or parsed."""
+
+
+def tokenize(text: str) -> list:
+    """Split a formula into (kind, value) tokens."""
+    tokens = []
+    position = 0
+    text = text.rstrip()
+    while position < len(text):
+        match = _TOKEN.match(text, position)
+        if match is None:
+            position += len(text[position:]) - len(text[position:].lstrip())
+            raise ExpressionError(
+                f"Unexpected character {text[position]!r} at {position}.")
+        kind = match.lastgroup
+        value = match.group(0).strip()
+        tokens.append(('number', float(value)) if kind == 'number'
+                      else (kind, value))
+        position = match.end()
+    return tokens
+
+
+# Grammar, lowest precedence first; ** binds tighter than unary minus and
+# associates to the right, like Python:
+#   expr   := term (('+' | '-') term)*
+#   term   := unary (('*' | '/') unary)*
+#   unary  := ('+' | '-') unary | power
+#   power  := atom ('**' unary)?
+#   atom   := number | name | '(' expr ')'
+class _Parser:
+    def __init__(self, tokens):
+        self.tokens = tokens
+        self.position = 0
+
+    def peek(self):
+        if self.position < len(self.tokens):
+            return self.tokens[self.position]
+        return (None, None)
+
+    def take(self):
+        token = self.peek()
+        self.position += 1
+        return token
+
+    def parse(self):
+        if not self.tokens:
+            raise ExpressionError("Empty expression.")
+        tree = self.expr()
+        if self.position != len(self.tokens):
+            raise ExpressionError(f"Unexpected token {self.peek()[1]!r}.")
+        return tree
+
+    def expr(self):
+        tree = self.term()
+        while self.peek() in (('op', '+'), ('op', '-')):
+            tree = ('bin', self.take()[1], tree, self.term())
+        return tree
+
+    def term(self):
+        tree = self.unary()
+        while self.peek() in (('op', '*'), ('op', '/')):
+            tree = ('bin', self.take()[1], tree, self.unary())
+        return tree
+
+    def unary(self):
+        if self.peek() in (('op', '+'), ('op', '-')):
+            sign = self.take()[1]
+            operand = self.unary()
+            return ('neg', operand) if sign == '-' else operand
+        return self.power()
+
+    def power(self):
+        base = self.atom()
+        if self.peek() == ('op', '**'):
+            self.take()
+            return ('bin', '**', base, self.unary())
+        return base
+
+    def atom(self):
+        kind, value = self.take()
+        if kind == 'number':
+            return ('num', value)
+        if kind == 'name':
+            # Dunder names such as __debug__ cannot be parameters of the
+            # compiled function, so they are not variables either.
+            if keyword.iskeyword(value) or (len(value) > 4 and value.startswith("__") and value.endswith("__")):
+                raise ExpressionError(f"{value!r} is not a valid name.")
+            return ('var', value)
+        if (kind, value) == ('op', '('):
+            tree = self.expr()
+            if self.take() != ('op', ')'):
+                raise ExpressionError("Missing closing parenthesis.")
+            return tree
+        if kind is None:
+            raise ExpressionError("Unexpected end of expression.")
+        raise ExpressionError(f"Unexpected token {value!r}.")
+
+
+def parse(text: str):
+    """Parse a formula into a tree of tuples."""
+    return _Parser(tokenize(text)).parse()
+
+
+_APPLY = {
+    '+': lambda a, b: a + b,
+    '-': lambda a, b: a - b,
+    '*': lambda a, b: a * b,
+    '/': lambda a, b: a / b,
+    '**': lambda a, b: a ** b,
+}
+
+
+def evaluate_tree(tree, variables: dict) -> float:
+    """Walk a parsed tree; the slow path compiled formulas avoid."""
+    kind = tree[0]
+    if kind == 'num':
+        return tree[1]
+    if kind == 'var':
+        try:
+            return variables[tree[1]]
+        except KeyError:
+            raise ExpressionError(f"No value for variable {tree[1]!r}.")
+    if kind == 'neg':
+        return -evaluate_tree(tree[1], variables)
+    _, op, left, right = tree
+    return _APPLY[op](evaluate_tree(left, variables),
+                      evaluate_tree(right, variables))
+
+
+def _collect_names(tree, names):
+    if tree[0] == 'var':
+        names.append(tree[1])
+    elif tree[0] == 'neg':
+        _collect_names(tree[1], names)
+    elif tree[0] == 'bin':
+        _collect_names(tree[2], names)
+        _collect_names(tree[3], names)
+    return names
+
+
+def _to_source(tree) -> str:
+    # Only parsed numbers, identifiers and the five operators ever reach
+    # the generated source, so compiling it cannot run arbitrary code.
+    kind = tree[0]
+    if kind == 'num':
+        # repr() of an overflowing literal is 'inf', which is not Python;
+        # 1e999 is read back as the same infinity.
+        return repr(tree[1]) if tree[1] != float('inf') else "1e999"
+    if kind == 'var':
+        return tree[1]
+    if kind == 'neg':
+        return f"(-{_to_source(tree[1])})"
+    _, op, left, right = tree
+    return f"({_to_source(left)} {op} {_to_source(right)})"
+
+
+class CompiledExpression:
+    """A formula compiled once to a Python function of its variables."""
+
+    def __init__(self, text: str):
+        self.text = text
+        tree = parse(text)
+        self.variables = tuple(dict.fromkeys(_collect_names(tree, [])))
+        self.source = _to_source(tree)
+        # Extra keyword arguments are ignored so a whole record of values
+        # (e.g. one CSV row) can be passed to any formula; their catch-all
+        # name is padded until no variable of the formula uses it.
+        rest = "_"
+        while rest in self.variables:
+            rest += "_"
+        parameters = ", ".join([*self.variables, f"**{rest}"])
+        namespace = {}
+        exec(f"def formula({parameters}):\n"
+             f"    return {self.source}", {}, namespace)
+        self._function = namespace['formula']
+
+    def __call__(self, /, **variables) -> float:
+        missing = [name for name in self.variables if name not in variables]
+        if missing:
+            raise ExpressionError(f"Missing values for: {', '.join(missing)}.")
+        return self._function(**variables)
+
+    def __repr__(self):
+        return f"CompiledExpression({self.text!r})"
+
+
+@lru_cache(maxsize=256)
+def compile_expression(text: str) -> CompiledExpression:
+    """Compile a formula, reusing the result for repeated formulas."""
+    return CompiledExpression(text)
+
+
+def evaluate(text: str, /, **variables) -> float:
+    return compile_expression(text)(**variables)
+
+
+def benchmark(text: str = "principal * (1 + rate / 12) ** months - fee",
+              runs: int = 100_000) -> dict:
+    """Evaluations per second: parse every time vs. the compiled cache."""
+    variables = {'principal': 1000.0, 'rate': 0.05, 'months': 12.0,
+                 'fee': 2.5}
+    start = time.perf_counter()
+    for _ in range(runs):
+        evaluate_tree(parse(text), variables)
+    reparsed = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for _ in range(runs):
+        evaluate(text, **variables)
+    compiled = time.perf_counter() - start
+    return {'reparse_per_sec': runs / reparsed,
+            'compiled_per_sec': runs / compiled}
+
+
+def expression_calculator():
+    print("Welcome to the expression calculator...")
+    while True:
+        print("Enter an expression (e.g. 2 * (x + 3)): ")
+        try:
+            formula = compile_expression(input())
+            values = {}
+            for name in formula.variables:
+                values[name] = float(input(f"Enter the value of {name}: "))
+            print(f"The result is: {formula(**values)}")
+        except ExpressionError as error:
+            print(f"Error: {error}")
+        except ValueError:
+            print("Invalid number. Please try again.")
+        except ZeroDivisionError:
+            print("Error: Division by zero is not allowed.")
+
+        print("Do you want to evaluate another expression? (yes/no)")
+        if input().lower() != 'yes':
+            break
+
+
+if __name__ == "__main__":
+    result = benchmark()
+    print(f"Re-parsing: {result['reparse_per_sec']:,.0f} evaluations/sec")
+    print(f"Compiled:   {result['compiled_per_sec']:,.0f} evaluations/sec")
@@ -1,3 +1,5 @@
+from password_policy import DEFAULT_POLICY
+
 # The calculator model starts from here 
 def add(a: float, b: float) -> float: return a + b
 def subtract(a: float, b: float) -> float: return a - b
@@ -71,14 +73,9 @@ def text_processor():
 
 # A simple Password validator model starts from here
 def validate_password(password: str) -> str:
-    if len(password) < 8:
-        return "Password must be at least 8 characters long."
-    if not any(char.isupper() for char in password):
-        return "Password must contain at least one uppercase letter."
-    if not any(char.islower() for char in password):
-        return "Password must contain at least one lowercase letter."
-    if not any(char.isdigit() for char in password):
-        return "Password must contain at least one digit."
+    violations = DEFAULT_POLICY.check(password)
+    if violations:
+        return violations[0]
     return "Password is valid."
 
 def password_validator():
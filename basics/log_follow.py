@@ -0,0 +1,184 @@
+""" Follow a growing log file like `tail -F`,
+     classify each new line with the log pipeline's matcher
+       and keep rolling per-level rates over sliding time windows."""
+
+import os
+import sys
+import time
+import argparse
+from collections import Counter
+
+from log_pipeline import DEFAULT_LEVELS, LevelMatcher
+
+
+class RollingCounter:
+    """Per-level counts over the last `window` seconds.
+
+    Time is cut into fixed buckets kept in a ring. Adding a line touches
+    one bucket and one running total; buckets that fall out of the window
+    are subtracted from the totals as the clock moves past them, so each
+    update costs O(1) amortized no matter how large the window is.
+    """
+
+    def __init__(self, window: float = 60, resolution: float = 1.0):
+        if window <= 0 or resolution <= 0:
+            raise ValueError("Window and resolution must be positive.")
+        self.window = window
+        self.resolution = resolution
+        self._size = max(int(window / resolution), 1)
+        self._buckets = [Counter() for _ in range(self._size)]
+        self._totals = Counter()
+        self._slot = None
+
+    def _advance(self, now: float):
+        slot = int(now / self.resolution)
+        if self._slot is None:
+            self._slot = slot
+            return
+        if slot <= self._slot:
+            return
+        # Only the buckets skipped over need clearing, capped at one lap.
+        for expired in range(self._slot + 1,
+                             min(slot, self._slot + self._size) + 1):
+            bucket = self._buckets[expired % self._size]
+            if bucket:
+                self._totals.subtract(bucket)
+                bucket.clear()
+        self._slot = slot
+
+    def add(self, level: str, now: float | None = None, count: int = 1):
+        self._advance(time.monotonic() if now is None else now)
+        self._buckets[self._slot % self._size][level] += count
+        self._totals[level] += count
+
+    def count(self, level: str, now: float | None = None) -> int:
+        self._advance(time.monotonic() if now is None else now)
+        return self._totals[level]
+
+    def rate(self, level: str, now: float | None = None) -> float:
+        """Average lines per second for level across the window."""
+        return self.count(level, now) / self.window
+
+
+class LevelRates:
+    """Rolling counters for several window lengths at once."""
+
+    def __init__(self, windows=(60, 300, 900), resolution: float = 1.0):
+        self.counters = {window: RollingCounter(window, resolution)
+                         for window in windows}
+        self.totals = Counter()
+
+    def add(self, level: str, now: float | None = None):
+        now = time.monotonic() if now is None else now
+        self.totals[level] += 1
+        for counter in self.counters.values():
+            counter.add(level, now)
+
+    def snapshot(self, levels, now: float | None = None) -> dict:
+        """Return {window: {level: lines per second}}."""
+        now = time.monotonic() if now is None else now
+        return {
+            window: {level: counter.rate(level, now) for level in levels}
+            for window, counter in self.counters.items()
+        }
+
+
+def follow(path: str, from_start: bool = False, poll_interval: float = 0.5,
+           on_idle=None):
+    """Yield complete lines appended to path, surviving rotation.
+
+    The file is reopened when its inode changes (rotated away and
+    recreated) and read again from the top when it shrinks (truncated).
+    A last line the old file never finished is yielded before switching.
+    on_idle, if given, is called every time a poll finds nothing new.
+    """
+    # Binary mode, so tell() is a byte offset that can be compared with
+    # the file size; lines are decoded once they are complete.
+    file = open(path, 'rb')
+    if not from_start:
+        file.seek(0, os.SEEK_END)
+    inode = os.fstat(file.fileno()).st_ino
+    partial = b""
+    try:
+        while True:
+            line = file.readline()
+            if line:
+                if not line.endswith(b"\n"):
+                    # The writer is mid-line; hold it until the rest lands.
+                    partial += line
+                    continue
+                yield (partial + line).decode('utf-8', errors='ignore')
+                partial = b""
+                continue
+
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                stat = None
+            if stat is not None and stat.st_ino != inode:
+                if partial:
+                    yield partial.decode('utf-8', errors='ignore')
+                file.close()
+                file = open(path, 'rb')
+                inode = os.fstat(file.fileno()).st_ino
+                partial = b""
+                continue
+            if stat is not None and stat.st_size < file.tell():
+                file.seek(0)
+                partial = b""
+                continue
+
+            if on_idle is not None:
+                on_idle()
+            time.sleep(poll_interval)
+    finally:
+        file.close()
+
+
+def watch(path: str, levels=DEFAULT_LEVELS, windows=(60, 300, 900),
+          report_every: float = 5.0, from_start: bool = False,
+          output=sys.stdout):
+    """Follow path forever, printing rolling per-level rates."""
+    levels = tuple(levels)
+    classify = LevelMatcher(levels).classify
+    rates = LevelRates(windows)
+    next_report = time.monotonic() + report_every
+
+    def report():
+        nonlocal next_report
+        now = time.monotonic()
+        if now < next_report:
+            return
+        next_report = now + report_every
+        for window, per_level in rates.snapshot(levels, now).items():
+            summary = " | ".join(f"{level}: {rate:.2f}/s"
+                                 for level, rate in per_level.items())
+            print(f"[last {window}s] {summary}", file=output)
+
+    for line in follow(path, from_start=from_start, on_idle=report):
+        rates.add(classify(line))
+        report()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Follow a log file.")
+    parser.add_argument("path")
+    parser.add_argument("--levels", default=",".join(DEFAULT_LEVELS),
+                        help="comma separated levels, highest priority first")
+    parser.add_argument("--windows", default="60,300,900",
+                        help="comma separated window lengths in seconds")
+    parser.add_argument("--every", type=float, default=5.0,
+                        help="seconds between reports")
+    parser.add_argument("--from-start", action="store_true",
+                        help="read the existing content before following")
+    args = parser.parse_args()
+    levels = [level for level in args.levels.split(",") if level]
+    windows = [int(window) for window in args.windows.split(",") if window]
+    try:
+        watch(args.path, levels, windows, args.every, args.from_start)
+    except KeyboardInterrupt:
+        print("Stopped following.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,237 @@
+""" A streaming log classifier built on top of parse_log,
+     reads a file (or stdin) in batches of lines, tags each line
+       with its level and reports per-level counts."""
+
+import os
+import sys
+import time
+import argparse
+from collections import Counter, deque
+from itertools import islice
+from operator import methodcaller
+from concurrent.futures import ProcessPoolExecutor
+
+from functions import parse_log
+
+DEFAULT_LEVELS = ("ERROR", "WARNING", "INFO")
+UNKNOWN = "UNKNOWN"
+
+
+class LevelMatcher:
+    """Classifier for a configurable list of levels, highest priority first.
+
+    The levels are compiled once into a single function of chained
+    substring checks; for a handful of literal tokens this beats a regex
+    alternation, and it keeps parse_log's rule that ERROR wins over
+    WARNING over INFO wherever they appear in the line.
+    """
+
+    def __init__(self, levels=DEFAULT_LEVELS):
+        if not levels:
+            raise ValueError("At least one log level is required.")
+        self.levels = tuple(levels)
+        self.classify = self._compile(self.levels)
+
+    @staticmethod
+    def _compile(levels):
+        # Generate a plain if-chain: it skips the per-level loop overhead,
+        # which is most of the cost once file reading is batched.
+        lines = ["def classify(line):"]
+        for level in levels:
+            lines.append(f"    if {level!r} in line: return {level!r}")
+        lines.append(f"    return {UNKNOWN!r}")
+        namespace = {}
+        exec("\n".join(lines), namespace)
+        return namespace["classify"]
+
+
+def read_batches(stream, batch_size: int = 10_000):
+    """Yield lists of at most batch_size lines without loading the file."""
+    while True:
+        batch = list(islice(stream, batch_size))
+        if not batch:
+            return
+        yield batch
+
+
+def classify_batch(batch, classify, keep=None):
+    """Count the levels in one batch and return the lines worth keeping."""
+    if not keep:
+        return Counter(map(classify, batch)), []
+    levels = list(map(classify, batch))
+    kept = [line for line, level in zip(batch, levels) if level in keep]
+    return Counter(levels), kept
+
+
+def run_pipeline(stream, levels=DEFAULT_LEVELS, keep=None, output=None,
+                 batch_size: int = 10_000) -> Counter:
+    """Classify every line of stream and return the per-level counts.
+
+    Lines whose level is in keep are written to output in input order.
+    """
+    classify = LevelMatcher(levels).classify
+    keep = frozenset(keep or ())
+    totals = Counter()
+    for batch in read_batches(stream, batch_size):
+        counts, kept = classify_batch(batch, classify, keep)
+        totals.update(counts)
+        if output is not None and kept:
+            output.writelines(kept)
+    return totals
+
+
+def split_file(path: str, chunk_size: int = 64 << 20):
+    """Cut a file into byte ranges of about chunk_size each."""
+    size = os.path.getsize(path)
+    return [(start, min(start + chunk_size, size))
+            for start in range(0, size, chunk_size)]
+
+
+_decode = methodcaller('decode', 'utf-8', 'ignore')
+
+
+def _classify_range(job):
+    # A range owns every line that starts inside [start, end); the worker
+    # reads the file itself so nothing but the results crosses the pool.
+    path, start, end, levels, keep, batch_size = job
+    classify = LevelMatcher(levels).classify
+    counts = Counter()
+    kept = []
+    with open(path, 'rb') as file:
+        position = start
+        if start:
+            file.seek(start - 1)
+            position += len(file.readline()) - 1
+        while position < end:
+            batch = list(islice(file, batch_size))
+            if not batch:
+                break
+            batch_bytes = sum(map(len, batch))
+            if position + batch_bytes <= end:
+                owned = batch
+                position += batch_bytes
+            else:
+                owned = []
+                for line in batch:
+                    if position >= end:
+                        break
+                    owned.append(line)
+                    position += len(line)
+            lines = list(map(_decode, owned))
+            batch_counts, batch_kept = classify_batch(lines, classify, keep)
+            counts.update(batch_counts)
+            kept.extend(batch_kept)
+    return counts, kept
+
+
+def bounded_map(pool, function, jobs, window: int):
+    """Like pool.map, but with at most `window` jobs in flight.
+
+    pool.map submits every job before yielding the first result, which
+    drains a lazy job iterator and lets finished results pile up.
+    """
+    pending = deque()
+    for job in jobs:
+        if len(pending) >= window:
+            yield pending.popleft().result()
+        pending.append(pool.submit(function, job))
+    while pending:
+        yield pending.popleft().result()
+
+
+def run_file(path: str, levels=DEFAULT_LEVELS, keep=None, output=None,
+             workers: int = 1, chunk_size: int = 64 << 20,
+             batch_size: int = 10_000) -> Counter:
+    """Classify a file chunk by chunk, across a process pool if workers > 1.
+
+    Chunk results are merged in file order, so kept lines come out in the
+    same order as the input; with a pool at most two chunks per worker
+    are queued or waiting to be merged. Each chunk is read batch_size
+    lines at a time.
+    """
+    levels = tuple(levels)
+    keep = frozenset(keep or ())
+    jobs = ((path, start, end, levels, keep, batch_size)
+            for start, end in split_file(path, chunk_size))
+    totals = Counter()
+
+    def consume(results):
+        for counts, kept in results:
+            totals.update(counts)
+            if output is not None and kept:
+                output.writelines(kept)
+
+    if workers > 1:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            consume(bounded_map(pool, _classify_range, jobs, workers * 2))
+    else:
+        consume(map(_classify_range, jobs))
+    return totals
+
+
+def benchmark(path: str, levels=DEFAULT_LEVELS, workers: int = 1) -> dict:
+    """Compare lines/sec of the per-line parse_log against the pipeline."""
+    with open(path, encoding='utf-8', errors='ignore') as file:
+        start = time.perf_counter()
+        line_count = 0
+        for line in file:
+            parse_log(line)
+            line_count += 1
+        baseline = time.perf_counter() - start
+
+    start = time.perf_counter()
+    run_file(path, levels, workers=workers)
+    pipeline = time.perf_counter() - start
+
+    return {
+        'lines': line_count,
+        'parse_log_lines_per_sec': line_count / baseline if baseline else 0,
+        'pipeline_lines_per_sec': line_count / pipeline if pipeline else 0,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Classify log lines.")
+    parser.add_argument("path", help="log file to read, '-' for stdin")
+    parser.add_argument("--levels", default=",".join(DEFAULT_LEVELS),
+                        help="comma separated levels, highest priority first")
+    parser.add_argument("--keep", default="",
+                        help="comma separated levels to copy to --output")
+    parser.add_argument("--output", help="file for kept lines (default stdout)")
+    parser.add_argument("--batch-size", type=int, default=10_000)
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--bench", action="store_true",
+                        help="report lines/sec against parse_log")
+    args = parser.parse_args()
+    levels = [level for level in args.levels.split(",") if level]
+
+    if args.bench:
+        result = benchmark(args.path, levels, args.workers)
+        print(f"Lines: {result['lines']}")
+        print(f"parse_log: {result['parse_log_lines_per_sec']:,.0f} lines/sec")
+        print(f"pipeline:  {result['pipeline_lines_per_sec']:,.0f} lines/sec")
+        return
+
+    keep = [level for level in args.keep.split(",") if level]
+    sink = None
+    if keep:
+        sink = open(args.output, 'w', encoding='utf-8') if args.output \
+            else sys.stdout
+    try:
+        if args.path == "-":
+            totals = run_pipeline(sys.stdin, levels, keep, sink,
+                                  args.batch_size)
+        else:
+            totals = run_file(args.path, levels, keep, sink, args.workers,
+                              batch_size=args.batch_size)
+    finally:
+        if sink not in (None, sys.stdout):
+            sink.close()
+
+    report = sys.stderr if sink is sys.stdout else sys.stdout
+    for level in [*levels, UNKNOWN]:
+        print(f"{level}: {totals.get(level, 0)}", file=report)
+
+
+if __name__ == "__main__":
+    main()
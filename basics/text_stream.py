@@ -0,0 +1,276 @@
+""" A streaming version of the text processor,
+     runs get_uppercase/get_lowercase/get_char_count/get_reversed style
+       stages over large files chunk by chunk in constant memory."""
+
+import os
+import sys
+import time
+import argparse
+import unicodedata
+from concurrent.futures import ProcessPoolExecutor
+
+from functions import get_uppercase, get_lowercase, get_char_count
+
+try:
+    import regex  # Full Unicode grapheme support when installed.
+except ImportError:
+    regex = None
+
+CHUNK_SIZE = 1 << 20
+# Nothing below U+0300 joins a cluster, apart from the LF of a CRLF.
+_FIRST_MARK = '\u0300'
+
+
+def _extends_cluster(char: str) -> bool:
+    # Characters that attach to the one before them: combining marks,
+    # zero width joiners, variation selectors and emoji skin tones.
+    return (unicodedata.combining(char) != 0
+            or unicodedata.category(char) in ('Mn', 'Me', 'Mc')
+            or char == '\u200d'
+            or '\ufe00' <= char <= '\ufe0f'
+            or '\U0001f3fb' <= char <= '\U0001f3ff')
+
+
+def _is_regional_indicator(char: str) -> bool:
+    return '\U0001f1e6' <= char <= '\U0001f1ff'
+
+
+def graphemes(text: str) -> list:
+    """Split text into user-perceived characters.
+
+    Uses the regex module's \\X when available, otherwise a close
+    approximation that keeps combining marks, ZWJ emoji sequences, flag
+    pairs and CRLF together.
+    """
+    if regex is not None:
+        return regex.findall(r'\X', text)
+    clusters = []
+    for char in text:
+        if clusters:
+            last = clusters[-1]
+            if ((char >= _FIRST_MARK and _extends_cluster(char))
+                    or last[-1] == '\u200d'
+                    or (last == '\r' and char == '\n')
+                    or (len(last) == 1 and _is_regional_indicator(last)
+                        and _is_regional_indicator(char))):
+                clusters[-1] = last + char
+                continue
+        clusters.append(char)
+    return clusters
+
+
+def get_reversed_graphemes(text: str) -> str:
+    """get_reversed that keeps accents and emoji sequences intact."""
+    if '\r\n' not in text and (text.isascii() or max(text) < _FIRST_MARK):
+        return text[::-1]
+    return "".join(reversed(graphemes(text)))
+
+
+def reverse_lines(chunk: str) -> str:
+    """Reverse each line of a chunk, leaving the line breaks in place.
+
+    Lines end at \\n or \\r\\n only, where read_chunks cuts them;
+    str.splitlines would also break at U+2028, U+0085 and the like.
+    """
+    out = []
+    for line in chunk.split('\n'):
+        end = '\r' if line.endswith('\r') else ''
+        out.append(get_reversed_graphemes(line[:len(line) - len(end)]) + end)
+    return "\n".join(out)
+
+
+class CharCounter:
+    """A pass-through stage that counts characters like get_char_count."""
+
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, chunk: str) -> str:
+        self.count += get_char_count(chunk)
+        return chunk
+
+
+STAGES = {
+    'upper': lambda: get_uppercase,
+    'lower': lambda: get_lowercase,
+    'reverse': lambda: reverse_lines,
+    'count': CharCounter,
+}
+
+
+class TextPipeline:
+    """Apply a list of stages, in order, to every chunk of a stream."""
+
+    def __init__(self, stages):
+        self.stages = list(stages)
+
+    @classmethod
+    def from_names(cls, names) -> 'TextPipeline':
+        try:
+            return cls(STAGES[name]() for name in names)
+        except KeyError as error:
+            raise ValueError(f"Unknown stage: {error.args[0]}") from None
+
+    def process(self, chunk: str) -> str:
+        for stage in self.stages:
+            chunk = stage(chunk)
+        return chunk
+
+    def run(self, source, sink=None, chunk_size: int = CHUNK_SIZE):
+        for chunk in read_chunks(source, chunk_size):
+            result = self.process(chunk)
+            if sink is not None:
+                sink.write(result)
+
+    def counts(self) -> list:
+        return [stage.count for stage in self.stages
+                if isinstance(stage, CharCounter)]
+
+
+def read_chunks(source, chunk_size: int = CHUNK_SIZE,
+                max_line: int = 16 * CHUNK_SIZE):
+    """Yield chunks of about chunk_size characters, cut after a newline.
+
+    Whole lines keep per-line stages and context-sensitive case mapping
+    such as the Greek final sigma correct across chunks. A line longer
+    than max_line is cut at whitespace (or between clusters) instead, so
+    memory stays bounded even for files with no line breaks.
+    """
+    carry = ""
+    while True:
+        block = source.read(chunk_size)
+        if not block:
+            if carry:
+                yield carry
+            return
+        text = carry + block
+        cut = text.rfind('\n') + 1
+        if not cut and len(text) >= max_line:
+            cut = max(text.rfind(' '), text.rfind('\t')) + 1
+            if not cut:
+                cut = len(text) - len(graphemes(text[-32:])[-1])
+        carry = text[cut:]
+        if cut:
+            yield text[:cut]
+
+
+def reverse_file(input_path: str, output_path: str,
+                 chunk_size: int = CHUNK_SIZE):
+    """Write the whole file reversed, reading it backwards in blocks.
+
+    Only one block is held at a time. A block's first bytes may belong to
+    a character or cluster that starts in the previous block, so they are
+    carried back and joined onto that block instead of being emitted.
+    """
+    with open(input_path, 'rb') as source, \
+            open(output_path, 'w', encoding='utf-8', newline='') as sink:
+        position = source.seek(0, os.SEEK_END)
+        carry = b""
+        while position > 0:
+            start = max(position - chunk_size, 0)
+            source.seek(start)
+            data = source.read(position - start) + carry
+            position = start
+            split = 0
+            if position > 0:
+                # Skip UTF-8 continuation bytes of a character cut in two.
+                while split < len(data) and data[split] & 0xC0 == 0x80:
+                    split += 1
+            clusters = graphemes(data[split:].decode('utf-8',
+                                                     errors='ignore'))
+            if position > 0 and clusters:
+                # Flags pair regional indicators from the start of their
+                # run, which may lie in the previous block, so a leading
+                # run of them is carried whole along with the first cluster.
+                keep = 1
+                while (keep < len(clusters) and _is_regional_indicator(clusters[keep - 1][0])
+                       and _is_regional_indicator(clusters[keep][0])):
+                    keep += 1
+                carry = data[:split] + "".join(clusters[:keep]).encode('utf-8')
+                del clusters[:keep]
+            else:
+                carry = data[:split]
+            sink.write("".join(reversed(clusters)))
+
+
+def process_file(job) -> dict:
+    """Run the named stages over one file; a pool-friendly entry point."""
+    input_path, output_path, names, chunk_size = job
+    pipeline = TextPipeline.from_names(names)
+    start = time.perf_counter()
+    with open(input_path, encoding='utf-8', errors='ignore',
+              newline='') as source:
+        if output_path is None:
+            pipeline.run(source, chunk_size=chunk_size)
+        else:
+            with open(output_path, 'w', encoding='utf-8',
+                      newline='') as sink:
+                pipeline.run(source, sink, chunk_size)
+    elapsed = time.perf_counter() - start
+    size = os.path.getsize(input_path)
+    return {
+        'file': input_path,
+        'bytes': size,
+        'char_counts': pipeline.counts(),
+        'mb_per_sec': size / elapsed / 1e6 if elapsed else 0.0,
+    }
+
+
+def process_files(paths, names, output_dir=None, workers: int = 1,
+                  chunk_size: int = CHUNK_SIZE) -> list:
+    """Process independent files in parallel, one file per task."""
+    jobs = []
+    for path in paths:
+        output_path = None
+        if output_dir is not None:
+            output_path = os.path.join(output_dir, os.path.basename(path))
+        jobs.append((path, output_path, tuple(names), chunk_size))
+    if workers > 1:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            return list(pool.map(process_file, jobs))
+    return [process_file(job) for job in jobs]
+
+
+def benchmark(path: str, chunk_size: int = CHUNK_SIZE) -> dict:
+    """Throughput in MB/s for each stage on its own, output discarded."""
+    results = {}
+    for name in STAGES:
+        result = process_file((path, None, (name,), chunk_size))
+        results[name] = result['mb_per_sec']
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Transform text files.")
+    parser.add_argument("paths", nargs="+", help="files to process")
+    parser.add_argument("--stages", default="count",
+                        help=f"comma separated, from: {', '.join(STAGES)}")
+    parser.add_argument("--output-dir", help="where transformed files go")
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--bench", action="store_true",
+                        help="report MB/s per stage for each file")
+    args = parser.parse_args()
+
+    if args.bench:
+        for path in args.paths:
+            for name, rate in benchmark(path).items():
+                print(f"{os.path.basename(path)} {name}: {rate:.1f} MB/s")
+        return
+
+    names = [name for name in args.stages.split(",") if name]
+    if args.output_dir:
+        os.makedirs(args.output_dir, exist_ok=True)
+    try:
+        results = process_files(args.paths, names, args.output_dir,
+                                args.workers)
+    except ValueError as error:
+        print(error, file=sys.stderr)
+        return
+    for result in results:
+        print(f"{result['file']}: {result['bytes']} bytes, "
+              f"{result['mb_per_sec']:.1f} MB/s, "
+              f"characters: {result['char_counts']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,249 @@
+""" A compact, bounded event log for BankAccount,
+     keeps typed transaction and audit events in fixed-size arrays,
+       spills the oldest ones to disk and answers time/type queries."""
+
+import os
+import mmap
+import time
+import struct
+import threading
+from array import array
+from enum import IntEnum
+from typing import NamedTuple
+
+
+class EventType(IntEnum):
+    DEPOSIT = 1
+    WITHDRAWAL = 2
+    TRANSFER_OUT = 3
+    TRANSFER_IN = 4
+    BALANCE_CHECK = 5
+    FAILED_DEPOSIT = 6
+    FAILED_WITHDRAWAL = 7
+    FAILED_TRANSFER = 8
+    INTEREST = 9
+
+
+class Reason(IntEnum):
+    NONE = 0
+    VALIDATION = 1
+    INSUFFICIENT_FUNDS = 2
+    RECIPIENT_NOT_FOUND = 3
+    RULE_VIOLATION = 4
+    INVALID_AMOUNT = 5
+    SELF_TRANSFER = 6
+
+
+MONEY_EVENTS = frozenset({EventType.DEPOSIT, EventType.WITHDRAWAL,
+                          EventType.TRANSFER_OUT, EventType.TRANSFER_IN,
+                          EventType.INTEREST})
+
+_REASON_TEXT = {
+    Reason.VALIDATION: "Validation failed",
+    Reason.INSUFFICIENT_FUNDS: "Insufficient funds",
+    Reason.RECIPIENT_NOT_FOUND: "Recipient not found",
+    Reason.RULE_VIOLATION: "Blocked by fraud rules",
+    Reason.INVALID_AMOUNT: "Invalid amount",
+    Reason.SELF_TRANSFER: "Transfer to own account",
+}
+
+# timestamp (epoch seconds), kind, amount (minor units), reason,
+# counterparty code into the log's name table.
+SPILL_RECORD = struct.Struct("<dbqbi")
+
+
+class Event(NamedTuple):
+    timestamp: float
+    kind: EventType
+    amount: int
+    counterparty: str
+    reason: Reason
+
+    def __str__(self):
+        when = time.strftime("%Y-%m-%d %H:%M:%S",
+                             time.localtime(self.timestamp))
+        amount = self.amount / 100
+        if self.kind == EventType.DEPOSIT:
+            return f"Deposited {amount} at {when}"
+        if self.kind == EventType.WITHDRAWAL:
+            return f"Withdrew {amount} at {when}"
+        if self.kind == EventType.TRANSFER_OUT:
+            return f"Transferred {amount} to {self.counterparty} at {when}"
+        if self.kind == EventType.TRANSFER_IN:
+            return f"Received {amount} from {self.counterparty} at {when}"
+        if self.kind == EventType.INTEREST:
+            return f"Interest of {amount} credited at {when}"
+        if self.kind == EventType.BALANCE_CHECK:
+            return f"Balance checked at {when}"
+        action = self.kind.name.replace("FAILED_", "")
+        return (f"FAILED {action}: "
+                f"{_REASON_TEXT.get(self.reason, 'Unknown reason')} at {when}")
+
+
+class EventLog:
+    """Ring buffer of account events with optional spill to disk.
+
+    Events live in parallel typed arrays rather than as strings, so each
+    costs a couple of dozen bytes. When the ring is full the oldest half
+    is written to spill_path as fixed-size records (or dropped when no
+    path is set), which keeps memory bounded for busy accounts. Time
+    stamps never go backwards, so both the ring and the spill file stay
+    sorted and time ranges are found by binary search. Appends may come
+    from several threads; close() spills whatever is still in the ring.
+    """
+
+    def __init__(self, capacity: int = 1024, spill_path: str | None = None):
+        if capacity < 2:
+            raise ValueError("Capacity must be at least 2.")
+        self.capacity = capacity
+        self.spill_path = spill_path
+        self._timestamps = array('d', [0.0]) * capacity
+        self._kinds = array('b', [0]) * capacity
+        self._amounts = array('q', [0]) * capacity
+        self._reasons = array('b', [0]) * capacity
+        self._counterparties = array('i', [0]) * capacity
+        self._head = 0
+        self._size = 0
+        self._last_timestamp = 0.0
+        self._names = [""]
+        self._codes = {"": 0}
+        self.spilled = 0
+        self.dropped = 0
+        self._lock = threading.Lock()
+        if spill_path is not None and os.path.exists(spill_path):
+            self._load_names()
+            self.spilled = os.path.getsize(spill_path) // SPILL_RECORD.size
+            if self.spilled:
+                with open(spill_path, "rb") as file:
+                    file.seek((self.spilled - 1) * SPILL_RECORD.size)
+                    self._last_timestamp = SPILL_RECORD.unpack(
+                        file.read(SPILL_RECORD.size))[0]
+
+    # Name table: counterparties are stored once and referenced by code.
+    def _names_path(self) -> str:
+        return self.spill_path + ".names"
+
+    def _load_names(self):
+        if os.path.exists(self._names_path()):
+            with open(self._names_path(), encoding="utf-8") as file:
+                for line in file:
+                    self._code_for(line.rstrip("\n"), persist=False)
+
+    def _code_for(self, name: str, persist: bool = True) -> int:
+        code = self._codes.get(name)
+        if code is None:
+            code = len(self._names)
+            self._names.append(name)
+            self._codes[name] = code
+            if persist and self.spill_path is not None:
+                with open(self._names_path(), "a", encoding="utf-8") as file:
+                    file.write(name + "\n")
+        return code
+
+    def append(self, kind: EventType, amount: int = 0,
+               counterparty: str = "", reason: Reason = Reason.NONE,
+               timestamp: float | None = None):
+        timestamp = time.time() if timestamp is None else timestamp
+        with self._lock:
+            if self._size == self.capacity:
+                self._evict(self.capacity // 2)
+            self._last_timestamp = max(timestamp, self._last_timestamp)
+            slot = (self._head + self._size) % self.capacity
+            self._timestamps[slot] = self._last_timestamp
+            self._kinds[slot] = kind
+            self._amounts[slot] = amount
+            self._reasons[slot] = reason
+            self._counterparties[slot] = self._code_for(counterparty)
+            self._size += 1
+
+    def close(self):
+        """Spill the events still in memory so a restart finds them.
+
+        Without a spill path there is nowhere to put them and they stay.
+        """
+        with self._lock:
+            if self.spill_path is not None and self._size:
+                self._evict(self._size)
+
+    def _evict(self, count: int):
+        if self.spill_path is None:
+            self.dropped += count
+        else:
+            records = bytearray()
+            for offset in range(count):
+                slot = (self._head + offset) % self.capacity
+                records += SPILL_RECORD.pack(
+                    self._timestamps[slot], self._kinds[slot],
+                    self._amounts[slot], self._reasons[slot],
+                    self._counterparties[slot])
+            with open(self.spill_path, "ab") as file:
+                file.write(records)
+            self.spilled += count
+        self._head = (self._head + count) % self.capacity
+        self._size -= count
+
+    def __len__(self):
+        return self.spilled + self._size
+
+    def _event(self, timestamp, kind, amount, reason, code) -> Event:
+        return Event(timestamp, EventType(kind), amount, self._names[code],
+                     Reason(reason))
+
+    def _memory_range(self, start, end):
+        def stamp(index):
+            return self._timestamps[(self._head + index) % self.capacity]
+        # Copied out under the lock: an append may evict and reuse slots.
+        with self._lock:
+            low = _bisect(stamp, self._size, start, right=False)
+            high = _bisect(stamp, self._size, end, right=True)
+            events = []
+            for index in range(low, high):
+                slot = (self._head + index) % self.capacity
+                events.append(self._event(
+                    self._timestamps[slot], self._kinds[slot],
+                    self._amounts[slot], self._reasons[slot],
+                    self._counterparties[slot]))
+        yield from events
+
+    def _disk_range(self, start, end):
+        if not self.spilled:
+            return
+        with open(self.spill_path, "rb") as file, \
+                mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            def stamp(index):
+                return SPILL_RECORD.unpack_from(
+                    data, index * SPILL_RECORD.size)[0]
+            low = _bisect(stamp, self.spilled, start, right=False)
+            high = _bisect(stamp, self.spilled, end, right=True)
+            for index in range(low, high):
+                fields = SPILL_RECORD.unpack_from(
+                    data, index * SPILL_RECORD.size)
+                yield self._event(*fields)
+
+    def query(self, start: float | None = None, end: float | None = None,
+              kinds=None):
+        """Yield events with start <= timestamp <= end, oldest first."""
+        kinds = None if kinds is None else frozenset(kinds)
+        for source in (self._disk_range, self._memory_range):
+            for event in source(start, end):
+                if kinds is None or event.kind in kinds:
+                    yield event
+
+    def statement(self, start: float | None = None,
+                  end: float | None = None) -> list:
+        return list(self.query(start, end, MONEY_EVENTS))
+
+
+def _bisect(key, size: int, target, right: bool) -> int:
+    # Binary search over a sorted sequence given only index -> value.
+    if target is None:
+        return size if right else 0
+    low, high = 0, size
+    while low < high:
+        middle = (low + high) // 2
+        value = key(middle)
+        if value < target or (right and value == target):
+            low = middle + 1
+        else:
+            high = middle
+    return low
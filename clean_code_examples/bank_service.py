@@ -0,0 +1,274 @@
+""" A headless service layer over BankAccount,
+     authenticates once per session with a token instead of prompting
+       on every call, and accepts whole batches of operations."""
+
+import csv
+import hmac
+import hashlib
+import time
+import secrets
+from itertools import islice
+
+from account_events import EventType, Reason
+from transfers import valid_amount
+
+FAILED_KIND = {EventType.DEPOSIT: EventType.FAILED_DEPOSIT,
+               EventType.WITHDRAWAL: EventType.FAILED_WITHDRAWAL,
+               EventType.TRANSFER_OUT: EventType.FAILED_TRANSFER}
+
+
+# PBKDF2 rounds for the password hashes written to disk.
+PASSWORD_ROUNDS = 200_000
+
+
+class AuthenticationError(Exception):
+    """Raised for unknown, expired or revoked session tokens."""
+
+
+def hash_password(password: str, salt: bytes | None = None) -> str:
+    """A salted PBKDF2 digest, 'salt$digest' in hex, safe to store."""
+    if salt is None:
+        salt = secrets.token_bytes(16)
+    digest = hashlib.pbkdf2_hmac("sha256", password.encode("utf-8"), salt,
+                                 PASSWORD_ROUNDS)
+    return f"{salt.hex()}${digest.hex()}"
+
+
+def check_password(record: dict, password: str) -> bool:
+    """Check password against a record's stored hash, or the plain one
+    an account keeps in memory before it has ever been saved."""
+    stored = record.get("password_hash")
+    if stored is not None:
+        salt = bytes.fromhex(stored.split("$", 1)[0])
+        return hmac.compare_digest(hash_password(str(password), salt),
+                                   stored)
+    # compare_digest() only takes ASCII str, so compare the UTF-8 bytes.
+    return hmac.compare_digest(str(record.get("password")).encode("utf-8"),
+                               str(password).encode("utf-8"))
+
+
+class BankService:
+    """Token-authenticated deposits, withdrawals and transfers.
+
+    Every operation returns a result dict ({'ok', 'message', 'balance'})
+    instead of printing, so the same calls serve a menu, a script or a
+    server. Anyone with a session may deposit into any existing account
+    (that is how payroll works); withdrawals and transfers only ever move
+    money out of the session's own account.
+    """
+
+    def __init__(self, db: dict, engine, session_ttl: float = 15 * 60,
+                 ledger=None, rules=None):
+        self.db = db
+        self.engine = engine
+        self.session_ttl = session_ttl
+        self.ledger = ledger
+        self.rules = rules
+        self._sessions = {}
+
+    # Sessions
+    def login(self, user_id: str, password: str) -> str | None:
+        record = self.db.get(user_id)
+        if record is None or not check_password(record, password):
+            return None
+        token = secrets.token_urlsafe(32)
+        self._sessions[token] = (user_id, time.monotonic() + self.session_ttl)
+        return token
+
+    def logout(self, token: str):
+        self._sessions.pop(token, None)
+
+    def _user_for(self, token: str) -> str:
+        session = self._sessions.get(token)
+        if session is None:
+            raise AuthenticationError("Invalid session token.")
+        user_id, expires_at = session
+        if time.monotonic() > expires_at:
+            del self._sessions[token]
+            raise AuthenticationError("Session expired. Please log in again.")
+        return user_id
+
+    # Operations
+    def _record(self, user_id: str, kind: EventType, amount: float,
+                counterparty: str = "", reason: Reason = Reason.NONE):
+        account = self.engine.accounts.get(user_id)
+        if account is not None:
+            account.record(kind, amount, counterparty, reason)
+
+    def _screen(self, kind: EventType, user_id: str, amount: float,
+                counterparty: str = "") -> tuple:
+        # Run the fraud rules, if any: (failed result, None) when one
+        # objects, else (None, the operation they reserved, or None).
+        if self.rules is None:
+            return None, None
+        op = self.rules.operation(kind, user_id, amount, counterparty)
+        violations = self.rules.check(op)
+        if not violations:
+            return None, op
+        self._record(user_id, FAILED_KIND[kind], amount, counterparty,
+                     Reason.RULE_VIOLATION)
+        return self._result(False, " ".join(violations), user_id), None
+
+    def _settle(self, op, succeeded: bool) -> bool:
+        # Only an operation that went through counts against the rules.
+        if op is not None:
+            if succeeded:
+                self.rules.commit(op)
+            else:
+                self.rules.release(op)
+        return succeeded
+
+    def _result(self, ok: bool, message: str, user_id: str) -> dict:
+        return {'ok': ok, 'message': message,
+                'balance': self.db[user_id]['balance']}
+
+    def balance(self, token: str) -> float:
+        return self.engine.balance(self._user_for(token))
+
+    def _invalid_amount(self, kind: EventType, user_id: str, amount: float,
+                        counterparty: str = "") -> dict | None:
+        # NaN and inf pass an "amount <= 0" check; valid_amount() does not.
+        if valid_amount(amount):
+            return None
+        self._record(user_id, FAILED_KIND[kind], amount, counterparty,
+                     Reason.INVALID_AMOUNT)
+        return self._result(False, "Amount must be a positive number.",
+                            user_id)
+
+    # Each public operation resolves its session once and then runs as
+    # the session's user, which is also how a batch runs every row.
+    def deposit(self, token: str, amount: float,
+                user_id: str | None = None) -> dict:
+        return self._deposit(self._user_for(token), amount, user_id)
+
+    def withdraw(self, token: str, amount: float) -> dict:
+        return self._withdraw(self._user_for(token), amount)
+
+    def transfer(self, token: str, recipient_user_id: str,
+                 amount: float) -> dict:
+        return self._transfer(self._user_for(token), recipient_user_id,
+                              amount)
+
+    def _deposit(self, own_id: str, amount: float,
+                 user_id: str | None = None) -> dict:
+        user_id = user_id or own_id
+        if user_id not in self.db:
+            return {'ok': False, 'balance': None,
+                    'message': f"Account {user_id} does not exist."}
+        invalid = self._invalid_amount(EventType.DEPOSIT, own_id, amount)
+        if invalid is not None:
+            return invalid
+        blocked, op = self._screen(EventType.DEPOSIT, user_id, amount)
+        if blocked is not None:
+            return blocked
+        if not self._settle(op, self.engine.deposit(user_id, amount)):
+            return self._result(False, "Deposit failed.", own_id)
+        if self.ledger is not None:
+            self.ledger.deposit(user_id, amount)
+        self._record(user_id, EventType.DEPOSIT, amount)
+        return self._result(True, f"Deposited {amount}.", user_id)
+
+    def _withdraw(self, user_id: str, amount: float) -> dict:
+        invalid = self._invalid_amount(EventType.WITHDRAWAL, user_id, amount)
+        if invalid is not None:
+            return invalid
+        blocked, op = self._screen(EventType.WITHDRAWAL, user_id, amount)
+        if blocked is not None:
+            return blocked
+        if not self._settle(op, self.engine.withdraw(user_id, amount)):
+            self._record(user_id, EventType.FAILED_WITHDRAWAL, amount,
+                         reason=Reason.INSUFFICIENT_FUNDS)
+            return self._result(False, "Insufficient balance.", user_id)
+        if self.ledger is not None:
+            self.ledger.withdraw(user_id, amount)
+        self._record(user_id, EventType.WITHDRAWAL, amount)
+        return self._result(True, f"Withdrew {amount}.", user_id)
+
+    def _transfer(self, user_id: str, recipient_user_id: str,
+                  amount: float) -> dict:
+        if recipient_user_id == user_id:
+            self._record(user_id, EventType.FAILED_TRANSFER, amount,
+                         recipient_user_id, Reason.SELF_TRANSFER)
+            return self._result(False, "Cannot transfer to your own account.",
+                                user_id)
+        if recipient_user_id not in self.db:
+            self._record(user_id, EventType.FAILED_TRANSFER, amount,
+                         recipient_user_id, Reason.RECIPIENT_NOT_FOUND)
+            return self._result(False, "Recipient user ID does not exist.",
+                                user_id)
+        invalid = self._invalid_amount(EventType.TRANSFER_OUT, user_id,
+                                       amount, recipient_user_id)
+        if invalid is not None:
+            return invalid
+        blocked, op = self._screen(EventType.TRANSFER_OUT, user_id, amount,
+                                   recipient_user_id)
+        if blocked is not None:
+            return blocked
+        if not self._settle(op, self.engine.transfer(
+                user_id, recipient_user_id, amount)):
+            self._record(user_id, EventType.FAILED_TRANSFER, amount,
+                         recipient_user_id, Reason.INSUFFICIENT_FUNDS)
+            return self._result(False, "Insufficient balance.", user_id)
+        if self.ledger is not None:
+            self.ledger.transfer(user_id, recipient_user_id, amount)
+        self._record(user_id, EventType.TRANSFER_OUT, amount,
+                     recipient_user_id)
+        self._record(recipient_user_id, EventType.TRANSFER_IN, amount,
+                     user_id)
+        return self._result(
+            True, f"Successfully transferred {amount} to {recipient_user_id}.",
+            user_id)
+
+    def transactions(self, token: str) -> list:
+        account = self.engine.accounts.get(self._user_for(token))
+        return account.transactions if account is not None else []
+
+    def logs(self, token: str) -> list:
+        account = self.engine.accounts.get(self._user_for(token))
+        return account.logs if account is not None else []
+
+    def statement(self, token: str, start: float | None = None,
+                  end: float | None = None) -> list:
+        """Money events between two epoch times, as typed Event tuples."""
+        account = self.engine.accounts.get(self._user_for(token))
+        return account.events.statement(start, end) if account else []
+
+    # Batches
+    def submit_batch(self, token: str, operations):
+        """Run operations in order, yielding one result per operation.
+
+        Each operation is a dict with 'op' ('deposit', 'withdraw' or
+        'transfer'), 'amount' and, where needed, 'user_id' (deposit
+        target) or 'to' (transfer recipient). The token is checked once
+        up front and the whole batch runs as that user, even if the
+        session expires part way; a bad row fails on its own without
+        stopping the batch.
+        """
+        user_id = self._user_for(token)
+        handlers = {
+            'deposit': lambda row: self._deposit(
+                user_id, float(row['amount']), row.get('user_id') or None),
+            'withdraw': lambda row: self._withdraw(
+                user_id, float(row['amount'])),
+            'transfer': lambda row: self._transfer(
+                user_id, row['to'], float(row['amount'])),
+        }
+        for index, row in enumerate(operations):
+            handler = handlers.get(row.get('op'))
+            if handler is None:
+                result = {'ok': False, 'balance': None,
+                          'message': f"Unknown operation {row.get('op')!r}."}
+            else:
+                try:
+                    result = handler(row)
+                except (KeyError, ValueError) as error:
+                    result = {'ok': False, 'balance': None,
+                              'message': f"Malformed row: {error}"}
+            result['index'] = index
+            yield result
+
+    def submit_csv(self, token: str, path: str, limit: int | None = None):
+        """Stream a CSV of operations (op,user_id,to,amount) as a batch."""
+        with open(path, newline='', encoding='utf-8') as file:
+            rows = islice(csv.DictReader(file), limit)
+            yield from self.submit_batch(token, rows)
@@ -0,0 +1,270 @@
+""" End-of-day interest and statements for every BankAccount,
+     accrues a day's interest in exact integer cents, writes one statement
+       row per account and can resume a run that was cut short."""
+
+import os
+import csv
+import json
+import sys
+import time
+import zlib
+import argparse
+from decimal import Decimal
+from concurrent.futures import ProcessPoolExecutor
+
+from ledger import DEPOSIT, to_minor_units, from_minor_units
+from account_events import EventType
+
+try:
+    import numpy as np
+except ImportError:  # Plain integer arithmetic gives the same answers.
+    np = None
+
+DAYS_IN_YEAR = 365  # Actual/365 day count.
+CHECKPOINT_FILE = "checkpoint.json"
+POSTED_FILE = "posted.log"
+STATEMENT_FIELDS = ("user_id", "name", "date", "opening", "interest",
+                    "closing")
+# cents * numerator must stay inside int64 for the numpy path.
+_INT64_SAFE = 1 << 62
+
+
+def daily_rate(annual_rate) -> tuple:
+    """The exact daily rate as (numerator, denominator).
+
+    annual_rate is read as a Decimal (pass a string such as "0.035" to
+    avoid float noise), so every run and every machine agrees to the cent.
+    """
+    numerator, denominator = Decimal(str(annual_rate)).as_integer_ratio()
+    if numerator < 0:
+        raise ValueError("Interest rate cannot be negative.")
+    return numerator, denominator * DAYS_IN_YEAR
+
+
+def accrue(balances, numerator: int, denominator: int) -> list:
+    """Interest in cents for each balance in cents, rounded half to even.
+
+    Only positive balances earn interest. Works on a whole chunk at once,
+    with numpy when it is installed and the products fit in 64 bits.
+    """
+    if np is not None and balances and \
+            max(balances) * numerator < _INT64_SAFE:
+        cents = np.maximum(np.asarray(balances, dtype=np.int64), 0)
+        quotient, remainder = np.divmod(cents * numerator, denominator)
+        quotient += (2 * remainder > denominator) | \
+            ((2 * remainder == denominator) & (quotient % 2 == 1))
+        return quotient.tolist()
+    interest = []
+    for balance in balances:
+        quotient, remainder = divmod(max(balance, 0) * numerator,
+                                     denominator)
+        if 2 * remainder > denominator or \
+                (2 * remainder == denominator and quotient % 2):
+            quotient += 1
+        interest.append(quotient)
+    return interest
+
+
+def format_cents(cents: int) -> str:
+    sign = "-" if cents < 0 else ""
+    units, cents = divmod(abs(cents), 100)
+    return f"{sign}{units}.{cents:02d}"
+
+
+def _write_atomic(path: str, write):
+    temp_path = path + ".tmp"
+    with open(temp_path, "w", newline="", encoding="utf-8") as file:
+        write(file)
+        file.flush()
+        os.fsync(file.fileno())
+    os.replace(temp_path, path)
+
+
+def _chunk_path(run_directory: str, chunk: int) -> str:
+    return os.path.join(run_directory, f"statements_{chunk:05d}.csv")
+
+
+def _process_chunk(job) -> tuple:
+    # Runs in a worker: accrue one chunk and write its statement file.
+    run_directory, chunk, date, numerator, denominator, rows = job
+    interest = accrue([row[2] for row in rows], numerator, denominator)
+
+    def write(file):
+        writer = csv.writer(file)
+        writer.writerow(STATEMENT_FIELDS)
+        writer.writerows(
+            (user_id, name, date, format_cents(opening),
+             format_cents(earned), format_cents(opening + earned))
+            for (user_id, name, opening), earned in zip(rows, interest))
+
+    _write_atomic(_chunk_path(run_directory, chunk), write)
+    return chunk, len(rows), sum(interest)
+
+
+def _load_checkpoint(run_directory: str, rate: str, chunks: int) -> dict:
+    path = os.path.join(run_directory, CHECKPOINT_FILE)
+    if os.path.exists(path):
+        with open(path, encoding="utf-8") as file:
+            checkpoint = json.load(file)
+        if checkpoint["rate"] != rate:
+            raise ValueError(
+                f"A run for this date used rate {checkpoint['rate']}.")
+        return checkpoint
+    checkpoint = {"rate": rate, "chunks": chunks}
+    _write_atomic(path, lambda file: json.dump(checkpoint, file))
+    return checkpoint
+
+
+def _posted_chunks(run_directory: str) -> set:
+    path = os.path.join(run_directory, POSTED_FILE)
+    if not os.path.exists(path):
+        return set()
+    with open(path, encoding="utf-8") as file:
+        return {int(line) for line in file if line.strip()}
+
+
+def _post_chunk(run_directory: str, date: str, chunk: int, db: dict,
+                engine, ledger):
+    # Credit a finished chunk's interest. With a ledger, the credits and
+    # the chunk's key go in as one append_batch(), so after a crash the
+    # ledger holds either the whole chunk, marked paid, or none of it;
+    # posted.log only records progress for runs without a ledger.
+    with open(_chunk_path(run_directory, chunk), newline="",
+              encoding="utf-8") as file:
+        credits = [(row["user_id"], float(Decimal(row["interest"])))
+                   for row in csv.DictReader(file)
+                   if Decimal(row["interest"])]
+    if ledger is not None and not ledger.append_batch(
+            _batch_key(date, chunk),
+            [(DEPOSIT, user_id, to_minor_units(amount), "")
+             for user_id, amount in credits]):
+        return
+    for user_id, amount in credits:
+        if engine is not None:
+            engine.deposit(user_id, amount)
+            account = engine.accounts.get(user_id)
+            if account is not None:
+                account.record(EventType.INTEREST, amount)
+        else:
+            db[user_id]["balance"] += amount
+    with open(os.path.join(run_directory, POSTED_FILE), "a",
+              encoding="utf-8") as file:
+        file.write(f"{chunk}\n")
+        file.flush()
+        os.fsync(file.fileno())
+
+
+def _batch_key(date: str, chunk: int) -> str:
+    return f"interest:{date}:{chunk}"
+
+
+def run_end_of_day(db: dict, directory: str, annual_rate, date: str,
+                   chunk_size: int = 100_000, workers: int = 1,
+                   engine=None, ledger=None) -> dict:
+    """Accrue a day's interest for every account in db and post it.
+
+    Accounts are split into chunks by a hash of their user_id, so the
+    same account lands in the same chunk when a run is resumed. Each
+    chunk's statements are written to directory/date/ in one atomic
+    step; chunks already on disk are skipped and chunks already posted
+    are not credited again. Pass the TransferEngine to post through its
+    locks (and record INTEREST events on live accounts), and the Ledger
+    to make the credits durable; the ledger then also decides which
+    chunks were paid, so a crash at any point never pays one twice.
+    """
+    numerator, denominator = daily_rate(annual_rate)
+    run_directory = os.path.join(directory, date)
+    os.makedirs(run_directory, exist_ok=True)
+    checkpoint = _load_checkpoint(run_directory, str(annual_rate),
+                                  max(1, -(-len(db) // chunk_size)))
+    chunks = checkpoint["chunks"]
+    start = time.perf_counter()
+
+    pending = [chunk for chunk in range(chunks)
+               if not os.path.exists(_chunk_path(run_directory, chunk))]
+    buckets = {chunk: [] for chunk in pending}
+    if buckets:
+        for user_id, record in db.items():
+            bucket = buckets.get(zlib.crc32(user_id.encode()) % chunks)
+            if bucket is not None:
+                bucket.append((user_id, record.get("name", ""),
+                               to_minor_units(record["balance"])))
+    jobs = [(run_directory, chunk, date, numerator, denominator,
+             buckets.pop(chunk)) for chunk in pending]
+    interest = 0
+    if workers > 1 and len(jobs) > 1:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(_process_chunk, jobs))
+    else:
+        results = [_process_chunk(job) for job in jobs]
+    for _, _, earned in results:
+        interest += earned
+    accrued = time.perf_counter() - start
+
+    if ledger is not None:
+        posted = {chunk for chunk in range(chunks)
+                  if _batch_key(date, chunk) in ledger.batches}
+    else:
+        posted = _posted_chunks(run_directory)
+    for chunk in range(chunks):
+        if chunk not in posted:
+            _post_chunk(run_directory, date, chunk, db, engine, ledger)
+    return {"accounts": len(db),
+            "chunks_run": len(jobs),
+            "chunks_skipped": chunks - len(jobs),
+            "interest": from_minor_units(interest),
+            "accrue_seconds": accrued,
+            "total_seconds": time.perf_counter() - start}
+
+
+def read_statement(directory: str, date: str, user_id: str) -> dict | None:
+    """One account's statement row for a finished run."""
+    run_directory = os.path.join(directory, date)
+    with open(os.path.join(run_directory, CHECKPOINT_FILE),
+              encoding="utf-8") as file:
+        chunks = json.load(file)["chunks"]
+    chunk = zlib.crc32(user_id.encode()) % chunks
+    with open(_chunk_path(run_directory, chunk), newline="",
+              encoding="utf-8") as file:
+        for row in csv.DictReader(file):
+            if row["user_id"] == user_id:
+                return row
+    return None
+
+
+def benchmark(accounts: int = 1_000_000, workers: int = 1,
+              chunk_size: int = 100_000) -> dict:
+    import tempfile
+    db = {f"user_{number}": {"name": f"User {number}",
+                             "balance": (number * 7919) % 1_000_000 / 100}
+          for number in range(accounts)}
+    with tempfile.TemporaryDirectory() as directory:
+        result = run_end_of_day(db, directory, "0.035", "2024-01-31",
+                                chunk_size, workers)
+    result["accounts_per_sec"] = accounts / result["total_seconds"]
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="End-of-day batch job.")
+    parser.add_argument("--bench", type=int, metavar="ACCOUNTS",
+                        help="run the job over ACCOUNTS synthetic accounts")
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--chunk-size", type=int, default=100_000)
+    args = parser.parse_args()
+
+    if not args.bench:
+        parser.print_usage(sys.stderr)
+        return
+    result = benchmark(args.bench, args.workers, args.chunk_size)
+    print(f"{result['accounts']:,} accounts in "
+          f"{result['total_seconds']:.1f} s "
+          f"({result['accounts_per_sec']:,.0f}/sec, accrual "
+          f"{result['accrue_seconds']:.1f} s)")
+    print(f"Interest credited: {result['interest']:,.2f}")
+    print(f"10M accounts would take about "
+          f"{10_000_000 / result['accounts_per_sec'] / 60:.1f} min")
+
+
+if __name__ == "__main__":
+    main()
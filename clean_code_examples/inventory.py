@@ -0,0 +1,193 @@
+""" Per-branch book inventory for the Library class,
+     each branch counts its own copies by title or ISBN, and a shared
+       index answers "which branch has a copy" without a scan."""
+
+import re
+import time
+import unicodedata
+
+_NON_WORD = re.compile(r"[\W_]+")
+
+
+def normalize_title(title: str) -> str:
+    """'The  Hobbit!' and 'the hobbit' are the same book."""
+    title = unicodedata.normalize("NFKC", title).casefold()
+    return " ".join(_NON_WORD.sub(" ", title).split())
+
+
+def normalize_isbn(isbn: str) -> str | None:
+    """ISBN-13 digits for a valid ISBN-10 or ISBN-13, otherwise None.
+
+    Hyphens and spaces are ignored and ISBN-10s are converted, so every
+    way of writing one edition ends up under the same key.
+    """
+    digits = "".join(char for char in isbn if char not in "- ").upper()
+    if len(digits) == 10 and digits[:9].isdigit() and \
+            (digits[9].isdigit() or digits[9] == "X"):
+        total = sum((10 - position) * (10 if char == "X" else int(char))
+                    for position, char in enumerate(digits))
+        if total % 11:
+            return None
+        digits = "978" + digits[:9]
+        return digits + str(-sum(int(char) * (3 if position % 2 else 1)
+                                 for position, char in enumerate(digits)) % 10)
+    if len(digits) == 13 and digits.isdigit():
+        total = sum(int(char) * (3 if position % 2 else 1)
+                    for position, char in enumerate(digits))
+        return digits if total % 10 == 0 else None
+    return None
+
+
+class BranchNetwork:
+    """The catalog and availability index shared by every branch.
+
+    A book is keyed by its ISBN-13 when it has one, otherwise by its
+    normalized title. For each key the network keeps the set of branches
+    that currently have a copy on the shelf; branches update it only when
+    their count for a book moves between zero and non-zero.
+    """
+
+    def __init__(self):
+        self.branches = {}
+        self.titles = {}       # key -> title as first added
+        self._by_title = {}    # normalized title -> set of keys
+        self._available = {}   # key -> set of branch ids with a free copy
+
+    def register(self, inventory):
+        self.branches[inventory.branch_id] = inventory
+
+    def _catalog(self, title: str, isbn: str | None) -> str:
+        key = isbn or normalize_title(title)
+        self.titles.setdefault(key, title)
+        # Every title an ISBN is added under finds it, not just the first.
+        self._by_title.setdefault(normalize_title(title), set()).add(key)
+        return key
+
+    def keys_for(self, book: str) -> set:
+        """All catalog keys a title or ISBN written any which way refers to."""
+        isbn = normalize_isbn(book)
+        if isbn is not None and isbn in self.titles:
+            return {isbn}
+        return self._by_title.get(normalize_title(book), set())
+
+    def _mark(self, key: str, branch_id: str, available: bool):
+        if available:
+            self._available.setdefault(key, set()).add(branch_id)
+        else:
+            branches = self._available.get(key)
+            if branches is not None:
+                branches.discard(branch_id)
+                if not branches:
+                    del self._available[key]
+
+    def branches_with(self, book: str) -> list:
+        """Branch ids with at least one copy of book on the shelf."""
+        found = set()
+        for key in self.keys_for(book):
+            found |= self._available.get(key, set())
+        return sorted(found)
+
+
+class Inventory:
+    """Copy counts for one branch.
+
+    Each key maps to [total, available]. Lookups by title or ISBN go
+    through the network's indexes, so borrowing is a couple of dict reads
+    however many books and branches there are.
+    """
+
+    def __init__(self, branch_id: str, network: BranchNetwork):
+        self.branch_id = branch_id
+        self.network = network
+        self._copies = {}
+        network.register(self)
+
+    def add(self, title: str, isbn: str | None = None, copies: int = 1) -> str:
+        """Add copies and return the catalog key they were filed under."""
+        if copies < 1:
+            raise ValueError("Copies must be at least 1.")
+        if isbn is not None:
+            normalized = normalize_isbn(isbn)
+            if normalized is None:
+                raise ValueError(f"Invalid ISBN: {isbn!r}")
+            isbn = normalized
+        key = self.network._catalog(title, isbn)
+        counts = self._copies.setdefault(key, [0, 0])
+        counts[0] += copies
+        counts[1] += copies
+        if counts[1] == copies:
+            self.network._mark(key, self.branch_id, True)
+        return key
+
+    def _find(self, book: str, available: bool):
+        for key in self.network.keys_for(book):
+            counts = self._copies.get(key)
+            if counts is not None and (
+                    counts[1] > 0 if available else counts[1] < counts[0]):
+                return key
+        return None
+
+    def checkout(self, book: str) -> str | None:
+        """Take one copy off the shelf; the key, or None if none is free."""
+        key = self._find(book, available=True)
+        if key is not None:
+            counts = self._copies[key]
+            counts[1] -= 1
+            if counts[1] == 0:
+                self.network._mark(key, self.branch_id, False)
+        return key
+
+    def checkin(self, book: str) -> str | None:
+        """Put a borrowed copy back; None if none was out."""
+        key = self._find(book, available=False)
+        if key is not None:
+            counts = self._copies[key]
+            counts[1] += 1
+            if counts[1] == 1:
+                self.network._mark(key, self.branch_id, True)
+        return key
+
+    def available(self, book: str) -> int:
+        return sum(self._copies.get(key, (0, 0))[1]
+                   for key in self.network.keys_for(book))
+
+    def items(self):
+        """(title, total, available) for every book this branch holds."""
+        for key, (total, available) in self._copies.items():
+            yield self.network.titles[key], total, available
+
+
+def benchmark(branches: int = 500, titles: int = 2_000,
+              queries: int = 20_000) -> dict:
+    """Compare the index against asking every branch in turn."""
+    network = BranchNetwork()
+    inventories = [Inventory(f"branch_{number}", network)
+                   for number in range(branches)]
+    start = time.perf_counter()
+    for number, inventory in enumerate(inventories):
+        # Each branch stocks a different tenth of the titles.
+        for title in range(number % 10, titles, 10):
+            inventory.add(f"Book {title}", copies=2)
+    load = time.perf_counter() - start
+    names = [f"book {number % titles}" for number in range(queries)]
+
+    start = time.perf_counter()
+    indexed = [network.branches_with(name) for name in names]
+    index_time = time.perf_counter() - start
+    start = time.perf_counter()
+    scanned = [[inventory.branch_id for inventory in inventories
+                if inventory.available(name)] for name in names[:1_000]]
+    scan_time = (time.perf_counter() - start) * queries / 1_000
+    assert [sorted(found) for found in scanned] == indexed[:1_000]
+    return {"copies": branches * titles // 10 * 2,
+            "load_seconds": load,
+            "indexed_per_sec": queries / index_time,
+            "scan_per_sec": queries / scan_time}
+
+
+if __name__ == "__main__":
+    result = benchmark()
+    print(f"Loaded {result['copies']:,} copies "
+          f"in {result['load_seconds']:.2f} s")
+    print(f"Indexed lookups: {result['indexed_per_sec']:,.0f}/sec")
+    print(f"Scanning lookups: {result['scan_per_sec']:,.0f}/sec")
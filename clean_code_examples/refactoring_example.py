@@ -1,19 +1,107 @@
-import random
-import string
+import os
+import json
+import math
+import atexit
+import shutil
 import datetime
+import tempfile
+
+from transfers import TransferEngine, valid_amount
+from ledger import Ledger, to_minor_units
+from account_events import EventLog, EventType, Reason, MONEY_EVENTS
+from bank_service import (BankService, AuthenticationError, FAILED_KIND,
+                          check_password, hash_password)
+from id_generator import IdGenerator
+from inventory import BranchNetwork, Inventory
+from fraud_rules import RulesEngine
 
 # Storage for user data and library books
 bank_users_db = {}
 library_users_db = {}
-library_books_db = {}
+
+# All balance changes go through the engine so they are applied under
+# per-account locks and reach both bank_users_db and the live objects.
+transfer_engine = TransferEngine(bank_users_db)
+# Fraud and velocity rules run before any money moves.
+fraud_rules = RulesEngine()
+bank_service = BankService(bank_users_db, transfer_engine, rules=fraud_rules)
+
+# Durable state, attached by open_bank(): the ledger keeps every balance
+# change and ACCOUNTS_FILE beside it the account details, so accounts and
+# balances both survive a restart.
+DATA_DIR = os.environ.get("TITAN_BANK_DATA", "titan_bank_data")
+ACCOUNTS_FILE = "accounts.json"
+EVENTS_DIR = "events"
+bank_ledger = None
+_scratch_events_dir = None
+
+
+id_generator = IdGenerator()
+# Every Library is a branch of this network: each keeps its own copy
+# counts, and the network knows which branches have a book on the shelf.
+library_network = BranchNetwork()
+library_branches = {}
+
+
+def open_bank(directory: str = DATA_DIR) -> Ledger:
+    """Attach the durable ledger and restore the accounts saved in it."""
+    global bank_ledger
+    bank_ledger = Ledger(directory)
+    bank_service.ledger = bank_ledger
+    path = os.path.join(directory, ACCOUNTS_FILE)
+    if os.path.exists(path):
+        with open(path, encoding="utf-8") as file:
+            for user_id, details in json.load(file).items():
+                bank_users_db[user_id] = dict(
+                    details, balance=bank_ledger.balance(user_id))
+    return bank_ledger
+
+
+def close_bank():
+    global bank_ledger
+    # Spill the events each account still holds in memory.
+    for account in list(transfer_engine.accounts.values()):
+        account.events.close()
+    if bank_ledger is not None:
+        bank_ledger.close()
+        bank_service.ledger = bank_ledger = None
+
+
+def _save_accounts(directory: str):
+    # Everything but the balance, which the ledger owns, and the plain
+    # password, of which only a salted hash is written.
+    for record in bank_users_db.values():
+        if "password_hash" not in record and record.get("password"):
+            record["password_hash"] = hash_password(record["password"])
+    accounts = {user_id: {key: value for key, value in record.items()
+                          if key not in ("balance", "password")}
+                for user_id, record in bank_users_db.items()}
+    path = os.path.join(directory, ACCOUNTS_FILE)
+    with open(path + ".tmp", "w", encoding="utf-8") as file:
+        json.dump(accounts, file)
+    os.replace(path + ".tmp", path)
+
+
+def events_path(user_id: str, ledger=None) -> str:
+    """Where an account's older events spill once its ring is full:
+    beside the ledger, or in a scratch directory for this run without one.
+    """
+    global _scratch_events_dir
+    if ledger is not None:
+        directory = os.path.join(ledger.directory, EVENTS_DIR)
+        os.makedirs(directory, exist_ok=True)
+    else:
+        if _scratch_events_dir is None:
+            _scratch_events_dir = tempfile.mkdtemp(prefix="titan_bank_events_")
+            atexit.register(shutil.rmtree, _scratch_events_dir, True)
+        directory = _scratch_events_dir
+    return os.path.join(directory, f"{user_id}.events")
 
 
-def generate_id(name: str, suffix_length=4) -> str:
-    """Utility to generate a unique ID."""
+def generate_id(name: str) -> str:
+    """Utility to generate a unique ID: the name plus a time-sorted suffix."""
     clean_name = "".join(name.split()).lower()
-    chars = string.ascii_letters + string.digits
-    random_suffix = ''.join(random.choice(chars) for _ in range(suffix_length))
-    return f"{clean_name}_{random_suffix}"
+    return f"{clean_name}_{id_generator.next_id_str()}"
 
 
 class BankAccount:
@@ -26,7 +114,9 @@ class BankAccount:
         address,
         balance=0,
         password=None,
-        user_id=None
+        user_id=None,
+        ledger=None,
+        events=None
     ):
         self.name = name
         self.age = age
@@ -34,9 +124,10 @@ class BankAccount:
         self.number = number
         self.address = address
         self.balance = balance
-        self.transactions = []
-        self.logs = []
         self.created_at = datetime.datetime.now()
+        # Durable store (see ledger.py): the bank's own once open_bank()
+        # has run, otherwise None keeps everything in memory.
+        self.ledger = ledger if ledger is not None else bank_ledger
 
         # If no user_id provided, it's a new account
         if user_id is None:
@@ -46,10 +137,24 @@ class BankAccount:
             self.user_id = user_id
             self._password = password
 
+        # Typed, bounded history; events that no longer fit in memory
+        # spill to disk rather than being dropped.
+        self.events = events if events is not None else EventLog(
+            spill_path=events_path(self.user_id, self.ledger))
+        if self.ledger is not None:
+            # The ledger's balance wins over the one passed in, and a new
+            # account's opening balance becomes its first record.
+            if self.ledger.open_account(self.user_id, self.balance) is None:
+                self.balance = self.ledger.balance(self.user_id)
         self._save_to_db()
+        if self.ledger is not None:
+            _save_accounts(self.ledger.directory)
+        transfer_engine.register(self)
 
     def _save_to_db(self):
-        # Store user data in the dictionary.
+        # Store user data in the dictionary, keeping the saved hash of an
+        # account restored from disk.
+        previous = bank_users_db.get(self.user_id, {})
         bank_users_db[self.user_id] = {
             "name": self.name,
             "age": self.age,
@@ -59,16 +164,38 @@ class BankAccount:
             "password": self._password,
             "balance": self.balance
         }
+        if self._password is None and "password_hash" in previous:
+            bank_users_db[self.user_id]["password_hash"] = \
+                previous["password_hash"]
+
+    @property
+    def transactions(self):
+        return [str(event) for event in self.events.query(
+            kinds=MONEY_EVENTS)]
+
+    @property
+    def logs(self):
+        return [str(event) for event in self.events.query()]
+
+    def record(self, kind: EventType, amount: float = 0,
+               counterparty: str = "", reason: Reason = Reason.NONE):
+        # A rejected NaN or inf is still logged, with no amount.
+        minor_units = to_minor_units(amount) if math.isfinite(amount) else 0
+        self.events.append(kind, minor_units, counterparty, reason)
 
     def show_user(self):
         print(f"USER NAME: {self.name} | Age: {self.age} | "
               f"DOB: {self.dob} | Number: {self.number} | "
               f"Address: {self.address}.")
-        print(f"User ID: {self.user_id} | Password: {self._password}")
+        if self._password is None:
+            # Restored from disk, where only the password's hash is kept.
+            print(f"User ID: {self.user_id}")
+        else:
+            print(f"User ID: {self.user_id} | Password: {self._password}")
 
     # Show the balance of the user.
     def show_balance(self):
-        self.logs.append(f"Balance checked at {datetime.datetime.now()}")
+        self.record(EventType.BALANCE_CHECK)
         print(f"Name: {self.name}")
         print(f"Current Balance: {self.balance}")
 
@@ -86,80 +213,118 @@ class BankAccount:
         print("To deposite you need to Enter the user id and Password.")
         if not self.user_validator():
             print("User validation failed. Cannot proceed with deposit.")
-            self.logs.append(
-                f"FAILED DEPOSIT: Validation failed at "
-                f"{datetime.datetime.now()}"
-            )
+            self.record(EventType.FAILED_DEPOSIT, amount,
+                        reason=Reason.VALIDATION)
             return
-        self.balance += amount
-        timestamp = datetime.datetime.now()
-        msg = f"Deposited {amount} at {timestamp}"
-        self.transactions.append(msg)
-        self.logs.append(msg)
-        self._save_to_db()
+        if not self._valid_amount(EventType.DEPOSIT, amount):
+            return
+        op = self._screen(EventType.DEPOSIT, amount)
+        if op is None:
+            return
+        if not self._settle(op, transfer_engine.deposit(self.user_id,
+                                                        amount)):
+            print("Deposit failed: the account is not registered.")
+            self.record(EventType.FAILED_DEPOSIT, amount,
+                        reason=Reason.VALIDATION)
+            return
+        if self.ledger is not None:
+            self.ledger.deposit(self.user_id, amount)
+        self.record(EventType.DEPOSIT, amount)
         self.show_balance()
 
+    def withdrawl(self, amount: float):
         print("To withdraw you need to Enter the user id and Password.")
         if not self.user_validator():
             print("User validation failed. Cannot proceed with withdrawal.")
-            self.logs.append(
-                f"FAILED WITHDRAWAL: Validation failed at "
-                f"{datetime.datetime.now()}"
-            )
+            self.record(EventType.FAILED_WITHDRAWAL, amount,
+                        reason=Reason.VALIDATION)
+            return
+        if not self._valid_amount(EventType.WITHDRAWAL, amount):
             return
-        if amount > self.balance:
+        op = self._screen(EventType.WITHDRAWAL, amount)
+        if op is None:
+            return
+        if not self._settle(op, transfer_engine.withdraw(self.user_id,
+                                                         amount)):
             print("Insufficient balance.")
-            self.logs.append(
-                f"FAILED WITHDRAWAL: Insufficient funds at "
-                f"{datetime.datetime.now()}"
-                )
+            self.record(EventType.FAILED_WITHDRAWAL, amount,
+                        reason=Reason.INSUFFICIENT_FUNDS)
             return
-        self.balance -= amount
-        msg = f"Withdrew {amount} at {datetime.datetime.now()}"
-        self.transactions.append(msg)
-        self.logs.append(msg)
-        self._save_to_db()
+        if self.ledger is not None:
+            self.ledger.withdraw(self.user_id, amount)
+        self.record(EventType.WITHDRAWAL, amount)
         self.show_balance()
 
     def transfer(self, recipient_user_id: str, amount: float):
         print("To transfer you need to Enter the user id and Password.")
         if not self.user_validator():
             print("User validation failed. Cannot proceed with transfer.")
-            self.logs.append(
-                f"FAILED TRANSFER: Validation failed at "
-                f"{datetime.datetime.now()}"
-                )
+            self.record(EventType.FAILED_TRANSFER, amount,
+                        recipient_user_id, Reason.VALIDATION)
             return
         if recipient_user_id not in bank_users_db:
             print("Recipient user ID does not exist.")
-            self.logs.append(
-                f"FAILED TRANSFER: Recipient {recipient_user_id} "
-                f"not found at {datetime.datetime.now()}"
-                )
+            self.record(EventType.FAILED_TRANSFER, amount,
+                        recipient_user_id, Reason.RECIPIENT_NOT_FOUND)
+            return
+        if recipient_user_id == self.user_id:
+            print("Cannot transfer to your own account.")
+            self.record(EventType.FAILED_TRANSFER, amount,
+                        recipient_user_id, Reason.SELF_TRANSFER)
             return
-        if amount > self.balance:
+        if not self._valid_amount(EventType.TRANSFER_OUT, amount,
+                                  recipient_user_id):
+            return
+        op = self._screen(EventType.TRANSFER_OUT, amount, recipient_user_id)
+        if op is None:
+            return
+        if not self._settle(op, transfer_engine.transfer(
+                self.user_id, recipient_user_id, amount)):
             print("Insufficient balance.")
-            self.logs.append(
-                f"FAILED TRANSFER: Insufficient funds at "
-                f"{datetime.datetime.now()}"
-                )
+            self.record(EventType.FAILED_TRANSFER, amount,
+                        recipient_user_id, Reason.INSUFFICIENT_FUNDS)
             return
-
-        recipient_data = bank_users_db[recipient_user_id]
-        recipient_data['balance'] += amount
-        self.balance -= amount
-
-        msg = (
-            f"Transferred {amount} to {recipient_user_id} at "
-            f"{datetime.datetime.now()}"
-        )
-        self.transactions.append(msg)
-        self.logs.append(msg)
-        self._save_to_db()
+        if self.ledger is not None:
+            self.ledger.transfer(self.user_id, recipient_user_id, amount)
+        self.record(EventType.TRANSFER_OUT, amount, recipient_user_id)
+        recipient = transfer_engine.accounts.get(recipient_user_id)
+        if recipient is not None:
+            recipient.record(EventType.TRANSFER_IN, amount, self.user_id)
 
         print(f"Successfully transferred {amount} to {recipient_user_id}.")
         self.show_balance()
 
+    def _valid_amount(self, kind: EventType, amount: float,
+                      counterparty: str = "") -> bool:
+        if valid_amount(amount):
+            return True
+        print("Amount must be a positive number.")
+        self.record(FAILED_KIND[kind], amount, counterparty,
+                    Reason.INVALID_AMOUNT)
+        return False
+
+    def _screen(self, kind: EventType, amount: float,
+                counterparty: str = ""):
+        # The operation the fraud rules reserved, or None if they refused.
+        op = fraud_rules.operation(kind, self.user_id, amount, counterparty)
+        violations = fraud_rules.check(op)
+        for message in violations:
+            print(f"Blocked: {message}")
+        if violations:
+            self.record(FAILED_KIND[kind], amount, counterparty,
+                        Reason.RULE_VIOLATION)
+            return None
+        return op
+
+    @staticmethod
+    def _settle(op, succeeded: bool) -> bool:
+        # Only an operation that went through counts against the rules.
+        if succeeded:
+            fraud_rules.commit(op)
+        else:
+            fraud_rules.release(op)
+        return succeeded
+
     def user_validator(self):
         print("Validate the user.")
         name = input("Enter the name: ")
@@ -172,7 +337,7 @@ class BankAccount:
         ):
             print("User validated successfully.")
             password = input("Enter the password: ")
-            if password == self._password:
+            if check_password(bank_users_db[self.user_id], password):
                 print("Password validated successfully.")
                 return True
             else:
@@ -207,7 +372,7 @@ class BankAccount:
 # Library System starts from here.
 
 class Library:
-    def __init__(self, name, location, number):
+    def __init__(self, name, location, number, network=None):
         self.name = name
         self.location = location
         self.number = number
@@ -215,6 +380,8 @@ class Library:
         self.books = []
         self.created_at = datetime.datetime.now()
         self.logs = []
+        self.inventory = Inventory(self.user_id, network or library_network)
+        library_branches[self.user_id] = self
 
         # Store user data in the dictionary
         library_users_db[self.user_id] = {
@@ -225,22 +392,21 @@ class Library:
             "logs": self.logs
         }
 
-    def add_book(self, book):
-        if book in library_books_db:
-            library_books_db[book] += 1
-            self.logs.append(
-                f"Added another copy of '{book}' at {datetime.datetime.now()}"
-                )
-        else:
-            self.logs.append(
-                f"Added '{book}' to the library at {datetime.datetime.now()}"
-                )
-            library_books_db[book] = 1
+    def add_book(self, book, isbn=None, copies=1):
+        try:
+            self.inventory.add(book, isbn, copies)
+        except ValueError as error:
+            print(error)
+            return
+        self.logs.append(
+            f"Added {copies} cop{'y' if copies == 1 else 'ies'} of '{book}' "
+            f"at {datetime.datetime.now()}"
+            )
 
     def show_books(self):
         print("Books in the library:")
-        for book, count in library_books_db.items():
-            print(f"{book}: {count}")
+        for title, total, available in self.inventory.items():
+            print(f"{title}: {available} of {total} available")
 
     def show_user(self):
         print(f"Library Name: {self.name} | Location: {self.location}"
@@ -262,17 +428,33 @@ class Library:
                 f"{datetime.datetime.now()}"
                 )
             return
-        if book in library_books_db and library_books_db[book] > 0:
-            library_books_db[book] -= 1
-            self.logs.append(f"Borrowed '{book}' at {datetime.datetime.now()}")
-            self.books.append(book)
-            print(f"You have borrowed '{book}'.")
+        key = self.inventory.checkout(book)
+        if key is not None:
+            title = self.inventory.network.titles[key]
+            self.logs.append(
+                f"Borrowed '{title}' at {datetime.datetime.now()}")
+            self.books.append(title)
+            print(f"You have borrowed '{title}'.")
         else:
             print(f"'{book}' is not available in the library.")
             self.logs.append(
                 f"FAILED BORROW: '{book}' unavailable at "
                 f"{datetime.datetime.now()}"
                 )
+            elsewhere = self.inventory.network.branches_with(book)
+            if elsewhere:
+                print(f"Copies are available at: {', '.join(elsewhere)}")
+
+    def return_book(self, book):
+        key = self.inventory.checkin(book)
+        if key is None:
+            print(f"No borrowed copy of '{book}' belongs to this library.")
+            return
+        title = self.inventory.network.titles[key]
+        if title in self.books:
+            self.books.remove(title)
+        self.logs.append(f"Returned '{title}' at {datetime.datetime.now()}")
+        print(f"'{title}' has been returned.")
 
     def user_validator(self):
         print("Validate the user...")
@@ -292,8 +474,12 @@ class Library:
 
 
 def titan_bank():
-    """Main function to interact with the bank."""
-    def bank_transtion(account):
+    """Main function to interact with the bank.
+
+    A thin client of bank_service: the user logs in once and every menu
+    action is a service call made with the session token.
+    """
+    def bank_transtion(token):
         while True:
             print("\n--- Bank Menu ---")
             print("1. Show Balance")
@@ -304,32 +490,40 @@ def titan_bank():
             print("6. Transfer")
             print("7. Exit")
             action = input("Enter your choice: ")
-            if action == '1':
-                account.show_balance()
-            elif action == '2':
-                account.show_transactions()
-            elif action == '3':
-                account.show_logs()
-            elif action == '4':
-                try:
+            try:
+                if action == '1':
+                    print(f"Current Balance: {bank_service.balance(token)}")
+                elif action == '2':
+                    for transaction in bank_service.transactions(token):
+                        print(transaction)
+                elif action == '3':
+                    for log in bank_service.logs(token):
+                        print(log)
+                elif action == '4':
                     amount = float(input("Enter the amount to deposit: "))
-                    account.deposit(amount)
-                except ValueError:
-                    print("Invalid amount.")
-            elif action == '5':
-                try:
+                    result = bank_service.deposit(token, amount)
+                    print(result['message'])
+                    print(f"Current Balance: {result['balance']}")
+                elif action == '5':
                     amount = float(input("Enter the amount to withdraw: "))
-                    account.withdrawl(amount)
-                except ValueError:
-                    print("Invalid amount.")
-            elif action == '6':
-                recipient_user_id = input("Enter the recipient user ID: ")
-                try:
+                    result = bank_service.withdraw(token, amount)
+                    print(result['message'])
+                    print(f"Current Balance: {result['balance']}")
+                elif action == '6':
+                    recipient_user_id = input(
+                        "Enter the recipient user ID: ")
                     amount = float(input("Enter the amount to transfer: "))
-                    account.transfer(recipient_user_id, amount)
-                except ValueError:
-                    print("Invalid amount.")
-            elif action == '7':
+                    result = bank_service.transfer(
+                        token, recipient_user_id, amount)
+                    print(result['message'])
+                    print(f"Current Balance: {result['balance']}")
+                elif action == '7':
+                    bank_service.logout(token)
+                    return
+            except ValueError:
+                print("Invalid amount.")
+            except AuthenticationError as error:
+                print(error)
                 return
 
     print("Welcome to Titan Bank!")
@@ -350,21 +544,26 @@ def titan_bank():
         address = input("Enter your address: ")
         new_account = BankAccount(name, age, dob, number, address)
         new_account.show_user()
-        bank_transtion(new_account)
+        bank_transtion(
+            bank_service.login(new_account.user_id, new_account._password))
     elif choice == '2':
         user_id = input("Enter your user id: ")
-        if user_id in bank_users_db:
+        password = input("Enter the password: ")
+        token = bank_service.login(user_id, password)
+        if token is None:
+            print("Login failed. Invalid credentials.")
+            return
+        print("Login successful!")
+        account = transfer_engine.accounts.get(user_id)
+        if account is None:
             user_data = bank_users_db[user_id]
             account = BankAccount(
                 user_data['name'], user_data['age'], user_data['dob'],
                 user_data['number'], user_data['address'], user_id=user_id,
-                balance=user_data['balance'], password=user_data['password']
+                balance=user_data['balance'], password=user_data.get('password')
                 )
-            account.user_id = user_id
-            account.show_user()
-            bank_transtion(account)
-        else:
-            print("Login failed. Invalid credentials.")
+        account.show_user()
+        bank_transtion(token)
 
 
 def library_system():
@@ -375,20 +574,25 @@ def library_system():
             print("1. Show Books")
             print("2. Add Book")
             print("3. Borrow Book")
-            print("4. Show User Info")
-            print("5. Exit")
+            print("4. Return Book")
+            print("5. Show User Info")
+            print("6. Exit")
             choice = input("Enter choice: ")
             if choice == '1':
                 lib_obj.show_books()
             elif choice == '2':
                 book_name = input("Enter book name: ")
-                lib_obj.add_book(book_name)
+                isbn = input("Enter ISBN (optional): ").strip() or None
+                lib_obj.add_book(book_name, isbn)
             elif choice == '3':
-                book_name = input("Enter book name to borrow: ")
+                book_name = input("Enter book name or ISBN to borrow: ")
                 lib_obj.borrow_book(book_name)
             elif choice == '4':
-                lib_obj.show_user()
+                book_name = input("Enter book name or ISBN to return: ")
+                lib_obj.return_book(book_name)
             elif choice == '5':
+                lib_obj.show_user()
+            elif choice == '6':
                 break
 
     print("Welcome to the Library System!")
@@ -415,7 +619,8 @@ def library_system():
             library_users_db[user_id]['number'] == number
         ):
             print("Login successful!")
-            library = Library(name, location, number)
+            # Reuse the live branch so its inventory is not lost.
+            library = library_branches[user_id]
             library.show_user()
             library_menu(library)
         else:
@@ -427,6 +632,14 @@ def library_system():
 
 
 def main():
+    open_bank()
+    try:
+        menu()
+    finally:
+        close_bank()
+
+
+def menu():
     while True:
         print("Choose a model to use:")
         print("1. Titan Bank")
@@ -0,0 +1,149 @@
+""" Thread-safe money movement between BankAccounts,
+     every balance change happens under per-account locks taken in a
+       fixed order, so concurrent transfers can neither lose updates
+         nor deadlock."""
+
+import math
+import time
+import random
+import asyncio
+import threading
+
+
+def valid_amount(amount: float) -> bool:
+    """Only positive, finite amounts may move: a NaN or inf from input()
+    or a CSV would otherwise poison a balance for good."""
+    return math.isfinite(amount) and amount > 0
+
+
+class TransferEngine:
+    """Moves money between the records of a bank_users_db style dict.
+
+    Each account has its own lock. A transfer locks both accounts in
+    sorted user_id order, so two transfers in opposite directions always
+    queue on the same lock first instead of each holding one. Live
+    BankAccount objects registered with the engine have their balance
+    updated together with the dict record.
+    """
+
+    def __init__(self, db: dict):
+        self.db = db
+        self.accounts = {}
+        self._locks = {}
+
+    def _lock_for(self, user_id: str) -> threading.Lock:
+        # dict.setdefault is atomic, so racing threads get the same lock.
+        return self._locks.setdefault(user_id, threading.Lock())
+
+    def register(self, account):
+        """Keep account.balance in step with the engine's updates."""
+        self.accounts[account.user_id] = account
+
+    def _set_balance(self, user_id: str, balance: float):
+        self.db[user_id]['balance'] = balance
+        account = self.accounts.get(user_id)
+        if account is not None:
+            account.balance = balance
+
+    def balance(self, user_id: str) -> float:
+        with self._lock_for(user_id):
+            return self.db[user_id]['balance']
+
+    def deposit(self, user_id: str, amount: float) -> bool:
+        if not valid_amount(amount) or user_id not in self.db:
+            return False
+        with self._lock_for(user_id):
+            self._set_balance(user_id, self.db[user_id]['balance'] + amount)
+        return True
+
+    def withdraw(self, user_id: str, amount: float) -> bool:
+        if not valid_amount(amount) or user_id not in self.db:
+            return False
+        with self._lock_for(user_id):
+            balance = self.db[user_id]['balance']
+            if amount > balance:
+                return False
+            self._set_balance(user_id, balance - amount)
+        return True
+
+    def transfer(self, sender_id: str, recipient_id: str,
+                 amount: float) -> bool:
+        """Move amount atomically; False if it cannot be done in full."""
+        if (not valid_amount(amount) or sender_id == recipient_id
+                or sender_id not in self.db or recipient_id not in self.db):
+            return False
+        first, second = sorted((sender_id, recipient_id))
+        with self._lock_for(first), self._lock_for(second):
+            sender_balance = self.db[sender_id]['balance']
+            if amount > sender_balance:
+                return False
+            self._set_balance(sender_id, sender_balance - amount)
+            self._set_balance(recipient_id,
+                              self.db[recipient_id]['balance'] + amount)
+        return True
+
+    # The critical sections are a few dict updates, but a contended lock
+    # would still stall the event loop, so the async API waits in a thread.
+    async def deposit_async(self, user_id: str, amount: float) -> bool:
+        return await asyncio.to_thread(self.deposit, user_id, amount)
+
+    async def withdraw_async(self, user_id: str, amount: float) -> bool:
+        return await asyncio.to_thread(self.withdraw, user_id, amount)
+
+    async def transfer_async(self, sender_id: str, recipient_id: str,
+                             amount: float) -> bool:
+        return await asyncio.to_thread(self.transfer, sender_id,
+                                       recipient_id, amount)
+
+
+def stress_test(accounts: int = 100, threads: int = 16,
+                transfers_per_thread: int = 20_000,
+                opening_balance: int = 1_000) -> dict:
+    """Hammer one engine from many threads and check money is conserved.
+
+    Balances and amounts are whole numbers so the conservation check is
+    exact rather than subject to float rounding.
+    """
+    db = {f"user_{number}": {'balance': opening_balance}
+          for number in range(accounts)}
+    engine = TransferEngine(db)
+    user_ids = list(db)
+    expected_total = opening_balance * accounts
+    completed = [0] * threads
+
+    def worker(slot: int):
+        rng = random.Random(slot)
+        done = 0
+        for _ in range(transfers_per_thread):
+            sender, recipient = rng.sample(user_ids, 2)
+            if engine.transfer(sender, recipient, rng.randint(1, 50)):
+                done += 1
+        completed[slot] = done
+
+    workers = [threading.Thread(target=worker, args=(slot,))
+               for slot in range(threads)]
+    start = time.perf_counter()
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+    elapsed = time.perf_counter() - start
+
+    total = sum(record['balance'] for record in db.values())
+    return {
+        'attempted': threads * transfers_per_thread,
+        'completed': sum(completed),
+        'transfers_per_sec': threads * transfers_per_thread / elapsed,
+        'total_conserved': total == expected_total,
+        'negative_balances': sum(record['balance'] < 0
+                                 for record in db.values()),
+    }
+
+
+if __name__ == "__main__":
+    result = stress_test()
+    print(f"Attempted: {result['attempted']} | "
+          f"Completed: {result['completed']}")
+    print(f"Throughput: {result['transfers_per_sec']:,.0f} transfers/sec")
+    print(f"Total balance conserved: {result['total_conserved']}")
+    print(f"Negative balances: {result['negative_balances']}")
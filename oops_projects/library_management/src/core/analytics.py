@@ -0,0 +1,245 @@
+import heapq
+import threading
+import time
+from collections import Counter, deque
+from datetime import datetime
+from typing import Dict, Hashable, List, Optional, Tuple
+
+from src.models.book import Resource
+from src.repository.storage import data_path, read_rows
+
+
+DAY = 24 * 60 * 60
+DIMENSIONS = ("genre", "category", "location")
+
+
+def parse_time(value: str) -> Optional[float]:
+    """Epoch seconds for an ISO date or date-time, None if empty"""
+    value = (value or "").strip()
+    if not value:
+        return None
+    return datetime.fromisoformat(value).timestamp()
+
+
+# Keeps the k largest counts up to date as counts only ever go up.
+class TopK:
+    def __init__(self, k: int = 10):
+        self.k = k
+        self.members: Dict[Hashable, int] = {}
+        self._heap: List[Tuple[int, Hashable]] = []  # may hold stale entries
+
+    def _clean(self):
+        while self._heap and self.members.get(self._heap[0][1]) != self._heap[0][0]:
+            heapq.heappop(self._heap)
+
+    def update(self, key: Hashable, count: int):
+        """Tell the heap that key's count is now count"""
+        if key in self.members or len(self.members) < self.k:
+            self.members[key] = count
+        else:
+            self._clean()
+            if count <= self._heap[0][0]:
+                return
+            del self.members[heapq.heappop(self._heap)[1]]
+            self.members[key] = count
+        heapq.heappush(self._heap, (count, key))
+        if len(self._heap) > 4 * self.k:
+            self._heap = [(value, member) for member, value in self.members.items()]
+            heapq.heapify(self._heap)
+
+    def items(self) -> List[Tuple[Hashable, int]]:
+        return sorted(self.members.items(), key=lambda item: (-item[1], str(item[0])))
+
+
+# Circulation statistics kept current as checkouts happen, so dashboard
+# queries read pre-aggregated counters instead of scanning loans.
+class CirculationStats:
+    def __init__(self, resources: Optional[Dict[int, Resource]] = None, k: int = 10):
+        self.checkouts: Counter = Counter()            # resource_id -> checkouts
+        self.by_dimension: Dict[str, Counter] = {name: Counter() for name in DIMENSIONS}
+        self.top = TopK(k)
+        self.copies = 0
+        self._meta: Dict[int, Tuple[str, str, str, str]] = {}
+        self._daily_checkouts: Counter = Counter()     # day -> checkouts
+        self._loan_seconds: Counter = Counter()        # day -> seconds on loan, closed loans
+        self._open: Dict[Hashable, deque] = {}         # loan key -> start times
+        self._open_by_day: Dict[int, List[float]] = {} # start day -> [open loans, sum of starts]
+        self._lock = threading.Lock()
+        if resources:
+            self.register(resources)
+
+    def register(self, resources: Dict[int, Resource]):
+        """Add catalog metadata used to group checkouts"""
+        with self._lock:
+            for resource in resources.values():
+                self._meta[resource.id] = (resource.title, resource.genre,
+                                           resource.category, resource.location)
+                if resource.format == 0:
+                    self.copies += resource.total_copies
+
+    # Updates
+    def record_checkout(self, resource_id: int, loan_key: Hashable = None,
+                        when: Optional[float] = None, location: Optional[str] = None):
+        """Count one checkout; loan_key pairs it with its check-in"""
+        when = time.time() if when is None else when
+        title, genre, category, shelf = self._meta.get(resource_id, ("", "", "", ""))
+        with self._lock:
+            count = self.checkouts[resource_id] + 1
+            self.checkouts[resource_id] = count
+            self.top.update(resource_id, count)
+            self.by_dimension["genre"][genre] += 1
+            self.by_dimension["category"][category] += 1
+            self.by_dimension["location"][location or shelf] += 1
+            day = int(when // DAY)
+            self._daily_checkouts[day] += 1
+            self._open.setdefault((resource_id, loan_key), deque()).append(when)
+            bucket = self._open_by_day.setdefault(day, [0, 0.0])
+            bucket[0] += 1
+            bucket[1] += when
+
+    def record_checkin(self, resource_id: int, loan_key: Hashable = None,
+                       when: Optional[float] = None) -> bool:
+        """Close the oldest open loan for this key"""
+        when = time.time() if when is None else when
+        with self._lock:
+            starts = self._open.get((resource_id, loan_key))
+            if not starts:
+                return False
+            start = starts.popleft()
+            if not starts:
+                del self._open[(resource_id, loan_key)]
+            bucket = self._open_by_day[int(start // DAY)]
+            bucket[0] -= 1
+            bucket[1] -= start
+            if bucket[0] == 0:
+                del self._open_by_day[int(start // DAY)]
+            self._add_loan(start, when)
+            return True
+
+    def _add_loan(self, start: float, end: float):
+        # Spread a finished loan over the days it covered.
+        while start < end:
+            day = int(start // DAY)
+            boundary = (day + 1) * DAY
+            self._loan_seconds[day] += min(end, boundary) - start
+            start = boundary
+
+    # Queries
+    def top_titles(self, k: Optional[int] = None) -> List[Tuple[str, int]]:
+        """Most-borrowed titles, most first"""
+        with self._lock:
+            if k is None or k <= self.top.k:
+                ranked = self.top.items()[:k]
+            else:  # Deeper than the maintained heap: fall back to a scan.
+                ranked = heapq.nlargest(k, self.checkouts.items(), key=lambda item: item[1])
+        return [(self._meta.get(resource_id, (str(resource_id),))[0], count)
+                for resource_id, count in ranked]
+
+    def circulation_by(self, dimension: str, k: Optional[int] = None) -> List[Tuple[str, int]]:
+        """Checkouts per genre, category or location"""
+        if dimension not in self.by_dimension:
+            raise ValueError(f"Unknown dimension: {dimension}")
+        with self._lock:
+            return self.by_dimension[dimension].most_common(k)
+
+    def checkouts_in(self, days: int, now: Optional[float] = None) -> int:
+        """Checkouts during the last `days` calendar days"""
+        today = int((time.time() if now is None else now) // DAY)
+        with self._lock:
+            return sum(self._daily_checkouts.get(day, 0)
+                       for day in range(today - days + 1, today + 1))
+
+    def utilization(self, days: int, now: Optional[float] = None) -> float:
+        """Share of copy-time spent on loan over the last `days` days"""
+        now = time.time() if now is None else now
+        first_day = int(now // DAY) - days + 1
+        window_start = first_day * DAY
+        with self._lock:
+            if not self.copies:
+                return 0.0
+            busy = sum(self._loan_seconds.get(day, 0)
+                       for day in range(first_day, first_day + days))
+            for day, (count, start_sum) in self._open_by_day.items():
+                if day < first_day:
+                    busy += count * (now - window_start)
+                else:
+                    busy += count * now - start_sum
+            return busy / (self.copies * (now - window_start))
+
+    # Batch
+    @classmethod
+    def from_transactions(cls, resources: Dict[int, Resource], path: Optional[str] = None,
+                          k: int = 10) -> "CirculationStats":
+        """Rebuild everything from transactions.csv"""
+        stats = cls(resources, k)
+        for row in read_rows(path or data_path("transactions.csv")):
+            try:
+                resource_id = int(row["resource_id"])
+                issued = parse_time(row["issue_date"])
+                returned = parse_time(row["return_date"])
+            except (KeyError, ValueError):
+                continue
+            if issued is None:
+                continue
+            stats.record_checkout(resource_id, row["transaction_id"], issued)
+            if returned is not None:
+                stats.record_checkin(resource_id, row["transaction_id"], returned)
+        return stats
+
+
+def benchmark(checkouts: int = 200_000, queries: int = 10_000) -> Dict[str, float]:
+    import csv
+    import os
+    import random
+    import tempfile
+    from src.repository.storage import load_resources
+
+    resources = load_resources()
+    ids = list(resources)
+    rng = random.Random(1)
+    now = time.time()
+    rows = []
+    for number in range(checkouts):
+        issued = now - rng.uniform(0, 365 * DAY)
+        returned = issued + rng.uniform(DAY, 21 * DAY)
+        rows.append((number, f"user_{rng.randrange(5000)}", rng.choice(ids),
+                     datetime.fromtimestamp(issued).isoformat(" ", "seconds"),
+                     "", "" if returned > now else
+                     datetime.fromtimestamp(returned).isoformat(" ", "seconds"), ""))
+
+    stats = CirculationStats(resources)
+    start = time.perf_counter()
+    for number, _, resource_id, issued, _, returned, _ in rows:
+        stats.record_checkout(resource_id, number, parse_time(issued))
+        if returned:
+            stats.record_checkin(resource_id, number, parse_time(returned))
+    incremental = checkouts / (time.perf_counter() - start)
+
+    start = time.perf_counter()
+    for _ in range(queries):
+        stats.top_titles(10)
+        stats.circulation_by("genre", 5)
+        stats.utilization(30)
+    query_us = (time.perf_counter() - start) / queries * 1e6
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "transactions.csv")
+        with open(path, "w", newline="", encoding="utf-8") as file:
+            writer = csv.writer(file)
+            writer.writerow(("transaction_id", "user_id", "resource_id", "issue_date",
+                             "due_date", "return_date", "status"))
+            writer.writerows(rows)
+        start = time.perf_counter()
+        rebuilt = CirculationStats.from_transactions(resources, path)
+        batch = time.perf_counter() - start
+    assert rebuilt.top_titles() == stats.top_titles()
+    return {"checkouts_per_sec": incremental, "dashboard_query_us": query_us,
+            "batch_seconds": batch}
+
+
+if __name__ == "__main__":
+    result = benchmark()
+    print(f"Incremental: {result['checkouts_per_sec']:,.0f} checkouts/sec")
+    print(f"Dashboard query (top 10 + genres + 30-day utilization): "
+          f"{result['dashboard_query_us']:.1f} µs")
+    print(f"Batch recompute from CSV: {result['batch_seconds']:.2f} s")
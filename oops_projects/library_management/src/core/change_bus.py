@@ -0,0 +1,287 @@
+import contextlib
+import json
+import os
+import queue
+import threading
+import time
+from typing import Any, Callable, Dict, FrozenSet, Iterable, Iterator, List, Optional, Tuple
+
+from src.models.events import ChangeEvent, ChangeType, change_listeners
+
+
+Subscriber = Callable[[List[ChangeEvent]], None]
+_STOP = object()
+
+
+# Delivers the models' change events to subscribers in batches on a
+# background thread. Publishing never runs subscriber code; when the queue
+# is full the publisher waits for the dispatcher (back-pressure), or the
+# event is dropped and counted if the bus was made with block=False.
+class ChangeBus:
+    def __init__(self, capacity: int = 10_000, batch_size: int = 500, block: bool = True):
+        self.batch_size = batch_size
+        self.block = block
+        self._queue: queue.Queue = queue.Queue(capacity)
+        self._subscribers: List[Tuple[Subscriber, Optional[FrozenSet[ChangeType]]]] = []
+        self._thread: Optional[threading.Thread] = None
+        self._stats_lock = threading.Lock()
+        self.published = 0
+        self.dropped = 0
+        self.delivered = 0
+        self.batches = 0
+        self.errors = 0
+        self.blocked_seconds = 0.0
+
+    def subscribe(self, handler: Subscriber, types: Optional[Iterable[ChangeType]] = None):
+        """handler(events) gets every batch, or only the events of the given types"""
+        self._subscribers.append((handler, frozenset(types) if types is not None else None))
+
+    def unsubscribe(self, handler: Subscriber):
+        self._subscribers = [item for item in self._subscribers if item[0] is not handler]
+
+    # Publishing
+    def publish(self, event: ChangeEvent) -> bool:
+        if self._thread is None and self._queue.full():
+            self.drain()  # nobody else will make room
+        waited = 0.0
+        try:
+            self._queue.put_nowait(event)
+        except queue.Full:
+            if not self.block:
+                with self._stats_lock:
+                    self.dropped += 1
+                return False
+            start = time.perf_counter()
+            self._queue.put(event)
+            waited = time.perf_counter() - start
+        with self._stats_lock:
+            self.published += 1
+            self.blocked_seconds += waited
+        return True
+
+    def attach(self):
+        """Receive every change the models publish"""
+        change_listeners.append(self.publish)
+
+    def detach(self):
+        if self.publish in change_listeners:
+            change_listeners.remove(self.publish)
+
+    # Delivery
+    def _take_batch(self, first: Any) -> List[Any]:
+        # Whatever is already queued rides along, so batches grow with load.
+        batch = [first]
+        while len(batch) < self.batch_size:
+            try:
+                batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _deliver(self, batch: List[Any]):
+        events = [event for event in batch if event is not _STOP]
+        if events:
+            for handler, types in self._subscribers:
+                selected = events if types is None else [event for event in events if event.type in types]
+                if not selected:
+                    continue
+                try:
+                    handler(selected)
+                except Exception as e:
+                    self.errors += 1
+                    print(f"⚠️ Change subscriber {getattr(handler, '__name__', type(handler).__name__)} failed: {e}")
+            self.delivered += len(events)
+            self.batches += 1
+        for _ in batch:
+            self._queue.task_done()
+
+    def _run(self):
+        while True:
+            batch = self._take_batch(self._queue.get())
+            self._deliver(batch)
+            if any(event is _STOP for event in batch):
+                return
+
+    def drain(self):
+        """Deliver everything queued on the calling thread"""
+        while True:
+            try:
+                first = self._queue.get_nowait()
+            except queue.Empty:
+                return
+            self._deliver(self._take_batch(first))
+
+    def flush(self):
+        """Wait until every published event has reached the subscribers"""
+        if self._thread is None:
+            self.drain()
+        else:
+            self._queue.join()
+
+    def start(self) -> "ChangeBus":
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="change-bus", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        if self._thread is not None:
+            self._queue.put(_STOP)
+            self._thread.join()
+            self._thread = None
+        self.drain()
+
+    def __enter__(self):
+        self.attach()
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.detach()
+        self.stop()
+
+    def stats(self) -> Dict[str, float]:
+        return {"published": self.published, "delivered": self.delivered, "dropped": self.dropped,
+                "batches": self.batches, "errors": self.errors, "queued": self._queue.qsize(),
+                "mean_batch": self.delivered / self.batches if self.batches else 0.0,
+                "blocked_seconds": self.blocked_seconds}
+
+
+# Index maintenance, e.g. IndexSubscriber(catalog, columnar). The bus thread
+# only collects the changed resources; the thread that queries the indexes
+# applies them with apply(), so a query never sees an index mid-update. Each
+# resource is re-indexed once per apply(), however many times it changed.
+class IndexSubscriber:
+    def __init__(self, *indexes):
+        self.indexes = indexes
+        self._pending: Dict[int, Any] = {}
+        self._lock = threading.Lock()
+
+    def __call__(self, events: List[ChangeEvent]):
+        with self._lock:
+            for event in events:
+                if event.resource is not None:
+                    self._pending[event.resource_id] = event.resource
+
+    def apply(self) -> int:
+        """Re-index the resources changed since the last call; returns how many"""
+        with self._lock:
+            changed, self._pending = self._pending, {}
+        for index in self.indexes:
+            for resource in changed.values():
+                index.update(resource)
+        return len(changed)
+
+
+# Persistence: appends every event to a JSON-lines change log, one write per batch.
+class JournalSubscriber:
+    def __init__(self, path: str, fsync: bool = False):
+        self.path = path
+        self.fsync = fsync
+        self._file = open(path, "a", encoding="utf-8")
+
+    def __call__(self, events: List[ChangeEvent]):
+        self._file.write("".join(json.dumps(event.to_dict(), default=str) + "\n" for event in events))
+        self._file.flush()
+        if self.fsync:
+            os.fsync(self._file.fileno())
+
+    def close(self):
+        self._file.close()
+
+
+def read_journal(path: str) -> Iterator[ChangeEvent]:
+    """Replay a change log written by JournalSubscriber"""
+    with open(path, encoding="utf-8") as file:
+        for line in file:
+            if line.strip():
+                yield ChangeEvent.from_dict(json.loads(line))
+
+
+# Analytics: feeds checkouts and check-ins to a CirculationStats, with the
+# time they happened rather than the time the batch arrived.
+class AnalyticsSubscriber:
+    types = (ChangeType.CHECK_OUT, ChangeType.CHECK_IN)
+
+    def __init__(self, stats):
+        self.stats = stats
+
+    def __call__(self, events: List[ChangeEvent]):
+        for event in events:
+            if event.type is ChangeType.CHECK_OUT:
+                self.stats.record_checkout(event.resource_id, event.copy_id, event.timestamp)
+            elif event.type is ChangeType.CHECK_IN:
+                self.stats.record_checkin(event.resource_id, event.copy_id, event.timestamp)
+
+
+# Recommendations: pairs each checkout with the borrower's recent checkouts.
+class CoBorrowSubscriber:
+    types = (ChangeType.CHECK_OUT,)
+
+    def __init__(self, model):
+        self.model = model
+
+    def __call__(self, events: List[ChangeEvent]):
+        for event in events:
+            if event.user_id:
+                self.model.record(event.user_id, event.resource_id)
+
+
+def _mutate(resources: List[Any], changes: int, sync: Callable[[], Any], every: int):
+    # A circulation-heavy mix: mostly checkouts and returns, some shelving,
+    # bringing the indexes up to date every `every` changes.
+    for number in range(changes):
+        resource = resources[number % len(resources)]
+        if number % 10 == 9:
+            resource.set_location(f"Z{number % 7}-1-1")
+        elif resource.get_available_copies():
+            resource.check_out(f"user_{number % 1000}")
+        else:
+            resource.check_in(resource.physical_copies[0].copy_id)
+        if number % every == every - 1:
+            sync()
+
+
+def benchmark(changes: int = 100_000) -> Dict[str, Dict[str, float]]:
+    """Mutations per second with the indexes maintained per event versus by the bus"""
+    import tempfile
+
+    from src.core.analytics import CirculationStats
+    from src.core.columnar import ColumnarCatalog
+    from src.core.engine import Catalog
+    from src.repository.storage import load_resources
+
+    results = {}
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull), \
+            tempfile.TemporaryDirectory() as directory:
+        for mode in ("per_event", "bus"):
+            resources = load_resources()
+            live = [resource for resource in resources.values() if resource.format == 0]
+            catalog, columnar = Catalog(resources.values()), ColumnarCatalog.from_resources(resources)
+            journal = JournalSubscriber(os.path.join(directory, f"{mode}.log"))
+            bus = ChangeBus()
+            indexer = IndexSubscriber(catalog, columnar)
+            bus.subscribe(indexer)
+            bus.subscribe(journal)
+            bus.subscribe(AnalyticsSubscriber(CirculationStats(resources)), AnalyticsSubscriber.types)
+            if mode == "per_event":
+                bus.batch_size = 1
+            start = time.perf_counter()
+            with bus:
+                if mode == "per_event":
+                    _mutate(live, changes, lambda: (bus.flush(), indexer.apply()), 1)
+                else:
+                    _mutate(live, changes, indexer.apply, 500)
+                bus.flush()
+                indexer.apply()
+            seconds = time.perf_counter() - start
+            journal.close()
+            assert catalog.count(f"location = 'Z{(changes - 1) % 7}-1-1'") > 0 or changes < 10
+            results[mode] = dict(bus.stats(), changes_per_sec=changes / seconds)
+    return results
+
+
+if __name__ == "__main__":
+    for mode, result in benchmark().items():
+        print(f"{mode:>9}: {result['changes_per_sec']:,.0f} changes/sec | "
+              f"{result['batches']:,} batches (mean {result['mean_batch']:.1f} events) | "
+              f"blocked {result['blocked_seconds']:.2f} s | errors {result['errors']}")
@@ -0,0 +1,107 @@
+from collections import deque
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from src.core.engine import Catalog, parse_query
+from src.models.book import Resource
+
+
+REQUESTS = {"lookup", "check_out", "check_in", "place_hold", "cancel_hold", "search", "count"}
+
+
+def resource_summary(resource: Resource) -> Dict[str, Any]:
+    data = resource.to_dict()
+    data['available'] = resource.copies_available()
+    return data
+
+
+# Checkouts, check-ins, holds and search over one set of resources, with
+# plain dict results so it can sit behind a pipe or a socket.
+#
+# Holds are first come, first served: while anyone is waiting, a copy can
+# only go to the first user in the queue, unless there are more copies on
+# the shelf than people waiting.
+class CirculationDesk:
+    def __init__(self, resources: Dict[int, Resource]):
+        self.resources = resources
+        self.catalog = Catalog(resources.values())
+        self.holds: Dict[int, deque] = {}
+
+    def __len__(self):
+        return len(self.resources)
+
+    def lookup(self, resource_id: int) -> Optional[Dict[str, Any]]:
+        resource = self.resources.get(resource_id)
+        if resource is None:
+            return None
+        data = resource_summary(resource)
+        data['holds'] = len(self.holds.get(resource_id, ()))
+        return data
+
+    def check_out(self, resource_id: int, user_id: str) -> Dict[str, Any]:
+        resource = self.resources.get(resource_id)
+        if resource is None:
+            return {'ok': False, 'error': f"Resource {resource_id} not found"}
+        waiting = self.holds.get(resource_id)
+        if waiting and user_id != waiting[0] and resource.copies_available() <= len(waiting):
+            return {'ok': False, 'error': "Copies are held for other users"}
+        result = resource.check_out(user_id)
+        if not result:
+            return {'ok': False, 'error': f"No copies of '{resource.title}' are available"}
+        self.catalog.update(resource)
+        if waiting and user_id in waiting:
+            waiting.remove(user_id)
+            if not waiting:
+                del self.holds[resource_id]
+        return {'ok': True, 'copy_id': result if isinstance(result, str) else None,
+                'available': resource.copies_available()}
+
+    def check_in(self, resource_id: int, copy_id: Optional[str] = None) -> Dict[str, Any]:
+        resource = self.resources.get(resource_id)
+        if resource is None:
+            return {'ok': False, 'error': f"Resource {resource_id} not found"}
+        if not resource.check_in(copy_id):
+            return {'ok': False, 'error': f"Copy {copy_id} is not checked out"}
+        self.catalog.update(resource)
+        waiting = self.holds.get(resource_id)
+        return {'ok': True, 'available': resource.copies_available(),
+                'next_hold': waiting[0] if waiting else None}
+
+    def place_hold(self, resource_id: int, user_id: str) -> Dict[str, Any]:
+        if resource_id not in self.resources:
+            return {'ok': False, 'error': f"Resource {resource_id} not found"}
+        waiting = self.holds.setdefault(resource_id, deque())
+        if user_id not in waiting:
+            waiting.append(user_id)
+        return {'ok': True, 'position': waiting.index(user_id) + 1}
+
+    def cancel_hold(self, resource_id: int, user_id: str) -> Dict[str, Any]:
+        waiting = self.holds.get(resource_id)
+        if not waiting or user_id not in waiting:
+            return {'ok': False, 'error': f"{user_id} has no hold on {resource_id}"}
+        waiting.remove(user_id)
+        if not waiting:
+            del self.holds[resource_id]
+        return {'ok': True}
+
+    def iter_search(self, query) -> Iterator[Dict[str, Any]]:
+        """Matching resources in the query's order, each made a dict as it is read"""
+        if isinstance(query, str):
+            query = parse_query(query)
+        return map(resource_summary, self.catalog.execute(query))
+
+    def search(self, query) -> List[Dict[str, Any]]:
+        """Matching resources as dicts, in the query's order"""
+        return list(self.iter_search(query))
+
+    def count(self, query) -> int:
+        return self.catalog.count(query)
+
+    def handle(self, method: str, args: Iterable[Any]) -> Any:
+        """Run one request by name, as sent over a pipe or the network"""
+        if method not in REQUESTS:
+            raise ValueError(f"Unknown request: {method}")
+        return getattr(self, method)(*args)
+
+    def batch(self, requests: List[Tuple[str, tuple]]) -> List[Any]:
+        """Results of many (method, args) requests, in order"""
+        return [self.handle(method, args) for method, args in requests]
@@ -0,0 +1,408 @@
+import json
+import operator
+import struct
+import sys
+import time
+from array import array
+from bisect import bisect_left
+from collections import Counter
+from itertools import accumulate, compress, islice
+from typing import Any, Dict, List, Optional, Tuple
+
+from src.models.book import Resource
+
+try:
+    import numpy as np
+except ImportError:  # Aggregates fall back to loops over the arrays.
+    np = None
+
+
+NUMERIC_FIELDS = ("id", "pages", "type", "format", "condition", "status", "copies", "total_copies")
+ENCODED_FIELDS = ("genre", "publisher", "language", "category", "location")
+TEXT_FIELDS = ("title", "author", "isbn", "publication_date")
+AGGREGATES = ("count", "sum", "min", "max", "mean")
+
+# magic, version, header length; a JSON header and the columns follow
+SNAPSHOT_HEADER = struct.Struct("<4sII")
+SNAPSHOT_MAGIC = b"CCAT"
+SNAPSHOT_VERSION = 1
+
+
+# Strings stored once, rows hold small integer codes.
+class DictionaryColumn:
+    def __init__(self, values: Optional[List[str]] = None, codes=None):
+        self.values: List[str] = values or []
+        self.index: Dict[str, int] = {value: code for code, value in enumerate(self.values)}
+        self.codes = array("i") if codes is None else codes
+
+    def encode(self, value: str) -> int:
+        code = self.index.get(value)
+        if code is None:
+            code = self.index[value] = len(self.values)
+            self.values.append(value)
+        return code
+
+    def append(self, value: str):
+        self.codes.append(self.encode(value))
+
+    def __getitem__(self, row: int) -> str:
+        return self.values[self.codes[row]]
+
+
+# Free text: a list of strings while writable, and in a snapshot one UTF-8
+# buffer with row boundaries in an offsets array.
+class TextColumn:
+    def __init__(self, values: Optional[List[str]] = None, offsets=None, data=None):
+        self.values: Optional[List[str]] = values if offsets is None else None
+        if self.values is None and offsets is None:
+            self.values = []
+        self.offsets = offsets
+        self.data = data
+
+    def append(self, value: str):
+        self.values.append(value)
+
+    def __setitem__(self, row: int, value: str):
+        self.values[row] = value
+
+    def __getitem__(self, row: int) -> str:
+        if self.values is not None:
+            return self.values[row]
+        return str(self.data[self.offsets[row]:self.offsets[row + 1]], "utf-8")
+
+    def pack(self) -> Tuple[array, bytes]:
+        """(offsets, data) for a snapshot"""
+        text = "".join(self.values)
+        data = text.encode()
+        # ASCII text has as many bytes as characters, so lengths come from len().
+        lengths = map(len, self.values) if len(data) == len(text) else \
+            (len(value.encode()) for value in self.values)
+        return array("q", accumulate(lengths, initial=0)), data
+
+
+# The catalog as typed columns: one array per numeric field and one
+# dictionary-encoded column per repetitive string field.
+class ColumnarCatalog:
+    def __init__(self, text_fields: Tuple[str, ...] = TEXT_FIELDS):
+        self.numeric: Dict[str, Any] = {field: array("q") for field in NUMERIC_FIELDS}
+        self.encoded: Dict[str, DictionaryColumn] = {field: DictionaryColumn() for field in ENCODED_FIELDS}
+        self.text: Dict[str, TextColumn] = {field: TextColumn() for field in text_fields}
+        self.live = array("b")            # 0 for rows of removed resources
+        self.row_of: Dict[int, int] = {}
+        self.dead = 0
+        self.read_only = False
+        self.meta: Dict[str, Any] = {}
+        self._by_id = None                # snapshot rows in id order, for row_for()
+        self._ordered = False             # snapshot rows already in id order
+
+    def __len__(self):
+        return len(self.live) - self.dead
+
+    # Keeping in sync with the object model
+    @classmethod
+    def from_resources(cls, resources: Dict[int, Resource]) -> "ColumnarCatalog":
+        catalog = cls()
+        for resource in resources.values():
+            catalog.add(resource)
+        return catalog
+
+    def _writable(self):
+        if self.read_only:
+            raise TypeError("This catalog is a read-only snapshot")
+
+    def add(self, resource: Resource):
+        self._writable()
+        if resource.id in self.row_of:
+            self.update(resource)
+            return
+        self.row_of[resource.id] = len(self.live)
+        for field, column in self.numeric.items():
+            column.append(int(getattr(resource, field)))
+        for field, column in self.encoded.items():
+            column.append(getattr(resource, field) or "")
+        for field, column in self.text.items():
+            column.append(getattr(resource, field) or "")
+        self.live.append(1)
+
+    def update(self, resource: Resource):
+        """Overwrite a resource's row in place"""
+        self._writable()
+        row = self.row_of.get(resource.id)
+        if row is None:
+            self.add(resource)
+            return
+        for field, column in self.numeric.items():
+            column[row] = int(getattr(resource, field))
+        for field, column in self.encoded.items():
+            column.codes[row] = column.encode(getattr(resource, field) or "")
+        for field, column in self.text.items():
+            column[row] = getattr(resource, field) or ""
+
+    def remove(self, resource_id: int):
+        self._writable()
+        row = self.row_of.pop(resource_id, None)
+        if row is not None:
+            self.live[row] = 0
+            self.dead += 1
+
+    # Aggregation
+    def _keys(self, field: str) -> Tuple[Any, Optional[List[str]]]:
+        if field in self.encoded:
+            return self.encoded[field].codes, self.encoded[field].values
+        if field in self.numeric:
+            return self.numeric[field], None
+        raise ValueError(f"Unknown column: {field}")
+
+    def aggregate(self, measure: str, function: str = "sum") -> float:
+        """One aggregate over all live rows"""
+        return self.group_by(None, {measure: function}).get(None, {}).get(measure, 0)
+
+    def group_by(self, key: Optional[str], measures: Dict[str, str]) -> Dict[Any, Dict[str, float]]:
+        """{group: {measure: aggregate}}, e.g. group_by("genre", {"pages": "sum"})"""
+        for measure, function in measures.items():
+            if function not in AGGREGATES:
+                raise ValueError(f"Unknown aggregate: {function}")
+            if function != "count" and measure not in self.numeric:
+                raise ValueError(f"Cannot {function} column {measure}")
+        if key is None:
+            keys, labels = None, None
+        else:
+            keys, labels = self._keys(key)
+        if np is not None:
+            result = self._group_by_numpy(keys, labels is not None, measures)
+        else:
+            result = self._group_by_python(keys, measures)
+        if labels is not None:
+            result = {labels[group]: values for group, values in result.items()}
+        return result
+
+    def _group_by_numpy(self, keys, encoded: bool, measures) -> Dict[Any, Dict[str, float]]:
+        live = np.frombuffer(self.live, dtype=np.int8).astype(bool) if self.dead else None
+        if keys is None:
+            inverse = np.zeros(len(self.live), dtype=np.intp)
+            groups = [None]
+        elif encoded:
+            inverse = np.frombuffer(keys, dtype=np.int32)
+            groups = list(range(int(inverse.max()) + 1 if len(inverse) else 0))
+        else:
+            inverse = np.frombuffer(keys, dtype=np.int64)
+            low = int(inverse.min()) if len(inverse) else 0
+            high = int(inverse.max()) if len(inverse) else -1
+            if high - low <= max(len(inverse), 1 << 16):
+                # Small integer keys (condition, type, ...) index bins directly,
+                # avoiding the sort inside np.unique.
+                inverse = inverse - low if low else inverse
+                groups = list(range(low, high + 1))
+            else:
+                groups, inverse = np.unique(inverse, return_inverse=True)
+                groups = groups.tolist()
+        if self.dead:
+            inverse = inverse[live]
+        counts = np.bincount(inverse, minlength=len(groups))
+        columns = {}
+        for measure, function in measures.items():
+            if function == "count":
+                columns[measure] = counts
+                continue
+            values = np.frombuffer(self.numeric[measure], dtype=np.int64)
+            if self.dead:
+                values = values[live]
+            if function in ("sum", "mean"):
+                sums = np.bincount(inverse, weights=values, minlength=len(groups))
+                columns[measure] = np.rint(sums).astype(np.int64) if function == "sum" \
+                    else sums / np.maximum(counts, 1)
+            else:
+                start = np.iinfo(np.int64).max if function == "min" else np.iinfo(np.int64).min
+                out = np.full(len(groups), start, dtype=np.int64)
+                (np.minimum if function == "min" else np.maximum).at(out, inverse, values)
+                columns[measure] = out
+        result = {}
+        for position, group in enumerate(groups):
+            if counts[position]:
+                result[group] = {measure: column[position].item() for measure, column in columns.items()}
+        return result
+
+    def _group_by_python(self, keys, measures) -> Dict[Any, Dict[str, float]]:
+        rows = len(self.live)
+        live = self.live if self.dead else None
+        whole = keys is None
+        if whole:
+            keys = bytes(rows)  # every row in group 0
+        counts = Counter(keys if live is None else (key for key, alive in zip(keys, live) if alive))
+        result = {group: {} for group in counts}
+        for measure, function in measures.items():
+            if function == "count":
+                for group, count in counts.items():
+                    result[group][measure] = count
+                continue
+            values = self.numeric[measure]
+            pairs = zip(keys, values) if live is None else \
+                ((key, value) for key, value, alive in zip(keys, values, live) if alive)
+            totals: Dict[Any, int] = {}
+            if function in ("sum", "mean"):
+                for group, value in pairs:
+                    totals[group] = totals.get(group, 0) + value
+                if function == "mean":
+                    totals = {group: total / counts[group] for group, total in totals.items()}
+            else:
+                pick = min if function == "min" else max
+                for group, value in pairs:
+                    totals[group] = pick(totals.get(group, value), value)
+            for group, total in totals.items():
+                result[group][measure] = total
+        if whole:
+            result = {None: result.get(0, {})}
+        return result
+
+    # Snapshots
+    def snapshot(self, meta: Optional[Dict[str, Any]] = None) -> bytes:
+        """The whole catalog as one buffer that from_snapshot maps without copying"""
+        columns = [(field, self.numeric[field]) for field in NUMERIC_FIELDS]
+        columns += [(f"{field}.codes", self.encoded[field].codes) for field in ENCODED_FIELDS]
+        for field, column in self.text.items():
+            offsets, data = column.pack()
+            columns += [(f"{field}.offsets", offsets), (f"{field}.data", array("B", data))]
+        columns.append(("live", self.live))
+        # Rows loaded in id order can be searched by id directly; otherwise
+        # store the row numbers in id order.
+        ids = self.numeric["id"]
+        ordered = all(map(operator.lt, ids, islice(ids, 1, None)))
+        if not ordered:
+            columns.append(("by_id", array("q", sorted(compress(range(len(self.live)), self.live),
+                                                       key=ids.__getitem__))))
+        layout, offset = [], 0
+        for name, column in columns:
+            size = len(column) * column.itemsize
+            layout.append([name, column.typecode, offset, len(column)])
+            offset += (size + 7) // 8 * 8
+        header = json.dumps({"rows": len(self.live), "dead": self.dead, "columns": layout,
+                             "ordered": ordered, "meta": meta or {},
+                             "dictionaries": {field: self.encoded[field].values
+                                              for field in ENCODED_FIELDS}}).encode()
+        header += b" " * (-(SNAPSHOT_HEADER.size + len(header)) % 8)
+        parts = [SNAPSHOT_HEADER.pack(SNAPSHOT_MAGIC, SNAPSHOT_VERSION, len(header)), header]
+        for _, column in columns:
+            data = column.tobytes()
+            parts += [data, bytes(-len(data) % 8)]
+        return b"".join(parts)
+
+    @classmethod
+    def from_snapshot(cls, buffer) -> "ColumnarCatalog":
+        """A read-only catalog whose columns are views into buffer"""
+        view = memoryview(buffer)
+        magic, version, header_size = SNAPSHOT_HEADER.unpack_from(view)
+        if magic != SNAPSHOT_MAGIC or version != SNAPSHOT_VERSION:
+            raise ValueError("Not a columnar catalog snapshot")
+        start = SNAPSHOT_HEADER.size
+        header = json.loads(bytes(view[start:start + header_size]))
+        start += header_size
+        columns = {name: view[start + offset:start + offset + count * array(typecode).itemsize].cast(typecode)
+                   for name, typecode, offset, count in header["columns"]}
+        catalog = cls()
+        catalog.numeric = {field: columns[field] for field in NUMERIC_FIELDS}
+        catalog.encoded = {field: DictionaryColumn(header["dictionaries"][field], columns[f"{field}.codes"])
+                           for field in ENCODED_FIELDS}
+        catalog.text = {field: TextColumn(offsets=columns[f"{field}.offsets"], data=columns[f"{field}.data"])
+                        for field in TEXT_FIELDS if f"{field}.offsets" in columns}
+        catalog.live = columns["live"]
+        catalog.dead = header["dead"]
+        catalog.meta = header.get("meta", {})
+        catalog._by_id = columns.get("by_id")
+        catalog._ordered = header.get("ordered", False)
+        catalog.row_of = None  # built by row_for() on first use without by_id
+        catalog.read_only = True
+        catalog._views = list(columns.values())
+        return catalog
+
+    def release(self):
+        """Let go of a snapshot's buffer; the catalog is unusable afterwards"""
+        for view in getattr(self, "_views", ()):
+            view.release()
+        self._views = []
+
+    def row_for(self, resource_id: int) -> Optional[int]:
+        """Row number of a resource, None if it is not in the catalog"""
+        if self.row_of is None and self._ordered:
+            ids = self.numeric["id"]
+            row = bisect_left(ids, resource_id)
+            return row if row < len(ids) and ids[row] == resource_id and self.live[row] else None
+        if self.row_of is None and self._by_id is not None:
+            ids = self.numeric["id"]
+            position = bisect_left(self._by_id, resource_id, key=ids.__getitem__)
+            if position < len(self._by_id) and ids[self._by_id[position]] == resource_id:
+                row = self._by_id[position]
+                return row if self.live[row] else None
+            return None
+        if self.row_of is None:
+            ids, live = self.numeric["id"], self.live
+            self.row_of = {ids[row]: row for row in range(len(live)) if live[row]}
+        return self.row_of.get(resource_id)
+
+    def record(self, row: int) -> Dict[str, Any]:
+        """Every stored field of one row"""
+        data = {field: column[row] for field, column in self.numeric.items()}
+        data.update((field, column[row]) for field, column in self.encoded.items())
+        data.update((field, column[row]) for field, column in self.text.items())
+        return data
+
+
+def synthetic(rows: int, seed: int = 11) -> ColumnarCatalog:
+    """A large catalog built straight into columns, for benchmarks"""
+    import random
+    rng = random.Random(seed)
+    catalog = ColumnarCatalog(text_fields=())
+    pattern = 4096
+    # Repeat a random block so building 10M rows stays fast.
+    block = {field: array("q", [rng.randint(1, 5) if field in ("type", "condition")
+                                else rng.randint(0, 1) if field == "format"
+                                else rng.randint(0, 3) if field in ("copies", "total_copies", "status")
+                                else rng.randint(50, 1200) for _ in range(pattern)])
+             for field in NUMERIC_FIELDS if field != "id"}
+    for field, column in block.items():
+        catalog.numeric[field] = column * (rows // pattern) + column[:rows % pattern]
+    catalog.numeric["id"] = array("q", range(1, rows + 1))
+    sizes = {"genre": 40, "publisher": 500, "language": 12, "category": 25, "location": 200}
+    for field in ENCODED_FIELDS:
+        column = catalog.encoded[field]
+        for value in range(sizes[field]):
+            column.encode(f"{field}_{value}")
+        codes = array("i", [rng.randrange(sizes[field]) for _ in range(pattern)])
+        column.codes = codes * (rows // pattern) + codes[:rows % pattern]
+    catalog.live = array("b", [1]) * rows
+    catalog.row_of = {}
+    return catalog
+
+
+REPORTS = {
+    "pages per genre": ("genre", {"pages": "sum", "id": "count"}),
+    "copies per publisher": ("publisher", {"copies": "sum", "total_copies": "sum"}),
+    "stock by condition": ("condition", {"copies": "sum", "pages": "mean"}),
+}
+
+
+def benchmark(rows: int = 10_000_000) -> Dict[str, float]:
+    catalog = synthetic(rows)
+    timings = {}
+    for name, (key, measures) in REPORTS.items():
+        start = time.perf_counter()
+        catalog.group_by(key, measures)
+        timings[name] = time.perf_counter() - start
+    start = time.perf_counter()
+    ColumnarCatalog.from_snapshot(catalog.snapshot())
+    timings["snapshot round trip"] = time.perf_counter() - start
+    return timings
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == "--bench":
+        rows = int(sys.argv[2]) if len(sys.argv) > 2 else 10_000_000
+        print(f"{rows:,} rows, {'numpy' if np is not None else 'pure Python'} aggregates")
+        for name, seconds in benchmark(rows).items():
+            print(f"{name:22} {seconds * 1000:9.1f} ms")
+    else:
+        from src.repository.storage import load_resources
+        catalog = ColumnarCatalog.from_resources(load_resources())
+        for name, (key, measures) in REPORTS.items():
+            print(f"\n{name}:")
+            for group, values in sorted(catalog.group_by(key, measures).items(), key=lambda item: str(item[0])):
+                print(f"  {group}: {values}")
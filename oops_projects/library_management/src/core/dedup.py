@@ -0,0 +1,282 @@
+import random
+import re
+import sys
+import time
+import unicodedata
+import zlib
+from array import array
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from src.repository.storage import data_path, read_rows
+from src.utils.isbn import normalize_isbn
+
+try:
+    import numpy as np
+except ImportError:  # Signatures are computed row by row instead.
+    np = None
+
+
+MERSENNE_PRIME = (1 << 31) - 1
+MAX_BUCKET = 50  # LSH buckets larger than this are boilerplate, not duplicates
+_NON_WORD = re.compile(r"[\W_]+")
+_ARTICLES = {"the", "a", "an"}
+_ORDINALS = {"first": 1, "second": 2, "third": 3, "fourth": 4, "fifth": 5,
+             "sixth": 6, "seventh": 7, "eighth": 8, "ninth": 9, "tenth": 10}
+
+
+def _plain(text: str) -> List[str]:
+    """Lower-case words without accents or punctuation"""
+    text = unicodedata.normalize("NFKD", text or "")
+    text = "".join(char for char in text if not unicodedata.combining(char))
+    return _NON_WORD.sub(" ", text.casefold()).split()
+
+
+def normalize_author(value: str) -> str:
+    """'Goswami, Jaideva' and 'Jaideva Goswami' give the same key"""
+    authors = re.split(r";|&|\band\b", value or "")
+    keys = sorted(" ".join(sorted(_plain(author))) for author in authors)
+    return "; ".join(key for key in keys if key)
+
+
+def normalize_title(value: str) -> str:
+    """Title words without a leading or trailing article ('X, The')"""
+    words = _plain(value)
+    if words and words[0] in _ARTICLES:
+        words = words[1:]
+    if words and words[-1] in _ARTICLES:
+        words = words[:-1]
+    return " ".join(words)
+
+
+def normalize_edition(value: str) -> int:
+    """'2nd', 'Second Edition' and '2' are all edition 2"""
+    for word in _plain(value):
+        if word in _ORDINALS:
+            return _ORDINALS[word]
+        number = re.match(r"\d+", word)
+        if number:
+            return int(number.group())
+    return 1
+
+
+def shingles(title: str, description: str) -> List[int]:
+    """Hashed word pairs of the title and description"""
+    words = _plain(title) + _plain(description)
+    if len(words) < 2:
+        pieces = words
+    else:
+        pieces = [f"{first} {second}" for first, second in zip(words, words[1:])]
+    return list({zlib.crc32(piece.encode()) for piece in pieces})
+
+
+# Finds exact and near-duplicate rows in a stream of resource rows.
+class Deduplicator:
+    def __init__(self, num_perm: int = 64, bands: int = 16, threshold: float = 0.6,
+                 batch_size: int = 2_000, seed: int = 1, max_bucket: int = MAX_BUCKET):
+        if num_perm % bands:
+            raise ValueError("num_perm must be a multiple of bands")
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows_per_band = num_perm // bands
+        self.threshold = threshold
+        self.batch_size = batch_size
+        self.max_bucket = max_bucket
+        self.skipped_buckets = 0                 # oversized buckets left out of near_duplicates()
+        self.skipped_rows = 0
+        rng = random.Random(seed)
+        self._a = [rng.randrange(1, MERSENNE_PRIME) for _ in range(num_perm)]
+        self._b = [rng.randrange(0, MERSENNE_PRIME) for _ in range(num_perm)]
+        self.count = 0
+        self._parent = array("q")
+        self._reasons: Dict[int, str] = {}
+        self._by_isbn: Dict[str, int] = {}
+        self._by_work: Dict[Tuple[str, str, int], int] = {}
+        self._signatures = array("I")            # num_perm values per row, 0s if no text
+        self._buckets: List[Dict[bytes, List[int]]] = [{} for _ in range(bands)]
+        self._pending: List[Tuple[int, List[int]]] = []
+
+    def _find(self, row: int) -> int:
+        while self._parent[row] != row:
+            self._parent[row] = self._parent[self._parent[row]]
+            row = self._parent[row]
+        return row
+
+    def _union(self, row: int, other: int, reason: str):
+        root, other_root = self._find(row), self._find(other)
+        if root != other_root:
+            self._parent[max(root, other_root)] = min(root, other_root)
+            self._reasons.setdefault(row, reason)
+
+    def add(self, row: Dict[str, str]) -> int:
+        """Index one row and return its position in the import"""
+        index = self.count
+        self.count += 1
+        self._parent.append(index)
+
+        isbn = normalize_isbn(row.get("isbn", ""))
+        if isbn is not None:
+            first = self._by_isbn.setdefault(isbn, index)
+            if first != index:
+                self._union(index, first, "same ISBN")
+        work = (normalize_title(row.get("title", "")), normalize_author(row.get("author", "")),
+                normalize_edition(row.get("edition", "")))
+        if work[0]:
+            first = self._by_work.setdefault(work, index)
+            if first != index:
+                self._union(index, first, "same title, author and edition")
+
+        self._pending.append((index, shingles(row.get("title", ""), row.get("description", ""))))
+        if len(self._pending) >= self.batch_size:
+            self._flush()
+        return index
+
+    def _flush(self):
+        if not self._pending:
+            return
+        if np is not None:
+            signatures = self._signatures_numpy(self._pending)
+        else:
+            signatures = [self._signature(hashes) for _, hashes in self._pending]
+        for (index, hashes), signature in zip(self._pending, signatures):
+            self._signatures.extend(signature)
+            if not hashes:
+                continue
+            values = array("I", signature).tobytes()
+            step = self.rows_per_band * self._signatures.itemsize
+            for band, bucket in enumerate(self._buckets):
+                bucket.setdefault(values[band * step:(band + 1) * step], []).append(index)
+        self._pending = []
+
+    def _signature(self, hashes: List[int]) -> List[int]:
+        if not hashes:
+            return [0] * self.num_perm
+        return [min((a * value + b) % MERSENNE_PRIME for value in hashes)
+                for a, b in zip(self._a, self._b)]
+
+    def _signatures_numpy(self, pending) -> List[List[int]]:
+        # One matrix for the whole batch, reduced per row with reduceat.
+        result = [[0] * self.num_perm] * len(pending)
+        filled = [position for position, (_, hashes) in enumerate(pending) if hashes]
+        if not filled:
+            return result
+        values = np.fromiter((value for position in filled for value in pending[position][1]),
+                             dtype=np.uint64)
+        starts = np.cumsum([0] + [len(pending[position][1]) for position in filled[:-1]])
+        a = np.array(self._a, dtype=np.uint64)
+        b = np.array(self._b, dtype=np.uint64)
+        matrix = (values[:, None] * a[None, :] + b[None, :]) % MERSENNE_PRIME
+        for position, signature in zip(filled, np.minimum.reduceat(matrix, starts, axis=0).tolist()):
+            result[position] = signature
+        return result
+
+    def similarity(self, row: int, other: int) -> float:
+        """MinHash estimate of the Jaccard similarity of two rows' text"""
+        size = self.num_perm
+        first = self._signatures[row * size:(row + 1) * size]
+        second = self._signatures[other * size:(other + 1) * size]
+        return sum(x == y for x, y in zip(first, second)) / size
+
+    def duplicates(self) -> List[Tuple[int, int, str]]:
+        """(row, first row of the same work, reason) for exact duplicates"""
+        self._flush()
+        return [(row, self._find(row), reason) for row, reason in sorted(self._reasons.items())]
+
+    def near_duplicates(self) -> List[Tuple[int, int, float]]:
+        """(row, other, similarity) for rows whose text is nearly the same
+        but which are not already exact duplicates; buckets over max_bucket
+        rows are counted in skipped_buckets instead of compared"""
+        self._flush()
+        seen = set()
+        pairs = []
+        self.skipped_buckets = self.skipped_rows = 0
+        for bucket in self._buckets:
+            for members in bucket.values():
+                if len(members) < 2:
+                    continue
+                if len(members) > self.max_bucket:
+                    self.skipped_buckets += 1
+                    self.skipped_rows += len(members)
+                    continue
+                for position, row in enumerate(members):
+                    for other in members[position + 1:]:
+                        if (row, other) in seen or self._find(row) == self._find(other):
+                            continue
+                        seen.add((row, other))
+                        score = self.similarity(row, other)
+                        if score >= self.threshold:
+                            pairs.append((row, other, score))
+        return sorted(pairs)
+
+
+def dedup_rows(rows: Iterable[Dict[str, str]], **options) -> Deduplicator:
+    deduplicator = Deduplicator(**options)
+    for row in rows:
+        deduplicator.add(row)
+    deduplicator._flush()
+    return deduplicator
+
+
+def _variants(rows: List[Dict[str, str]], count: int, seed: int = 3) -> List[Dict[str, str]]:
+    # Synthetic import: real rows plus reformatted and reworded copies.
+    rng = random.Random(seed)
+    output = []
+    for number in range(count):
+        row = dict(rng.choice(rows))
+        kind = number % 4
+        if kind == 1:
+            row["isbn"] = row["isbn"].replace("-", "")
+        elif kind == 2:
+            last, _, first = row["author"].partition(", ")
+            row["author"] = f"{first} {last}".strip()
+            row["isbn"] = ""
+        elif kind == 3:
+            row["title"] = f"{row['title']} {number}"
+            row["description"] = row["description"] + " Revised printing."
+            row["isbn"] = ""
+        else:
+            row["title"] = f"Title {number} {rng.random()}"
+            row["isbn"] = ""
+            row["description"] = " ".join(rng.choice(("data", "theory", "methods", "applied",
+                                                      "history", "modern", "signals", "notes"))
+                                          for _ in range(12)) + f" {number}"
+        output.append(row)
+    return output
+
+
+def benchmark(rows: int = 200_000, use_numpy: bool = True) -> Dict[str, float]:
+    global np
+    source = list(read_rows(data_path("resources.csv")))
+    imported = _variants(source, rows)
+    numpy, np = np, (np if use_numpy else None)
+    try:
+        start = time.perf_counter()
+        deduplicator = dedup_rows(imported)
+        duplicates = deduplicator.duplicates()
+        near = deduplicator.near_duplicates()
+        elapsed = time.perf_counter() - start
+    finally:
+        np = numpy
+    return {"rows": rows, "rows_per_sec": rows / elapsed, "duplicates": len(duplicates),
+            "near_duplicates": len(near), "skipped_buckets": deduplicator.skipped_buckets,
+            "skipped_rows": deduplicator.skipped_rows, "numpy": use_numpy and np is not None}
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == "--bench":
+        rows = int(sys.argv[2]) if len(sys.argv) > 2 else 200_000
+        for use_numpy in ((True, False) if np is not None else (False,)):
+            result = benchmark(rows, use_numpy)
+            print(f"{result['rows']:,} rows at {result['rows_per_sec']:,.0f} rows/sec: "
+                  f"{result['duplicates']:,} duplicates, {result['near_duplicates']:,} near duplicates, "
+                  f"{result['skipped_buckets']:,} buckets over {MAX_BUCKET} rows skipped "
+                  f"({'numpy' if result['numpy'] else 'pure Python'} signatures)")
+    else:
+        path = sys.argv[1] if len(sys.argv) > 1 else data_path("resources.csv")
+        deduplicator = dedup_rows(read_rows(path))
+        for row, first, reason in deduplicator.duplicates():
+            print(f"Row {row + 2} duplicates row {first + 2}: {reason}")
+        for row, other, score in deduplicator.near_duplicates():
+            print(f"Rows {row + 2} and {other + 2} look alike ({score:.0%} similar)")
+        if deduplicator.skipped_buckets:
+            print(f"⚠️ {deduplicator.skipped_buckets:,} groups of more than {deduplicator.max_bucket} "
+                  f"similar rows ({deduplicator.skipped_rows:,} rows) were not compared")
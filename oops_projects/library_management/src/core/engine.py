@@ -0,0 +1,481 @@
+import heapq
+import operator
+import re
+import sys
+import time
+from bisect import bisect_left, bisect_right, insort
+from itertools import compress
+from operator import attrgetter
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+from src.models.book import Resource
+from src.utils.isbn import isbn_key
+
+
+NUMERIC_FIELDS = {"id", "pages", "type", "format", "condition", "status", "copies", "total_copies"}
+TEXT_FIELDS = {"title", "author", "isbn", "genre", "category", "publisher", "language", "edition",
+               "publication_date", "location", "description", "date_added", "last_updated"}
+QUERY_FIELDS = NUMERIC_FIELDS | TEXT_FIELDS
+HASH_INDEXES = ("genre", "location", "category", "language")
+RANGE_INDEX = "publication_date"
+SCAN_THRESHOLD = 0.25  # above this share of the catalog, a column scan beats the index
+
+_COMPARE = {"=": operator.eq, "!=": operator.ne, "<": operator.lt, "<=": operator.le,
+            ">": operator.gt, ">=": operator.ge}
+
+
+class QueryError(ValueError):
+    """Raised for malformed queries and unknown fields"""
+
+
+# A single predicate: field op value. BETWEEN takes a (low, high) pair,
+# IN a collection, CONTAINS a case-insensitive substring.
+class Condition:
+    def __init__(self, field: str, op: str, value: Any):
+        op = op.lower() if op.isalpha() else op
+        if field not in QUERY_FIELDS:
+            raise QueryError(f"Unknown field: {field}")
+        if op not in _COMPARE and op not in ("between", "in", "contains"):
+            raise QueryError(f"Unknown operator: {op}")
+        if op == "contains" and field in NUMERIC_FIELDS:
+            raise QueryError(f"CONTAINS needs a text field, not {field}")
+        self.field = field
+        self.op = op
+        if op == "between":
+            self.value = tuple(self._coerce(item) for item in value)
+        elif op == "in":
+            self.value = frozenset(self._coerce(item) for item in value)
+        else:
+            self.value = self._coerce(value)
+
+    def _coerce(self, value: Any) -> Any:
+        if self.field in NUMERIC_FIELDS:
+            try:
+                return int(value)
+            except (TypeError, ValueError):
+                raise QueryError(f"{self.field} needs a number, got {value!r}") from None
+        if self.field == "isbn":
+            return isbn_key(str(value))
+        return str(value)
+
+    def predicate(self):
+        """A function of one field value"""
+        op, value = self.op, self.value
+        if op == "between":
+            low, high = value
+            return lambda item: item not in ("", None) and low <= item <= high
+        if op == "in":
+            return value.__contains__
+        if op == "contains":
+            needle = value.casefold()
+            return lambda item: needle in (item or "").casefold()
+        compare = _COMPARE[op]
+        if self.field in TEXT_FIELDS and op != "!=":
+            return lambda item: item not in ("", None) and compare(item, value)
+        return lambda item: compare(item, value)
+
+    def matcher(self):
+        """A function of one Resource"""
+        predicate, getter = self.predicate(), attrgetter(self.field)
+        if self.field == "isbn":
+            return lambda resource: predicate(isbn_key(getter(resource)))
+        return lambda resource: predicate(getter(resource))
+
+    def matches(self, resource: Resource) -> bool:
+        return self.matcher()(resource)
+
+    def __str__(self):
+        if self.op == "between":
+            return f"{self.field} BETWEEN {self.value[0]!r} AND {self.value[1]!r}"
+        if self.op == "in":
+            return f"{self.field} IN ({', '.join(repr(item) for item in sorted(self.value))})"
+        return f"{self.field} {self.op.upper()} {self.value!r}"
+
+
+# A query is a conjunction of conditions plus ordering and a page.
+class Query:
+    def __init__(self):
+        self.conditions: List[Condition] = []
+        self.order_field = "title"
+        self.descending = False
+        self.limit: Optional[int] = None
+        self.offset = 0
+
+    def where(self, field: str, op: str, value: Any) -> "Query":
+        self.conditions.append(Condition(field, op, value))
+        return self
+
+    def order_by(self, field: str, descending: bool = False) -> "Query":
+        if field not in QUERY_FIELDS:
+            raise QueryError(f"Unknown field: {field}")
+        self.order_field = field
+        self.descending = descending
+        return self
+
+    def page(self, limit: Optional[int], offset: int = 0) -> "Query":
+        self.limit = limit
+        self.offset = offset
+        return self
+
+    def __str__(self):
+        text = " AND ".join(str(condition) for condition in self.conditions) or "ALL"
+        text += f" ORDER BY {self.order_field}{' DESC' if self.descending else ''}"
+        if self.limit is not None:
+            text += f" LIMIT {self.limit} OFFSET {self.offset}"
+        return text
+
+
+_TOKEN = re.compile(r"""\s*(?:(?P<string>'[^']*'|"[^"]*")|(?P<symbol><=|>=|!=|=|<|>|\(|\)|,)"""
+                    r"""|(?P<word>[^\s=<>!(),'"]+))""")
+
+
+def parse_query(text: str) -> Query:
+    """Parse e.g. "genre = data_science AND publication_date BETWEEN 2000-01-01
+    AND 2015-12-31 AND copies >= 1 ORDER BY title LIMIT 10 OFFSET 20"
+    """
+    tokens: List[Tuple[str, str]] = []
+    position = 0
+    text = text.strip()
+    while position < len(text):
+        match = _TOKEN.match(text, position)
+        if not match or match.end() == position:
+            raise QueryError(f"Unexpected character at {position}: {text[position:position + 10]!r}")
+        kind = match.lastgroup
+        value = match.group(kind)
+        tokens.append((kind, value[1:-1] if kind == "string" else value))
+        position = match.end()
+
+    def keyword(index: int, word: str) -> bool:
+        return index < len(tokens) and tokens[index][0] == "word" and tokens[index][1].upper() == word
+
+    def take(index: int) -> str:
+        if index >= len(tokens):
+            raise QueryError("Query ends too early")
+        return tokens[index][1]
+
+    query = Query()
+    index = 0
+    while index < len(tokens) and not keyword(index, "ORDER") and not keyword(index, "LIMIT"):
+        field = take(index)
+        if keyword(index + 1, "BETWEEN"):
+            if not keyword(index + 3, "AND"):
+                raise QueryError("BETWEEN needs AND")
+            query.where(field, "between", (take(index + 2), take(index + 4)))
+            index += 5
+        elif keyword(index + 1, "IN"):
+            if take(index + 2) != "(":
+                raise QueryError("IN needs a parenthesised list")
+            values, index = [], index + 3
+            while take(index) != ")":
+                if take(index) != ",":
+                    values.append(take(index))
+                index += 1
+            query.where(field, "in", values)
+            index += 1
+        else:
+            query.where(field, take(index + 1), take(index + 2))
+            index += 3
+        if keyword(index, "AND"):
+            index += 1
+    if keyword(index, "ORDER"):
+        if not keyword(index + 1, "BY"):
+            raise QueryError("ORDER needs BY")
+        descending = keyword(index + 3, "DESC")
+        query.order_by(take(index + 2), descending)
+        index += 4 if descending or keyword(index + 3, "ASC") else 3
+    if keyword(index, "LIMIT"):
+        limit = int(take(index + 1))
+        index += 2
+        offset = 0
+        if keyword(index, "OFFSET"):
+            offset = int(take(index + 1))
+            index += 2
+        query.page(limit, offset)
+    if index != len(tokens):
+        raise QueryError(f"Unexpected {take(index)!r}")
+    return query
+
+
+# How a query will run; explain() renders it like a database EXPLAIN.
+class Plan:
+    def __init__(self, query: Query, catalog_size: int):
+        self.query = query
+        self.catalog_size = catalog_size
+        self.strategy = "scan"
+        self.driver: Optional[Condition] = None
+        self.intersect: List[Condition] = []
+        self.residual: List[Condition] = list(query.conditions)
+        self.estimates: Dict[str, int] = {}
+
+    def explain(self) -> str:
+        lines = [f"QUERY {self.query}"]
+        if self.strategy == "index":
+            lines.append(f"-> Index lookup {self.driver} (est. {self.estimates[str(self.driver)]} rows)")
+            for condition in self.intersect:
+                lines.append(f"-> Intersect postings {condition} "
+                             f"(est. {self.estimates[str(condition)]} rows)")
+        else:
+            reason = ("no usable index" if not self.estimates else
+                      f"best index matches > {SCAN_THRESHOLD:.0%} of {self.catalog_size} rows")
+            lines.append(f"-> Column scan over {self.catalog_size} rows ({reason})")
+        if self.residual:
+            lines.append("-> Filter " + " AND ".join(str(condition) for condition in self.residual))
+        query = self.query
+        direction = " DESC" if query.descending else ""
+        if query.limit is not None:
+            lines.append(f"-> Top-N by {query.order_field}{direction} "
+                         f"(keep {query.offset + query.limit}, return {query.limit} from {query.offset})")
+        else:
+            lines.append(f"-> Sort by {query.order_field}{direction}")
+        return "\n".join(lines)
+
+
+# Indexed, queryable view of the catalog.
+class Catalog:
+    def __init__(self, resources: Iterable[Resource] = ()):
+        self.by_id: Dict[int, Resource] = {}
+        self._by_isbn: Dict[str, Set[int]] = {}
+        self._hash: Dict[str, Dict[Any, Set[int]]] = {field: {} for field in HASH_INDEXES}
+        self._date_keys: List[Tuple[str, int]] = []   # sorted (publication_date, id)
+        self._indexed: Dict[int, Tuple[str, Tuple[Any, ...], Optional[str]]] = {}  # keys as indexed
+        self._columns: Optional[Dict[str, List[Any]]] = None
+        self._rows: List[Resource] = []
+        for resource in resources:
+            self.add(resource)
+
+    def __len__(self):
+        return len(self.by_id)
+
+    # Index maintenance
+    def add(self, resource: Resource):
+        if resource.id in self.by_id:
+            self.remove(resource.id)
+        self.by_id[resource.id] = resource
+        isbn = isbn_key(resource.isbn)
+        if isbn:
+            self._by_isbn.setdefault(isbn, set()).add(resource.id)
+        values = tuple(getattr(resource, field) for field in HASH_INDEXES)
+        for field, value in zip(HASH_INDEXES, values):
+            self._hash[field].setdefault(value, set()).add(resource.id)
+        if resource.publication_date:
+            insort(self._date_keys, (resource.publication_date, resource.id))
+        self._indexed[resource.id] = (isbn, values, resource.publication_date)
+        self._columns = None
+
+    def remove(self, resource_id: int):
+        # The resource may have been changed in place since it was indexed,
+        # so its old entries are found from the keys recorded by add().
+        if self.by_id.pop(resource_id, None) is None:
+            return
+        isbn, values, publication_date = self._indexed.pop(resource_id)
+        self._by_isbn.get(isbn, set()).discard(resource_id)
+        for field, value in zip(HASH_INDEXES, values):
+            self._hash[field].get(value, set()).discard(resource_id)
+        if publication_date:
+            key = (publication_date, resource_id)
+            position = bisect_left(self._date_keys, key)
+            if position < len(self._date_keys) and self._date_keys[position] == key:
+                del self._date_keys[position]
+        self._columns = None
+
+    def update(self, resource: Resource):
+        """Re-index a resource after its fields changed"""
+        self.add(resource)
+
+    # Planning
+    def _date_range(self, condition: Condition) -> Tuple[int, int]:
+        keys, op, value = self._date_keys, condition.op, condition.value
+        low, high = 0, len(keys)
+        if op == "between":
+            low = bisect_left(keys, (value[0],))
+            high = bisect_right(keys, (value[1], sys.maxsize))
+        elif op in ("=", ">=", ">"):
+            low = bisect_left(keys, (value,)) if op != ">" else bisect_right(keys, (value, sys.maxsize))
+            if op == "=":
+                high = bisect_right(keys, (value, sys.maxsize))
+        elif op in ("<", "<="):
+            high = bisect_left(keys, (value,)) if op == "<" else bisect_right(keys, (value, sys.maxsize))
+        return low, high
+
+    def _postings(self, condition: Condition) -> Optional[Set[int]]:
+        # Exact id sets for equality-style conditions on indexed fields.
+        field, op, value = condition.field, condition.op, condition.value
+        values = [value] if op == "=" else list(value) if op == "in" else None
+        if values is None:
+            return None
+        if field == "id":
+            return {item for item in values if item in self.by_id}
+        if field == "isbn":
+            index = self._by_isbn
+        elif field in self._hash:
+            index = self._hash[field]
+        else:
+            return None
+        if len(values) == 1:
+            return index.get(values[0], set())
+        return set().union(*(index.get(item, set()) for item in values))
+
+    def _estimate(self, condition: Condition) -> Optional[int]:
+        postings = self._postings(condition)
+        if postings is not None:
+            return len(postings)
+        if condition.field == RANGE_INDEX and condition.op in ("between", "=", "<", "<=", ">", ">="):
+            low, high = self._date_range(condition)
+            return high - low
+        return None
+
+    def plan(self, query: Query) -> Plan:
+        """Pick the most selective index, or a column scan"""
+        plan = Plan(query, len(self))
+        usable = []
+        for condition in query.conditions:
+            estimate = self._estimate(condition)
+            if estimate is not None:
+                plan.estimates[str(condition)] = estimate
+                usable.append((estimate, condition))
+        if not usable:
+            return plan
+        usable.sort(key=lambda item: item[0])
+        best, driver = usable[0]
+        if best > SCAN_THRESHOLD * len(self):
+            return plan
+        plan.strategy = "index"
+        plan.driver = driver
+        # Hash postings are sets, so intersecting costs only the smaller side.
+        plan.intersect = [condition for _, condition in usable[1:]
+                          if self._postings(condition) is not None]
+        plan.residual = [condition for condition in query.conditions
+                         if condition is not driver and condition not in plan.intersect]
+        return plan
+
+    def explain(self, query) -> str:
+        if isinstance(query, str):
+            query = parse_query(query)
+        return self.plan(query).explain()
+
+    # Execution
+    def _column(self, field: str) -> List[Any]:
+        if self._columns is None:
+            self._rows = list(self.by_id.values())
+            self._columns = {}
+        column = self._columns.get(field)
+        if column is None:
+            getter = attrgetter(field)
+            column = list(map(getter, self._rows))
+            if field == "isbn":
+                column = list(map(isbn_key, column))
+            self._columns[field] = column
+        return column
+
+    def _scan(self, conditions: List[Condition]) -> List[Resource]:
+        # One pass per condition over a column with map(), no per-row Python loop.
+        if not conditions:
+            return list(self.by_id.values())
+        mask = None
+        for condition in conditions:
+            hits = map(condition.predicate(), self._column(condition.field))
+            mask = list(hits) if mask is None else list(map(operator.and_, mask, hits))
+        return list(compress(self._rows, mask))
+
+    def _candidates(self, plan: Plan) -> List[Resource]:
+        if plan.strategy == "scan":
+            return self._scan(plan.residual)
+        postings = self._postings(plan.driver)
+        if postings is None:
+            low, high = self._date_range(plan.driver)
+            ids: Set[int] = {resource_id for _, resource_id in self._date_keys[low:high]}
+        else:
+            ids = set(postings)
+        for condition in plan.intersect:
+            ids &= self._postings(condition)
+            if not ids:
+                break
+        rows = [self.by_id[resource_id] for resource_id in ids]
+        for condition in plan.residual:
+            rows = list(filter(condition.matcher(), rows))
+        return rows
+
+    def execute(self, query) -> List[Resource]:
+        """Matching resources, ordered and paged"""
+        if isinstance(query, str):
+            query = parse_query(query)
+        rows = self._candidates(self.plan(query))
+        getter = attrgetter(query.order_field)
+        key = lambda resource: (getter(resource), resource.id)  # ties in id order
+        if query.limit is None:
+            return sorted(rows, key=key, reverse=query.descending)[query.offset:]
+        # Keep only offset + limit rows in a heap instead of sorting them all;
+        # ordering by title is the same order as Resource.__lt__.
+        keep = query.offset + query.limit
+        pick = heapq.nlargest if query.descending else heapq.nsmallest
+        return pick(keep, rows, key=key)[query.offset:]
+
+    def count(self, query) -> int:
+        if isinstance(query, str):
+            query = parse_query(query)
+        return len(self._candidates(self.plan(query)))
+
+
+def _synthetic_catalog(size: int) -> Catalog:
+    import random
+    from src.repository.storage import load_resources
+
+    rng = random.Random(5)
+    templates = [resource.to_dict() for resource in load_resources().values()
+                 if type(resource).__name__ == "Book"]
+    catalog = Catalog()
+    for resource_id in range(1, size + 1):
+        data = dict(rng.choice(templates))
+        data.update(id=resource_id, title=f"{data['title']} {resource_id}",
+                    isbn=f"978-{resource_id:010d}", format=1,
+                    publication_date=f"{rng.randint(1950, 2024)}-{rng.randint(1, 12):02d}-01",
+                    copies=rng.randint(0, 3))
+        catalog.add(Resource.from_dict(data, "Book"))
+    return catalog
+
+
+BENCHMARK_QUERIES = {
+    "id lookup": "id = 4242",
+    "isbn lookup": "isbn = '978-0000004242'",
+    "genre + language + date + copies": "genre = data_science AND language = English AND "
+                                        "publication_date BETWEEN 2000-01-01 AND 2010-12-31 AND copies >= 1 "
+                                        "ORDER BY title LIMIT 20",
+    "date range only": "publication_date BETWEEN 2020-01-01 AND 2020-06-30 LIMIT 50",
+    "scan (pages)": "pages > 250 AND copies >= 1 ORDER BY title LIMIT 20",
+    "page 50 by title": "language = English ORDER BY title LIMIT 20 OFFSET 1000",
+}
+
+
+def benchmark(size: int = 100_000, repeat_count: int = 20) -> Dict[str, Tuple[float, float]]:
+    """Per-query milliseconds: (planned, naive loop over objects)"""
+    catalog = _synthetic_catalog(size)
+    results = {}
+    for name, text in BENCHMARK_QUERIES.items():
+        query = parse_query(text)
+        start = time.perf_counter()
+        for _ in range(repeat_count):
+            planned = catalog.execute(query)
+        planned_ms = (time.perf_counter() - start) / repeat_count * 1000
+        start = time.perf_counter()
+        rows = [resource for resource in catalog.by_id.values()
+                if all(condition.matches(resource) for condition in query.conditions)]
+        naive = sorted(rows, key=lambda resource: (getattr(resource, query.order_field), resource.id))[
+            query.offset:None if query.limit is None else query.offset + query.limit]
+        naive_ms = (time.perf_counter() - start) * 1000
+        assert [resource.id for resource in planned] == [resource.id for resource in naive], name
+        results[name] = (planned_ms, naive_ms)
+    return results
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == "--bench":
+        size = int(sys.argv[2]) if len(sys.argv) > 2 else 100_000
+        for name, (planned_ms, naive_ms) in benchmark(size).items():
+            print(f"{name:34} {planned_ms:9.3f} ms   (naive loop {naive_ms:8.2f} ms)")
+    else:
+        from src.repository.storage import load_resources
+        catalog = Catalog(load_resources().values())
+        text = " ".join(sys.argv[1:]) or "genre = data_science AND copies >= 1 LIMIT 5"
+        print(catalog.explain(text))
+        for resource in catalog.execute(text):
+            print(repr(resource))
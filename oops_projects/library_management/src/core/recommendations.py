@@ -0,0 +1,202 @@
+import heapq
+import mmap
+import os
+import struct
+import threading
+import time
+from array import array
+from bisect import bisect_left, insort
+from collections import deque
+from typing import Dict, List, Optional, Set, Tuple
+
+from src.repository.storage import data_path, read_rows
+
+
+# magic, version, k, items, stored neighbours; padded to 8-byte alignment
+INDEX_HEADER = struct.Struct("<4sIIQQ4x")
+INDEX_MAGIC = b"COBR"
+INDEX_VERSION = 1
+
+
+# "Readers who borrowed this also borrowed": an item-item co-occurrence
+# model updated on every checkout.
+class CoBorrowModel:
+    def __init__(self, k: int = 20, history_limit: int = 100):
+        self.k = k
+        self.history_limit = history_limit
+        self.rows: Dict[int, Dict[int, int]] = {}     # sparse: item -> {item: co-borrows}
+        self._history: Dict[str, Tuple[deque, Set[int]]] = {}
+        self._top: Dict[int, List[Tuple[int, int]]] = {}
+        self._lock = threading.Lock()
+
+    def record(self, user_id: str, resource_id: int):
+        """Pair a new checkout with the user's recent distinct borrows"""
+        with self._lock:
+            recent, seen = self._history.setdefault(user_id, (deque(), set()))
+            if resource_id in seen:
+                return
+            row = self.rows.setdefault(resource_id, {})
+            for other in recent:
+                row[other] = row.get(other, 0) + 1
+                self._bump(resource_id, other, row[other])
+                other_row = self.rows[other]
+                other_row[resource_id] = other_row.get(resource_id, 0) + 1
+                self._bump(other, resource_id, other_row[resource_id])
+            recent.append(resource_id)
+            seen.add(resource_id)
+            if len(recent) > self.history_limit:
+                seen.discard(recent.popleft())
+
+    @staticmethod
+    def _rank(item: Tuple[int, int]) -> Tuple[int, int]:
+        return -item[1], item[0]
+
+    def _bump(self, resource_id: int, other: int, count: int):
+        # Counts only grow, so only the pair that just grew can move up in
+        # or enter a cached top-k; the rest of the list stays as it is.
+        top = self._top.get(resource_id)
+        if top is None:
+            return
+        for position, (neighbour, _) in enumerate(top):
+            if neighbour == other:
+                del top[position]
+                break
+        else:
+            if len(top) >= self.k:
+                if not top or self._rank((other, count)) > self._rank(top[-1]):
+                    return
+                top.pop()
+        insort(top, (other, count), key=self._rank)
+
+    def _top_for(self, resource_id: int) -> List[Tuple[int, int]]:
+        # Built on first use, then kept up to date by record().
+        top = self._top.get(resource_id)
+        if top is None:
+            row = self.rows.get(resource_id, {})
+            top = heapq.nsmallest(self.k, row.items(), key=self._rank)
+            self._top[resource_id] = top
+        return top
+
+    def recommend(self, resource_id: int, k: int = 10) -> List[Tuple[int, int]]:
+        """[(resource_id, times borrowed together)], strongest first"""
+        with self._lock:
+            return self._top_for(resource_id)[:k]
+
+    @classmethod
+    def from_transactions(cls, path: Optional[str] = None, k: int = 20,
+                          history_limit: int = 100) -> "CoBorrowModel":
+        """Replay transactions.csv in issue order"""
+        rows = []
+        for row in read_rows(path or data_path("transactions.csv")):
+            try:
+                rows.append((row["issue_date"], row["user_id"], int(row["resource_id"])))
+            except (KeyError, ValueError):
+                continue
+        rows.sort()
+        model = cls(k, history_limit)
+        for _, user_id, resource_id in rows:
+            model.record(user_id, resource_id)
+        return model
+
+    def save(self, path: str):
+        """Write every item's top-k to a RecommendationIndex file"""
+        with self._lock:
+            ids = array("q", sorted(self.rows))
+            offsets = array("q", [0])
+            neighbours = array("q")
+            counts = array("q")
+            for resource_id in ids:
+                for other, count in self._top_for(resource_id):
+                    neighbours.append(other)
+                    counts.append(count)
+                offsets.append(len(neighbours))
+        temp_path = path + ".tmp"
+        with open(temp_path, "wb") as file:
+            file.write(INDEX_HEADER.pack(INDEX_MAGIC, INDEX_VERSION, self.k,
+                                         len(ids), len(neighbours)))
+            for column in (ids, offsets, neighbours, counts):
+                column.tofile(file)
+        os.replace(temp_path, path)
+
+
+# Read-only top-k lookups straight from a saved file: opening it maps the
+# file instead of parsing it, so load time does not grow with the catalog.
+class RecommendationIndex:
+    def __init__(self, path: str):
+        self._file = open(path, "rb")
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, self.k, items, stored = INDEX_HEADER.unpack_from(self._map)
+        if magic != INDEX_MAGIC or version != INDEX_VERSION:
+            self.close()
+            raise ValueError(f"{path} is not a recommendation index")
+        words = memoryview(self._map)[INDEX_HEADER.size:].cast("q")
+        self._ids = words[:items]
+        self._offsets = words[items:2 * items + 1]
+        self._neighbours = words[2 * items + 1:2 * items + 1 + stored]
+        self._counts = words[2 * items + 1 + stored:2 * items + 1 + 2 * stored]
+
+    def __len__(self):
+        return len(self._ids)
+
+    def recommend(self, resource_id: int, k: int = 10) -> List[Tuple[int, int]]:
+        position = bisect_left(self._ids, resource_id)
+        if position == len(self._ids) or self._ids[position] != resource_id:
+            return []
+        start = self._offsets[position]
+        end = min(self._offsets[position + 1], start + k)
+        return list(zip(self._neighbours[start:end], self._counts[start:end]))
+
+    def close(self):
+        for view in ("_ids", "_offsets", "_neighbours", "_counts"):
+            if hasattr(self, view):
+                getattr(self, view).release()
+        self._map.close()
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def benchmark(titles: int = 1_000_000, users: int = 200_000, borrows: int = 5,
+              lookups: int = 100_000) -> Dict[str, float]:
+    import random
+    import tempfile
+
+    rng = random.Random(7)
+    model = CoBorrowModel()
+    start = time.perf_counter()
+    for _ in range(users * borrows):
+        # A skewed pick, so some titles are popular and rows get long.
+        model.record(f"user_{rng.randrange(users)}", int(titles * rng.random() ** 2))
+    updates = users * borrows / (time.perf_counter() - start)
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "recommendations.idx")
+        start = time.perf_counter()
+        model.save(path)
+        save_seconds = time.perf_counter() - start
+        start = time.perf_counter()
+        index = RecommendationIndex(path)
+        load_seconds = time.perf_counter() - start
+        probes = [rng.randrange(titles) for _ in range(lookups)]
+        start = time.perf_counter()
+        for resource_id in probes:
+            index.recommend(resource_id)
+        lookup_us = (time.perf_counter() - start) / lookups * 1e6
+        assert index.recommend(0) == model.recommend(0)
+        items = len(index)
+        index.close()
+    return {"titles_with_pairs": items, "updates_per_sec": updates,
+            "save_seconds": save_seconds, "load_seconds": load_seconds,
+            "lookup_us": lookup_us}
+
+
+if __name__ == "__main__":
+    result = benchmark()
+    print(f"Titles with co-borrows: {result['titles_with_pairs']:,}")
+    print(f"Incremental updates: {result['updates_per_sec']:,.0f} checkouts/sec")
+    print(f"Save: {result['save_seconds']:.2f} s | Load: {result['load_seconds'] * 1000:.2f} ms")
+    print(f"Lookup: {result['lookup_us']:.2f} µs")
@@ -0,0 +1,290 @@
+import contextlib
+import heapq
+import multiprocessing
+import os
+import sys
+import threading
+import time
+from itertools import islice
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from src.core.circulation import REQUESTS, CirculationDesk
+from src.core.engine import Query, parse_query
+from src.models.book import Resource, ResourceFactory
+from src.repository.storage import data_path, load_copies, read_rows
+
+
+# Requests that name one resource and go to the shard that owns it;
+# search and count go to every shard.
+ROUTED = REQUESTS - {"search", "count"}
+
+
+class ShardError(RuntimeError):
+    """Raised when a shard fails to run a request or its worker has died"""
+
+
+def shard_of(resource_id: int, shards: int) -> int:
+    return resource_id % shards
+
+
+def load_shard(shard: int, shards: int, resources_path: Optional[str] = None,
+               copies_path: Optional[str] = None) -> Dict[int, Resource]:
+    """The resources (and their copies) owned by one shard"""
+    resources = {}
+    for row in read_rows(resources_path or data_path("resources.csv")):
+        try:
+            if shard_of(int(row["id"]), shards) != shard:
+                continue
+            resource = ResourceFactory.create_from_csv_row(row)
+        except (KeyError, ValueError):
+            continue  # load_resources reports these
+        resources[resource.id] = resource
+    load_copies(resources, copies_path)
+    return resources
+
+
+def _serve(shard: int, shards: int, resources_path: Optional[str], copies_path: Optional[str],
+           connection):
+    # Worker loop: each message is a list of (method, args); replies keep its order.
+    sys.stdout = open(os.devnull, "w")  # the models print on every checkout
+    desk = CirculationDesk(load_shard(shard, shards, resources_path, copies_path))
+    connection.send(len(desk.resources))
+    while True:
+        try:
+            message = connection.recv()
+        except EOFError:
+            break  # the parent exited without close()
+        if message is None:
+            break
+        replies = []
+        for method, args in message:
+            try:
+                replies.append((True, desk.handle(method, args)))
+            except Exception as e:
+                replies.append((False, f"{type(e).__name__}: {e}"))
+        connection.send(replies)
+    connection.close()
+
+
+def page_query(query: Query) -> Query:
+    """The same query from the first row, deep enough to cover the page"""
+    shard_query = Query()
+    shard_query.conditions = list(query.conditions)
+    shard_query.order_by(query.order_field, query.descending)
+    if query.limit is not None:
+        shard_query.page(query.offset + query.limit)
+    return shard_query
+
+
+# The catalog split by resource id over worker processes, each with its own
+# CirculationDesk (and so its own GIL). Calls are routed over a pipe to the
+# owning shard; batch() sends every shard its share at once so the shards
+# work in parallel, and search() gathers and merges the shards' pages.
+# Throughput only scales with shards when there are as many free CPUs.
+class ShardedCatalog:
+    def __init__(self, shards: int = 4, resources_path: Optional[str] = None,
+                 copies_path: Optional[str] = None):
+        context = multiprocessing.get_context("spawn")
+        self.shards = shards
+        self._connections = []
+        self._processes = []
+        self._locks = [threading.Lock() for _ in range(shards)]
+        for shard in range(shards):
+            parent, child = context.Pipe()
+            process = context.Process(target=_serve, name=f"catalog-shard-{shard}", daemon=True,
+                                      args=(shard, shards, resources_path, copies_path, child))
+            process.start()
+            child.close()
+            self._connections.append(parent)
+            self._processes.append(process)
+        self.sizes = []
+        for shard, connection in enumerate(self._connections):
+            try:
+                self.sizes.append(connection.recv())
+            except EOFError:
+                self.close()
+                raise ShardError(f"Shard {shard} exited while loading") from None
+
+    def __len__(self):
+        return sum(self.sizes)
+
+    def _scatter(self, requests: Dict[int, List[Tuple[str, tuple]]]) -> Dict[int, List[Tuple[bool, Any]]]:
+        # Send to every shard before waiting on any; locks are taken in shard
+        # order so concurrent callers cannot deadlock. Every live shard's
+        # reply is read even if another shard died, so no pipe is left
+        # holding a reply for the next caller.
+        shards = sorted(requests)
+        for shard in shards:
+            self._locks[shard].acquire()
+        replies, dead = {}, []
+        try:
+            sent = []
+            for shard in shards:
+                try:
+                    self._connections[shard].send(requests[shard])
+                    sent.append(shard)
+                except (BrokenPipeError, OSError):
+                    dead.append(shard)
+            for shard in sent:
+                try:
+                    replies[shard] = self._connections[shard].recv()
+                except (EOFError, OSError):
+                    dead.append(shard)
+        finally:
+            for shard in shards:
+                self._locks[shard].release()
+        if dead:
+            raise ShardError(f"Shard worker(s) {', '.join(map(str, sorted(dead)))} exited")
+        return replies
+
+    def _call(self, shard: int, method: str, args: tuple) -> Any:
+        ok, value = self._scatter({shard: [(method, args)]})[shard][0]
+        if not ok:
+            raise ShardError(f"Shard {shard}: {value}")
+        return value
+
+    def _route(self, method: str, resource_id: int, *args) -> Any:
+        return self._call(shard_of(resource_id, self.shards), method, (resource_id, *args))
+
+    def _gather(self, method: str, args: tuple) -> List[Any]:
+        # The same request on every shard.
+        replies = self._scatter({shard: [(method, args)] for shard in range(self.shards)})
+        values = []
+        for shard, [(ok, value)] in sorted(replies.items()):
+            if not ok:
+                raise ShardError(f"Shard {shard}: {value}")
+            values.append(value)
+        return values
+
+    def lookup(self, resource_id: int) -> Optional[Dict[str, Any]]:
+        return self._route("lookup", resource_id)
+
+    def check_out(self, resource_id: int, user_id: str) -> Dict[str, Any]:
+        return self._route("check_out", resource_id, user_id)
+
+    def check_in(self, resource_id: int, copy_id: Optional[str] = None) -> Dict[str, Any]:
+        return self._route("check_in", resource_id, copy_id)
+
+    def place_hold(self, resource_id: int, user_id: str) -> Dict[str, Any]:
+        return self._route("place_hold", resource_id, user_id)
+
+    def cancel_hold(self, resource_id: int, user_id: str) -> Dict[str, Any]:
+        return self._route("cancel_hold", resource_id, user_id)
+
+    def batch(self, requests: List[Tuple[str, tuple]]) -> List[Any]:
+        """Results of many (method, (resource_id, ...)) requests, in order; a
+        request that fails gets {'ok': False, 'error': ...} in its place"""
+        by_shard: Dict[int, List[Tuple[str, tuple]]] = {}
+        positions: Dict[int, List[int]] = {}
+        results: List[Any] = [None] * len(requests)
+        for position, (method, args) in enumerate(requests):
+            if method not in ROUTED:
+                results[position] = {'ok': False, 'error': f"{method} cannot be batched"}
+                continue
+            if not args or not isinstance(args[0], int):
+                results[position] = {'ok': False, 'error': f"{method} needs a resource id first"}
+                continue
+            shard = shard_of(args[0], self.shards)
+            by_shard.setdefault(shard, []).append((method, tuple(args)))
+            positions.setdefault(shard, []).append(position)
+        for shard, replies in self._scatter(by_shard).items():
+            for position, (ok, value) in zip(positions[shard], replies):
+                results[position] = value if ok else {'ok': False, 'error': value}
+        return results
+
+    def search(self, query) -> List[Dict[str, Any]]:
+        """Every shard's first offset + limit rows, merged in query order"""
+        return list(self.iter_search(query))
+
+    def iter_search(self, query) -> Iterator[Dict[str, Any]]:
+        """search() as an iterator over the merged pages"""
+        if isinstance(query, str):
+            query = parse_query(query)
+        shard_query = page_query(query)
+        pages = self._gather("search", (shard_query,))
+        field = query.order_field
+        merged = heapq.merge(*pages,
+                             key=lambda row: (row[field], row['id']), reverse=query.descending)
+        end = None if query.limit is None else query.offset + query.limit
+        return islice(merged, query.offset, end)
+
+    def count(self, query) -> int:
+        if isinstance(query, str):
+            query = parse_query(query)
+        return sum(self._gather("count", (query,)))
+
+    def close(self):
+        for connection, lock in zip(self._connections, self._locks):
+            with lock, contextlib.suppress(OSError):
+                connection.send(None)
+        for process in self._processes:
+            process.join()
+        for connection in self._connections:
+            connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def benchmark(rows: int = 100_000, shard_counts=(1, 2, 4), operations: int = 100_000,
+              batch_size: int = 1_000) -> Dict[int, Dict[str, float]]:
+    """Checkout/check-in throughput, batched and one call at a time.
+
+    Scaling with shard count has only been measured on one CPU, where the
+    shards take turns: 20k rows gave about 26.7k batched ops/s with 1 shard
+    and 28.8k with 2. Numbers from a multi-CPU machine are still missing."""
+    import random
+    import tempfile
+
+    from src.repository.storage import write_synthetic_resources
+
+    rng = random.Random(13)
+    results = {}
+    with tempfile.TemporaryDirectory() as directory:
+        resources_path = os.path.join(directory, "resources.csv")
+        copies_path = os.path.join(directory, "copies.csv")
+        write_synthetic_resources(resources_path, rows)
+        with open(copies_path, "w") as file:
+            file.write("copy_id,resource_id,barcode,condition,location,status,purchase_date,"
+                       "notes,checkout_count,last_checkout\n")
+        ids = [1 + rng.randrange(rows) for _ in range(operations // 2)]
+        for shards in shard_counts:
+            with ShardedCatalog(shards, resources_path, copies_path) as catalog:
+                start = time.perf_counter()
+                for first in range(0, len(ids), batch_size):
+                    chunk = ids[first:first + batch_size]
+                    loans = catalog.batch([("check_out", (resource_id, f"user_{resource_id % 977}"))
+                                           for resource_id in chunk])
+                    catalog.batch([("check_in", (resource_id, loan.get('copy_id')))
+                                   for resource_id, loan in zip(chunk, loans) if loan['ok']])
+                batched = operations / (time.perf_counter() - start)
+
+                single = ids[:2_000]
+                start = time.perf_counter()
+                for resource_id in single:
+                    loan = catalog.check_out(resource_id, "single_user")
+                    if loan['ok']:
+                        catalog.check_in(resource_id, loan['copy_id'])
+                unbatched = 2 * len(single) / (time.perf_counter() - start)
+
+                start = time.perf_counter()
+                for _ in range(20):
+                    catalog.search("genre = 'data_science' ORDER BY title LIMIT 20")
+                search_ms = (time.perf_counter() - start) / 20 * 1000
+            results[shards] = {"batched_ops_per_sec": batched, "unbatched_ops_per_sec": unbatched,
+                               "search_ms": search_ms}
+    return results
+
+
+if __name__ == "__main__":
+    print(f"CPUs available: {os.cpu_count()}")
+    if (os.cpu_count() or 1) < 2:
+        print("⚠️ With one CPU the shard processes take turns, so these numbers show the "
+              "cost of sharding, not its scaling")
+    for shards, result in benchmark().items():
+        print(f"{shards} shard(s): batched {result['batched_ops_per_sec']:,.0f} ops/sec | "
+              f"one at a time {result['unbatched_ops_per_sec']:,.0f} ops/sec | "
+              f"scatter-gather search {result['search_ms']:.1f} ms")
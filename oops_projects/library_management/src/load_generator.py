@@ -0,0 +1,210 @@
+import argparse
+import asyncio
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from src.repository.storage import write_synthetic_resources
+
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+GENRES = ("data_science", "signal_processing", "mathematics", "computer_science", "economics")
+
+
+# A minimal HTTP/1.1 client over one connection, reused for every request
+# unless keep_alive is off.
+class HttpClient:
+    def __init__(self, host: str, port: int, keep_alive: bool = True):
+        self.host = host
+        self.port = port
+        self.keep_alive = keep_alive
+        self.reader: Optional[asyncio.StreamReader] = None
+        self.writer: Optional[asyncio.StreamWriter] = None
+        self.connects = 0
+
+    async def _connect(self):
+        self.reader, self.writer = await asyncio.open_connection(self.host, self.port)
+        self.connects += 1
+
+    async def request(self, method: str, path: str, payload: Any = None) -> Tuple[int, Any]:
+        if self.writer is None:
+            await self._connect()
+        body = b"" if payload is None else json.dumps(payload).encode()
+        head = (f"{method} {path} HTTP/1.1\r\nHost: {self.host}\r\nContent-Type: application/json\r\n"
+                f"Content-Length: {len(body)}\r\nConnection: {'keep-alive' if self.keep_alive else 'close'}\r\n\r\n")
+        self.writer.write(head.encode("latin-1") + body)
+        status = int((await self.reader.readline()).split()[1])
+        headers = {}
+        while True:
+            line = await self.reader.readline()
+            if line in (b"\r\n", b""):
+                break
+            name, _, value = line.decode("latin-1").partition(":")
+            headers[name.strip().lower()] = value.strip()
+        if headers.get("transfer-encoding") == "chunked":
+            parts = []
+            while True:
+                size = int((await self.reader.readline()).strip(), 16)
+                data = await self.reader.readexactly(size + 2)
+                if size == 0:
+                    break
+                parts.append(data[:-2])
+            data = b"".join(parts)
+        else:
+            data = await self.reader.readexactly(int(headers.get("content-length", 0)))
+        if not self.keep_alive or headers.get("connection") == "close":
+            await self.close()
+        return status, json.loads(data) if data else None
+
+    async def close(self):
+        if self.writer is not None:
+            self.writer.close()
+            try:
+                await self.writer.wait_closed()
+            except ConnectionError:
+                pass
+            self.reader = self.writer = None
+
+
+def _percentiles(latencies: List[float]) -> Dict[str, float]:
+    ordered = sorted(latencies)
+    pick = lambda share: ordered[min(len(ordered) - 1, int(share * len(ordered)))] * 1000
+    return {"p50_ms": pick(0.50), "p99_ms": pick(0.99), "max_ms": ordered[-1] * 1000}
+
+
+async def _worker(client: HttpClient, rng: random.Random, resources: int, requests: int,
+                  batch: int, latencies: Dict[str, List[float]], loans: List[Tuple[int, str]]):
+    # A circulation desk's mix: lookups, searches, checkouts and returns, some holds.
+    user = f"load_user_{rng.randrange(10_000)}"
+    for _ in range(requests):
+        roll = rng.random()
+        resource_id = 1 + rng.randrange(resources)
+        if batch > 1:
+            kind, method, path = "batch", "POST", "/batch"
+            ops = []
+            for _ in range(batch):
+                if loans and rng.random() < 0.5:
+                    returned, copy_id = loans.pop()
+                    ops.append({"op": "check_in", "args": [returned, copy_id]})
+                else:
+                    ops.append({"op": "check_out", "args": [1 + rng.randrange(resources), user]})
+            payload = {"requests": ops}
+        elif roll < 0.35:
+            kind, method, path, payload = "lookup", "GET", f"/resources/{resource_id}", None
+        elif roll < 0.50:
+            kind, method, path, payload = "search", "GET", \
+                f"/search?q=genre%20%3D%20{rng.choice(GENRES)}%20ORDER%20BY%20title&limit=20", None
+        elif roll < 0.75:
+            kind, method, path = "checkout", "POST", "/checkout"
+            payload = {"resource_id": resource_id, "user_id": user}
+        elif roll < 0.95 and loans:
+            returned, copy_id = loans.pop()
+            kind, method, path = "checkin", "POST", "/checkin"
+            payload = {"resource_id": returned, "copy_id": copy_id}
+        else:
+            kind, method, path = "hold", "POST", "/holds"
+            payload = {"resource_id": resource_id, "user_id": user}
+        start = time.perf_counter()
+        status, body = await client.request(method, path, payload)
+        latencies.setdefault(kind, []).append(time.perf_counter() - start)
+        if status != 200:
+            latencies.setdefault("errors", []).append(0.0)
+        results = body.get("results", []) if kind == "batch" else [body] if kind == "checkout" else []
+        for op, result in zip(payload["requests"] if kind == "batch" else [payload], results):
+            if isinstance(result, dict) and result.get("ok") and result.get("copy_id"):
+                loans.append((op["args"][0] if kind == "batch" else op["resource_id"], result["copy_id"]))
+    await client.close()
+
+
+async def run_load(host: str, port: int, connections: int, requests: int, resources: int,
+                   keep_alive: bool = True, batch: int = 1, seed: int = 1) -> Dict[str, Any]:
+    """Drive the service from many concurrent connections and time every request"""
+    rng = random.Random(seed)
+    latencies: Dict[str, List[float]] = {}
+    loans: List[Tuple[int, str]] = []
+    clients = [HttpClient(host, port, keep_alive) for _ in range(connections)]
+    per_client = requests // connections
+    start = time.perf_counter()
+    await asyncio.gather(*(_worker(client, random.Random(rng.random()), resources, per_client,
+                                   batch, latencies, loans) for client in clients))
+    seconds = time.perf_counter() - start
+    sent = per_client * connections
+    metrics_client = HttpClient(host, port)
+    _, server_metrics = await metrics_client.request("GET", "/metrics")
+    await metrics_client.close()
+    errors = len(latencies.pop("errors", []))
+    everything = [value for values in latencies.values() for value in values]
+    return {"requests": sent, "operations": sent * batch, "seconds": seconds, "errors": errors,
+            "requests_per_sec": sent / seconds, "operations_per_sec": sent * batch / seconds,
+            "connects": sum(client.connects for client in clients), "client": _percentiles(everything),
+            "by_kind": {kind: _percentiles(values) for kind, values in latencies.items()},
+            "server": server_metrics["routes"]}
+
+
+def _start_service(port: int, rows: int, directory: str, shards: int) -> subprocess.Popen:
+    # A local service on a synthetic catalog, started the way an operator would.
+    resources_path = os.path.join(directory, "resources.csv")
+    copies_path = os.path.join(directory, "copies.csv")
+    write_synthetic_resources(resources_path, rows)
+    with open(copies_path, "w") as file:
+        file.write("copy_id,resource_id,barcode,condition,location,status,purchase_date,"
+                   "notes,checkout_count,last_checkout\n")
+    command = [sys.executable, "-m", "src.main", "--port", str(port),
+               "--resources", resources_path, "--copies", copies_path]
+    if shards:
+        command += ["--shards", str(shards)]
+    process = subprocess.Popen(command, cwd=PROJECT_DIR, stdout=subprocess.PIPE, text=True)
+    for line in process.stdout:
+        if "Library service on" in line:
+            return process
+    raise RuntimeError("The service did not start")
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Load generator for the library service")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--connections", type=int, default=32)
+    parser.add_argument("--requests", type=int, default=20_000)
+    parser.add_argument("--batch", type=int, default=1, help="operations per /batch request (1 = no batching)")
+    parser.add_argument("--no-keep-alive", action="store_true", help="open a new connection per request")
+    parser.add_argument("--spawn", type=int, metavar="ROWS", default=0,
+                        help="start a local service on a synthetic catalog of ROWS resources first")
+    parser.add_argument("--shards", type=int, default=0, help="with --spawn, shards for the service")
+    parser.add_argument("--resources", type=int, default=258, help="resource ids to draw from")
+    options = parser.parse_args(argv)
+
+    process = None
+    with tempfile.TemporaryDirectory() as directory:
+        if options.spawn:
+            process = _start_service(options.port, options.spawn, directory, options.shards)
+            options.resources = options.spawn
+        try:
+            result = asyncio.run(run_load(options.host, options.port, options.connections, options.requests,
+                                          options.resources, not options.no_keep_alive, options.batch))
+        finally:
+            if process is not None:
+                process.terminate()
+                process.wait()
+
+    print(f"{result['requests']:,} requests ({result['operations']:,} operations) over "
+          f"{options.connections} connections, {result['connects']:,} TCP connects, {result['errors']} errors")
+    print(f"Throughput: {result['requests_per_sec']:,.0f} requests/sec, "
+          f"{result['operations_per_sec']:,.0f} operations/sec")
+    print(f"Client latency: p50 {result['client']['p50_ms']:.2f} ms | p99 {result['client']['p99_ms']:.2f} ms")
+    for kind, stats in sorted(result["by_kind"].items()):
+        print(f"  {kind:>8}: p50 {stats['p50_ms']:.2f} ms | p99 {stats['p99_ms']:.2f} ms")
+    print("Server latency:")
+    for route, stats in result["server"].items():
+        if "p50_ms" in stats:
+            print(f"  {route:>22}: {stats['count']:,} requests | p50 {stats['p50_ms']:.3f} ms | "
+                  f"p99 {stats['p99_ms']:.3f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,397 @@
+import argparse
+import asyncio
+import contextlib
+import json
+import os
+import time
+from collections import deque
+from itertools import chain, islice
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+from urllib.parse import parse_qs, urlsplit
+
+from src.core.circulation import CirculationDesk
+from src.core.engine import QueryError, parse_query
+from src.repository.storage import load_copies, load_resources
+
+
+IDLE_TIMEOUT = 30.0        # seconds a kept-alive connection may sit unused
+MAX_BODY = 1 << 20
+STREAM_ROWS = 500          # larger result sets are sent as chunked JSON
+STREAM_CHUNK = 200         # rows per chunk
+SEARCH_LIMIT = 100         # page size when a search does not ask for one
+MAX_BATCH = 1_000
+# Arguments each batchable request takes: (fewest, most)
+BATCH_ARITY = {"lookup": (1, 1), "check_out": (2, 2), "check_in": (1, 2),
+               "place_hold": (2, 2), "cancel_hold": (2, 2)}
+# What the argument after the resource id names, where there is one
+BATCH_ARGS = {"check_out": "user_id", "check_in": "copy_id", "place_hold": "user_id",
+              "cancel_hold": "user_id"}
+LATENCY_WINDOW = 10_000    # recent requests per route kept for percentiles
+
+REASONS = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed",
+           413: "Payload Too Large", 500: "Internal Server Error"}
+
+
+class HttpError(Exception):
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+
+
+def _checked(name: str, value: Any) -> Any:
+    """value as given for a user_id or copy_id; ValueError if it cannot be one"""
+    if name == "copy_id":
+        if value is not None and not isinstance(value, str):
+            raise ValueError("copy_id must be a string")
+    elif not isinstance(value, str) or not value:
+        raise ValueError(f"{name} must be a non-empty string")
+    return value
+
+
+# One parsed HTTP/1.1 request.
+class Request:
+    def __init__(self, method: str, target: str, version: str, headers: Dict[str, str], body: bytes):
+        self.method = method
+        parts = urlsplit(target)
+        self.path = parts.path.rstrip("/") or "/"
+        self.params = {key: values[-1] for key, values in parse_qs(parts.query).items()}
+        self.headers = headers
+        self.body = body
+        connection = headers.get("connection", "").lower()
+        self.keep_alive = connection != "close" if version == "HTTP/1.1" else connection == "keep-alive"
+
+    def json(self) -> Any:
+        try:
+            return json.loads(self.body or b"{}")
+        except ValueError:
+            raise HttpError(400, "Body is not valid JSON") from None
+
+
+async def _read_line(reader: asyncio.StreamReader) -> bytes:
+    try:
+        return await reader.readline()
+    except (ValueError, asyncio.LimitOverrunError):
+        # readline() reports a line longer than the reader's limit as ValueError.
+        raise HttpError(400, "Request line or header too long") from None
+
+
+async def read_request(reader: asyncio.StreamReader) -> Optional[Request]:
+    """The next request on a connection, None once the client has gone"""
+    line = await _read_line(reader)
+    if not line.strip():
+        return None
+    try:
+        method, target, version = line.decode("latin-1").split()
+    except ValueError:
+        raise HttpError(400, "Malformed request line") from None
+    headers = {}
+    while True:
+        line = await _read_line(reader)
+        if line in (b"\r\n", b"\n", b""):
+            break
+        name, _, value = line.decode("latin-1").partition(":")
+        headers[name.strip().lower()] = value.strip()
+    try:
+        length = int(headers.get("content-length") or 0)
+    except ValueError:
+        raise HttpError(400, "Content-Length is not a number") from None
+    if length < 0:
+        raise HttpError(400, "Content-Length is negative")
+    if length > MAX_BODY:
+        raise HttpError(413, f"Body over {MAX_BODY} bytes")
+    body = await reader.readexactly(length) if length else b""
+    return Request(method, target, version, headers, body)
+
+
+def response_head(status: int, keep_alive: bool, length: Optional[int] = None) -> bytes:
+    lines = [f"HTTP/1.1 {status} {REASONS.get(status, 'OK')}", "Content-Type: application/json",
+             f"Connection: {'keep-alive' if keep_alive else 'close'}"]
+    lines.append(f"Content-Length: {length}" if length is not None else "Transfer-Encoding: chunked")
+    return ("\r\n".join(lines) + "\r\n\r\n").encode("latin-1")
+
+
+# Request latencies per route: totals since start, percentiles over a recent window.
+class LatencyStats:
+    def __init__(self):
+        self.count = 0
+        self.errors = 0
+        self.recent: deque = deque(maxlen=LATENCY_WINDOW)
+
+    def record(self, seconds: float, status: int):
+        self.count += 1
+        if status >= 400:
+            self.errors += 1
+        self.recent.append(seconds)
+
+    def summary(self) -> Dict[str, float]:
+        ordered = sorted(self.recent)
+        if not ordered:
+            return {"count": self.count, "errors": self.errors}
+        percentile = lambda share: ordered[min(len(ordered) - 1, int(share * len(ordered)))] * 1000
+        return {"count": self.count, "errors": self.errors, "p50_ms": percentile(0.50),
+                "p99_ms": percentile(0.99), "max_ms": ordered[-1] * 1000}
+
+
+# Catalog search, checkout, check-in and holds over HTTP/JSON. The backend
+# is a CirculationDesk, called directly on the event loop, or a
+# ShardedCatalog, whose blocking pipe calls run in worker threads. Searches
+# for more than STREAM_ROWS rows run in a worker thread either way; their
+# rows are all read while the desk is locked, so no checkout changes the
+# catalog under them, and are streamed to the client after it is released.
+class LibraryService:
+    def __init__(self, backend, blocking: bool = False):
+        self.backend = backend
+        self.blocking = blocking
+        self._desk_lock = asyncio.Lock()
+        self.latency: Dict[str, LatencyStats] = {}
+        self.connections = 0
+        self.open_connections = 0
+        self.started = time.time()
+        self.routes = {
+            ("GET", "/health"): self.health,
+            ("GET", "/metrics"): self.metrics,
+            ("GET", "/search"): self.search,
+            ("POST", "/checkout"): self.check_out,
+            ("POST", "/checkin"): self.check_in,
+            ("POST", "/holds"): self.place_hold,
+            ("DELETE", "/holds"): self.cancel_hold,
+            ("POST", "/batch"): self.batch,
+        }
+
+    async def _call(self, method: str, *args, offload: bool = False) -> Any:
+        function = getattr(self.backend, method)
+        if self.blocking:
+            return await asyncio.to_thread(function, *args)
+        async with self._desk_lock:
+            if offload:
+                return await asyncio.to_thread(function, *args)
+            return function(*args)
+
+    # Handlers: each returns (status, payload); an iterator payload is streamed if long
+    async def health(self, request: Request):
+        return 200, {"ok": True}
+
+    async def metrics(self, request: Request):
+        return 200, {"uptime_seconds": time.time() - self.started, "connections": self.connections,
+                     "open_connections": self.open_connections,
+                     "routes": {route: stats.summary() for route, stats in sorted(self.latency.items())}}
+
+    async def lookup(self, request: Request, resource_id: int):
+        resource = await self._call("lookup", resource_id)
+        if resource is None:
+            raise HttpError(404, f"Resource {resource_id} not found")
+        return 200, resource
+
+    async def search(self, request: Request):
+        """Rows of one page, SEARCH_LIMIT unless the query or ?limit= asks otherwise"""
+        try:
+            query = parse_query(request.params.get("q", ""))
+            if "limit" in request.params or "offset" in request.params:
+                limit = request.params.get("limit")
+                query.page(int(limit) if limit else None, int(request.params.get("offset", 0)))
+            if query.limit is None:
+                query.page(SEARCH_LIMIT, query.offset)
+            if query.limit < 0 or query.offset < 0:
+                raise ValueError("limit and offset cannot be negative")
+        except (QueryError, ValueError) as e:
+            raise HttpError(400, str(e)) from None
+        rows = await self._call("search", query, offload=query.limit > STREAM_ROWS)
+        return 200, iter(rows)
+
+    def _fields(self, request: Request, *names: str, optional: Tuple[str, ...] = ()) -> List[Any]:
+        data = request.json()
+        if not isinstance(data, dict) or "resource_id" not in data:
+            raise HttpError(400, "resource_id is required")
+        try:
+            values = [int(data["resource_id"])]
+        except (TypeError, ValueError):
+            raise HttpError(400, "resource_id must be a number") from None
+        for name in names:
+            if data.get(name) in (None, "") and name not in optional:
+                raise HttpError(400, f"{name} is required")
+            try:
+                values.append(_checked(name, data.get(name)))
+            except ValueError as e:
+                raise HttpError(400, str(e)) from None
+        return values
+
+    async def check_out(self, request: Request):
+        resource_id, user_id = self._fields(request, "user_id")
+        return 200, await self._call("check_out", resource_id, user_id)
+
+    async def check_in(self, request: Request):
+        resource_id, copy_id = self._fields(request, "copy_id", optional=("copy_id",))
+        return 200, await self._call("check_in", resource_id, copy_id)
+
+    async def place_hold(self, request: Request):
+        resource_id, user_id = self._fields(request, "user_id")
+        return 200, await self._call("place_hold", resource_id, user_id)
+
+    async def cancel_hold(self, request: Request):
+        resource_id, user_id = self._fields(request, "user_id")
+        return 200, await self._call("cancel_hold", resource_id, user_id)
+
+    @staticmethod
+    def _batch_call(item: Any) -> Tuple[str, tuple]:
+        # One batch item as a backend call; ValueError says what is wrong with it.
+        op, args = (item.get("op"), item.get("args", [])) if isinstance(item, dict) else (None, None)
+        if op not in BATCH_ARITY or not isinstance(args, list):
+            raise ValueError(f"Cannot batch {op!r} with {args!r}")
+        fewest, most = BATCH_ARITY[op]
+        if not fewest <= len(args) <= most:
+            raise ValueError(f"{op} takes {fewest}" + (f" to {most}" if most != fewest else "") +
+                             f" arguments, got {len(args)}")
+        try:
+            resource_id = int(args[0])
+        except (TypeError, ValueError):
+            raise ValueError("The first argument must be a resource id") from None
+        if len(args) > 1:
+            _checked(BATCH_ARGS[op], args[1])
+        return op, (resource_id, *args[1:])
+
+    async def batch(self, request: Request):
+        """{"requests": [{"op": "check_out", "args": [id, user]}, ...]} in one round trip;
+        an item that cannot run gets {"ok": false, "error": ...} in its place"""
+        data = request.json()
+        items = data.get("requests") if isinstance(data, dict) else None
+        if not isinstance(items, list) or len(items) > MAX_BATCH:
+            raise HttpError(400, f"requests must be a list of at most {MAX_BATCH}")
+        results: List[Any] = [None] * len(items)
+        calls: List[Tuple[str, tuple]] = []
+        positions: List[int] = []
+        for position, item in enumerate(items):
+            try:
+                calls.append(self._batch_call(item))
+                positions.append(position)
+            except ValueError as e:
+                results[position] = {"ok": False, "error": str(e)}
+        if calls:
+            for position, result in zip(positions, await self._call("batch", calls)):
+                results[position] = result
+        return 200, {"results": results}
+
+    # HTTP
+    async def dispatch(self, request: Request) -> Tuple[str, int, Any]:
+        if request.path.startswith("/resources/"):
+            if request.method != "GET":
+                raise HttpError(405, f"{request.method} not allowed")
+            try:
+                resource_id = int(request.path.rsplit("/", 1)[1])
+            except ValueError:
+                raise HttpError(404, f"No resource at {request.path}") from None
+            return ("GET /resources/{id}",) + await self.lookup(request, resource_id)
+        handler = self.routes.get((request.method, request.path))
+        if handler is None:
+            if any(path == request.path for _, path in self.routes):
+                raise HttpError(405, f"{request.method} not allowed on {request.path}")
+            raise HttpError(404, f"No route for {request.path}")
+        return (f"{request.method} {request.path}",) + await handler(request)
+
+    async def _stream(self, writer: asyncio.StreamWriter, rows: Iterable[Any], keep_alive: bool):
+        # {"results": [...], "count": n} in chunks, taking rows from the iterator
+        # only as fast as the client reads them.
+        def chunk(data: bytes) -> bytes:
+            return b"%x\r\n%s\r\n" % (len(data), data)
+
+        rows = iter(rows)
+        writer.write(response_head(200, keep_alive) + chunk(b'{"results": ['))
+        count = 0
+        while True:
+            page = list(islice(rows, STREAM_CHUNK))
+            if not page:
+                break
+            text = ", ".join(json.dumps(row) for row in page)
+            writer.write(chunk(((", " if count else "") + text).encode()))
+            count += len(page)
+            await writer.drain()
+        writer.write(chunk(f'], "count": {count}}}'.encode()) + b"0\r\n\r\n")
+
+    async def handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        """Serve requests on one connection until the client closes it or idles out"""
+        self.connections += 1
+        self.open_connections += 1
+        try:
+            while True:
+                try:
+                    request = await asyncio.wait_for(read_request(reader), IDLE_TIMEOUT)
+                except (asyncio.TimeoutError, asyncio.IncompleteReadError, ConnectionError):
+                    break
+                except HttpError as e:
+                    body = json.dumps({"error": str(e)}).encode()
+                    writer.write(response_head(e.status, False, len(body)) + body)
+                    break
+                if request is None:
+                    break
+                start = time.perf_counter()
+                route, keep_alive = f"{request.method} {request.path}", request.keep_alive
+                try:
+                    route, status, payload = await self.dispatch(request)
+                except HttpError as e:
+                    status, payload = e.status, {"error": str(e)}
+                except Exception as e:
+                    status, payload = 500, {"error": f"{type(e).__name__}: {e}"}
+                if isinstance(payload, Iterator):
+                    # Small pages go out whole with a Content-Length; longer ones stream.
+                    head = list(islice(payload, STREAM_ROWS + 1))
+                    payload = head if len(head) <= STREAM_ROWS else chain(head, payload)
+                if isinstance(payload, Iterator):
+                    await self._stream(writer, payload, keep_alive)
+                else:
+                    if isinstance(payload, list):
+                        payload = {"count": len(payload), "results": payload}
+                    body = json.dumps(payload).encode()
+                    writer.write(response_head(status, keep_alive, len(body)) + body)
+                await writer.drain()
+                stats = self.latency.get(route)
+                if stats is None:
+                    stats = self.latency[route] = LatencyStats()
+                stats.record(time.perf_counter() - start, status)
+                if not keep_alive:
+                    break
+        except ConnectionError:
+            pass
+        finally:
+            self.open_connections -= 1
+            writer.close()
+
+
+async def serve(service: LibraryService, host: str, port: int):
+    server = await asyncio.start_server(service.handle_connection, host, port)
+    host, port = server.sockets[0].getsockname()[:2]
+    print(f"📡 Library service on http://{host}:{port} (Ctrl+C to stop)", flush=True)
+    # The models print on every checkout; keep that off the console while serving.
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        async with server:
+            await server.serve_forever()
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Library circulation service (HTTP/JSON)")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--resources", help="resources CSV (default: DATA/resources.csv)")
+    parser.add_argument("--copies", help="copies CSV (default: DATA/copies.csv)")
+    parser.add_argument("--shards", type=int, default=0,
+                        help="serve from this many catalog worker processes instead of in-process")
+    options = parser.parse_args(argv)
+
+    if options.shards:
+        from src.core.sharding import ShardedCatalog
+        backend = ShardedCatalog(options.shards, options.resources, options.copies)
+        service = LibraryService(backend, blocking=True)
+    else:
+        resources = load_resources(options.resources)
+        load_copies(resources, options.copies)
+        service = LibraryService(CirculationDesk(resources))
+    print(f"📚 Loaded {len(service.backend):,} resources")
+    try:
+        asyncio.run(serve(service, options.host, options.port))
+    except KeyboardInterrupt:
+        print("👋 Service stopped")
+    finally:
+        if options.shards:
+            service.backend.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -3,6 +3,9 @@ from enum import Enum
 from datetime import datetime
 from typing import Optional, List, Dict, Any
 
+from src.models.events import ChangeType, publish_change
+from src.utils.interning import RESOURCE_FIELDS, intern_value
+
 
 # Enums for better type safety and readability
 class ResourceType(Enum):
@@ -80,9 +83,9 @@ class PhysicalCopy:
         self.resource_id = resource_id
         self.barcode = barcode
         self.condition = condition
-        self.location = location
+        self.location = intern_value("location", location)
         self.status = status
-        self.purchase_date = purchase_date or datetime.now().strftime("%Y-%m-%d")
+        self.purchase_date = intern_value("purchase_date", purchase_date or datetime.now().strftime("%Y-%m-%d"))
         self.notes = notes
         self.checkout_count = 0
         self.last_checkout = None
@@ -175,17 +178,17 @@ class Resource(ABC):
         self.title: str = title
         self.author: str = author
         self.isbn: Optional[str] = isbn
-        self.genre: str = genre
-        self.category: str = category
+        self.genre: str = intern_value("genre", genre)
+        self.category: str = intern_value("category", category)
         self.pages: int = pages
-        self.publisher: str = publisher
-        self.language: str = language
-        self.edition: str = edition
+        self.publisher: str = intern_value("publisher", publisher)
+        self.language: str = intern_value("language", language)
+        self.edition: str = intern_value("edition", edition)
         self.publication_date: Optional[str] = publication_date
         self.type: int = type
         self.format: int = format
         self.condition: int = condition
-        self.location: str = location
+        self.location: str = intern_value("location", location)
         self.status: int = status
         self.copies: int = copies
         self.total_copies: int = total_copies or copies
@@ -283,10 +286,13 @@ class Resource(ABC):
     def update_details(self, **kwargs) -> bool:
         """Edit resource details"""
         try:
+            changed = {}
             for key, value in kwargs.items():
                 if hasattr(self, key) and key not in ['id', 'date_added']:
-                    setattr(self, key, value)
+                    setattr(self, key, intern_value(key, value) if key in RESOURCE_FIELDS else value)
+                    changed[key] = value
             self.last_updated = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+            publish_change(ChangeType.UPDATE_DETAILS, self, **changed)
             print(f"✅ {self.title} details updated successfully.")
             return True
         except Exception as e:
@@ -297,6 +303,7 @@ class Resource(ABC):
         """Archive the resource (soft delete)"""
         self.status = -1
         self.last_updated = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        publish_change(ChangeType.ARCHIVE, self, status=self.status)
         print(f"📦 {self.title} has been archived.")
         return True
     
@@ -320,6 +327,8 @@ class Resource(ABC):
             self.total_copies += 1
             self.copies += 1
             self.last_updated = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+            publish_change(ChangeType.ADD_COPY, self, copy_id, copies=self.copies,
+                           total_copies=self.total_copies)
             
             print(f"✅ New copy added with ID: {copy_id}")
             return copy_id
@@ -337,6 +346,8 @@ class Resource(ABC):
                     if removed.status == 0:
                         self.copies -= 1
                     self.last_updated = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+                    publish_change(ChangeType.REMOVE_COPY, self, copy_id, copies=self.copies,
+                                   total_copies=self.total_copies)
                     print(f"✅ Copy {copy_id} removed.")
                     return True
                 else:
@@ -354,6 +365,7 @@ class Resource(ABC):
                 if copy.copy_id == copy_id:
                     old_condition = copy.condition
                     copy.update_condition(condition)
+                    publish_change(ChangeType.UPDATE_CONDITION, self, copy_id, condition=new_condition)
                     print(f"✅ Copy {copy_id} condition changed from {old_condition.name} to {condition.name}")
                     return True
             print(f"❌ Copy {copy_id} not found.")
@@ -365,6 +377,7 @@ class Resource(ABC):
             if self.format == 0:
                 for copy in self.physical_copies:
                     copy.update_condition(condition)
+            publish_change(ChangeType.UPDATE_CONDITION, self, condition=new_condition)
             print(f"✅ Resource condition changed from {old_condition.name} to {condition.name}")
             return True
     
@@ -377,11 +390,12 @@ class Resource(ABC):
     def set_location(self, new_location: str) -> bool:
         """Set new shelf location for all copies"""
         old_location = self.location
-        self.location = new_location
+        self.location = new_location = intern_value("location", new_location)
         if self.format == 0:
             for copy in self.physical_copies:
                 copy.location = new_location
         self.last_updated = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        publish_change(ChangeType.SET_LOCATION, self, location=new_location)
         print(f"📍 Location updated from '{old_location}' to '{new_location}'")
         return True
     
@@ -444,6 +458,8 @@ class Book(Resource):
                 self.copies -= 1
                 if self.copies == 0:
                     self.status = 1
+                publish_change(ChangeType.CHECK_OUT, self, copy.copy_id, user_id,
+                               copies=self.copies, status=self.status)
                 print(f"✅ '{self.title}' (Copy: {copy.copy_id}) has been checked out to {user_id or 'Unknown'}.")
                 return copy.copy_id
             else:
@@ -461,9 +477,12 @@ class Book(Resource):
             
             for copy in self.physical_copies:
                 if copy.copy_id == copy_id and copy.status == 1:
+                    holder = copy.current_holder
                     copy.check_in()
                     self.copies += 1
                     self.status = 0
+                    publish_change(ChangeType.CHECK_IN, self, copy_id, holder,
+                                   copies=self.copies, status=self.status)
                     print(f"✅ '{self.title}' (Copy: {copy_id}) has been checked in.")
                     return True
             
@@ -492,6 +511,8 @@ class Journal(Resource):
             self.copies -= 1
             if self.copies == 0:
                 self.status = 1
+            publish_change(ChangeType.CHECK_OUT, self, None, user_id,
+                           copies=self.copies, status=self.status)
             print(f"✅ '{self.title}' (Volume: {self.volume}) has been checked out.")
             return True
         elif self.format == 1:
@@ -504,6 +525,9 @@ class Journal(Resource):
     def check_in(self, copy_id: Optional[str] = None):
         self.copies += 1
         self.status = 0
+        if self.format == 0:
+            # Journal copies are counted, not tracked, so the loan has no copy id.
+            publish_change(ChangeType.CHECK_IN, self, None, copies=self.copies, status=self.status)
         print(f"✅ '{self.title}' has been checked in.")
         return True
 
@@ -537,6 +561,8 @@ class ResearchPaper(Resource):
             # Handle physical copies if any
             if self.copies > 0:
                 self.copies -= 1
+                publish_change(ChangeType.CHECK_OUT, self, None, user_id,
+                               copies=self.copies, status=self.status)
                 print(f"✅ '{self.title}' has been checked out.")
                 return True
             else:
@@ -546,6 +572,7 @@ class ResearchPaper(Resource):
     def check_in(self, copy_id: Optional[str] = None):
         if self.format == 0:
             self.copies += 1
+            publish_change(ChangeType.CHECK_IN, self, None, copies=self.copies, status=self.status)
             print(f"✅ '{self.title}' has been checked in.")
         else:
             print(f"📄 Digital research papers don't need check-in.")
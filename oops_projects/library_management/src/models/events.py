@@ -0,0 +1,59 @@
+import itertools
+import time
+from enum import Enum
+from typing import Any, Callable, Dict, List, NamedTuple, Optional
+
+
+class ChangeType(Enum):
+    CHECK_OUT = 1
+    CHECK_IN = 2
+    UPDATE_DETAILS = 3
+    ARCHIVE = 4
+    ADD_COPY = 5
+    REMOVE_COPY = 6
+    SET_LOCATION = 7
+    UPDATE_CONDITION = 8
+
+
+# One mutation of a resource or one of its copies, with the new field values.
+class ChangeEvent(NamedTuple):
+    sequence: int
+    type: ChangeType
+    resource_id: int
+    copy_id: Optional[str]
+    user_id: Optional[str]
+    changes: Dict[str, Any]
+    timestamp: float
+    resource: Any = None      # the live object, for in-process subscribers only
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'sequence': self.sequence,
+            'type': self.type.name,
+            'resource_id': self.resource_id,
+            'copy_id': self.copy_id,
+            'user_id': self.user_id,
+            'changes': self.changes,
+            'timestamp': self.timestamp
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'ChangeEvent':
+        return cls(data['sequence'], ChangeType[data['type']], data['resource_id'],
+                   data.get('copy_id'), data.get('user_id'), data.get('changes', {}),
+                   data['timestamp'])
+
+
+# Called with every ChangeEvent the models publish, e.g. by a ChangeBus.
+change_listeners: List[Callable[[ChangeEvent], None]] = []
+_sequence = itertools.count(1)
+
+
+def publish_change(change_type: ChangeType, resource: Any, copy_id: Optional[str] = None,
+                   user_id: Optional[str] = None, **changes):
+    if not change_listeners:
+        return
+    event = ChangeEvent(next(_sequence), change_type, resource.id, copy_id, user_id,
+                        changes, time.time(), resource)
+    for listener in change_listeners:
+        listener(event)
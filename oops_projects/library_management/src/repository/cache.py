@@ -0,0 +1,183 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional, Set
+
+from src.models.book import Resource
+from src.repository.storage import CsvStore
+
+
+# A bounded read-through cache of Resource objects over a CsvStore.
+#
+# Segmented LRU: a resource enters "probation" on its first use and moves to
+# "protected" when used again, so a one-off scan of the catalog only churns
+# probation and the hot titles stay. Resources with a copy on loan, or with
+# changes not yet saved (dirty), are never dropped: at eviction they move to
+# a pinned set and rejoin the LRU once returned and saved.
+class ResourceCache:
+    def __init__(self, store: CsvStore, capacity: int = 10_000, protected_share: float = 0.8):
+        self.store = store
+        self.capacity = capacity
+        self.protected_capacity = int(capacity * protected_share)
+        self._probation: "OrderedDict[int, Resource]" = OrderedDict()
+        self._protected: "OrderedDict[int, Resource]" = OrderedDict()
+        self._pinned: Dict[int, Resource] = {}
+        self._dirty: Set[int] = set()
+        self._lock = threading.RLock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.hydrate_seconds = 0.0
+
+    def __len__(self):
+        return len(self._probation) + len(self._protected) + len(self._pinned)
+
+    def __contains__(self, resource_id: int):
+        return resource_id in self._protected or resource_id in self._probation or resource_id in self._pinned
+
+    def get(self, resource_id: int) -> Optional[Resource]:
+        """The live Resource, loaded from the store on a miss"""
+        with self._lock:
+            resource = self._protected.get(resource_id)
+            if resource is not None:
+                self._protected.move_to_end(resource_id)
+                self.hits += 1
+                return resource
+            resource = self._probation.pop(resource_id, None)
+            if resource is not None:
+                self._protect(resource_id, resource)
+                self.hits += 1
+                return resource
+            resource = self._pinned.get(resource_id)
+            if resource is not None:
+                self.hits += 1
+                return resource
+            self.misses += 1
+            start = time.perf_counter()
+            resource = self.store.get(resource_id)
+            self.hydrate_seconds += time.perf_counter() - start
+            if resource is not None:
+                self._probation[resource_id] = resource
+                self._evict()
+            return resource
+
+    def _protect(self, resource_id: int, resource: Resource):
+        self._protected[resource_id] = resource
+        if len(self._protected) > self.protected_capacity:
+            demoted_id, demoted = self._protected.popitem(last=False)
+            self._probation[demoted_id] = demoted
+
+    def _is_pinned(self, resource_id: int, resource: Resource) -> bool:
+        return resource_id in self._dirty or resource.copies < resource.total_copies
+
+    def _evict(self):
+        while len(self._probation) + len(self._protected) > self.capacity:
+            segment = self._probation if self._probation else self._protected
+            resource_id, resource = segment.popitem(last=False)
+            if self._is_pinned(resource_id, resource):
+                self._pinned[resource_id] = resource
+            else:
+                self.evictions += 1
+
+    def _release(self):
+        # Pinned resources that are back on the shelf and saved rejoin probation.
+        for resource_id, resource in list(self._pinned.items()):
+            if not self._is_pinned(resource_id, resource):
+                del self._pinned[resource_id]
+                self._probation[resource_id] = resource
+        self._evict()
+
+    # Write-back
+    def mark_dirty(self, resource_id: int):
+        with self._lock:
+            if resource_id in self:
+                self._dirty.add(resource_id)
+
+    def on_changes(self, events: List):
+        """ChangeBus subscriber: every changed resource needs saving"""
+        with self._lock:
+            for event in events:
+                if event.resource_id in self:
+                    self._dirty.add(event.resource_id)
+
+    def flush(self) -> int:
+        """Save dirty resources to the store and unpin what can go"""
+        with self._lock:
+            dirty = [(resource_id, self._lookup(resource_id)) for resource_id in self._dirty]
+            for _, resource in dirty:
+                self.store.save(resource)
+            self._dirty.clear()
+            self._release()
+            return len(dirty)
+
+    def _lookup(self, resource_id: int) -> Resource:
+        return (self._protected.get(resource_id) or self._probation.get(resource_id)
+                or self._pinned[resource_id])
+
+    def stats(self) -> Dict[str, float]:
+        lookups = self.hits + self.misses
+        return {"size": len(self), "pinned": len(self._pinned), "dirty": len(self._dirty),
+                "hits": self.hits, "misses": self.misses, "evictions": self.evictions,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "hydrate_us": self.hydrate_seconds / self.misses * 1e6 if self.misses else 0.0}
+
+
+def benchmark(rows: int = 1_000_000, capacity: int = 20_000, lookups: int = 500_000) -> Dict[str, float]:
+    """Skewed lookups over a catalog 50x larger than the cache"""
+    import contextlib
+    import os
+    import random
+    import resource as rusage
+    import tempfile
+
+    from src.repository.storage import write_synthetic_resources
+
+    rng = random.Random(9)
+    with tempfile.TemporaryDirectory() as directory, \
+            open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        resources_path = os.path.join(directory, "resources.csv")
+        copies_path = os.path.join(directory, "copies.csv")
+        write_synthetic_resources(resources_path, rows)
+        with open(copies_path, "w") as file:
+            file.write("copy_id,resource_id,barcode,condition,location,status,purchase_date,"
+                       "notes,checkout_count,last_checkout\n")
+        before = rusage.getrusage(rusage.RUSAGE_SELF).ru_maxrss
+        start = time.perf_counter()
+        store = CsvStore(resources_path, copies_path)
+        index_seconds = time.perf_counter() - start
+        cache = ResourceCache(store, capacity)
+
+        # A popular head, a long tail, and a one-off scan in the middle.
+        probes = [1 + int(rows * rng.random() ** 4) for _ in range(lookups)]
+        probes[lookups // 2:lookups // 2] = range(rows // 2, rows // 2 + capacity * 2)
+        on_loan = [cache.get(resource_id) for resource_id in range(1, 101)]
+        for resource in on_loan:
+            if resource.format == 0:
+                resource.check_out("bench_user")
+                cache.mark_dirty(resource.id)
+        start = time.perf_counter()
+        for resource_id in probes:
+            cache.get(resource_id)
+        mixed_us = (time.perf_counter() - start) / len(probes) * 1e6
+        assert all(resource.id in cache for resource in on_loan)
+
+        hot = list(cache._protected)[-1000:]
+        start = time.perf_counter()
+        for _ in range(100):
+            for resource_id in hot:
+                cache.get(resource_id)
+        hot_ns = (time.perf_counter() - start) / (100 * len(hot)) * 1e9
+        peak_mb = (rusage.getrusage(rusage.RUSAGE_SELF).ru_maxrss - before) / 1024
+        store.close()
+    return dict(cache.stats(), rows=rows, capacity=capacity, index_seconds=index_seconds,
+                mixed_us=mixed_us, hot_ns=hot_ns, peak_mb=peak_mb)
+
+
+if __name__ == "__main__":
+    result = benchmark()
+    print(f"{result['rows']:,} rows indexed in {result['index_seconds']:.1f} s; "
+          f"cache of {result['capacity']:,} holds {result['size']:,} ({result['pinned']} pinned)")
+    print(f"Hit rate {result['hit_rate']:.1%} | {result['evictions']:,} evictions | "
+          f"miss hydrates in {result['hydrate_us']:.0f} µs")
+    print(f"Mixed lookups: {result['mixed_us']:.2f} µs | hot hits: {result['hot_ns']:.0f} ns | "
+          f"peak RSS +{result['peak_mb']:,.0f} MB")
@@ -0,0 +1,229 @@
+import mmap
+import os
+import tempfile
+import time
+from typing import Any, Dict, List, Optional
+
+from src.core.columnar import ColumnarCatalog
+from src.models.book import Resource
+
+
+def snapshot_dir() -> str:
+    """RAM-backed /dev/shm where there is one, so snapshots never touch disk"""
+    return "/dev/shm" if os.path.isdir("/dev/shm") else tempfile.gettempdir()
+
+
+# Writes immutable catalog snapshots for SnapshotReader processes to map.
+#
+# Each publish writes a new file and renames it over "<name>.snap", so a
+# reader sees either the old or the new version, never a mix. Readers that
+# still map the old file keep it alive until they refresh.
+class SnapshotPublisher:
+    def __init__(self, name: str = "catalog", directory: Optional[str] = None):
+        self.path = os.path.join(directory or snapshot_dir(), f"{name}.snap")
+        self.version = 0
+        if os.path.exists(self.path):
+            with open(self.path, "rb") as file:
+                self.version = ColumnarCatalog.from_snapshot(file.read()).meta.get("version", 0)
+
+    def publish(self, catalog: ColumnarCatalog) -> int:
+        """Write the next version and make it current"""
+        self.version += 1
+        data = catalog.snapshot(meta={"version": self.version, "published": time.time()})
+        temp_path = f"{self.path}.{os.getpid()}.tmp"
+        with open(temp_path, "wb") as file:
+            file.write(data)
+        os.replace(temp_path, self.path)
+        return self.version
+
+    def publish_resources(self, resources: Dict[int, Resource]) -> int:
+        return self.publish(ColumnarCatalog.from_resources(resources))
+
+    def unlink(self):
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+
+# A read-only catalog mapped from the current snapshot. The pages are the
+# OS page cache shared by every reader, so a worker adds only its own small
+# bookkeeping, and attaching costs a map and a header parse.
+class SnapshotReader:
+    def __init__(self, name: str = "catalog", directory: Optional[str] = None):
+        self.path = os.path.join(directory or snapshot_dir(), f"{name}.snap")
+        self.catalog: Optional[ColumnarCatalog] = None
+        self._map: Optional[mmap.mmap] = None
+        self._inode = None
+        self._version = 0
+        self._retired: List[tuple] = []
+        self.attach()
+
+    @property
+    def version(self) -> int:
+        """The last version attached, still known after close()"""
+        return self._version
+
+    def attach(self):
+        with open(self.path, "rb") as file:
+            inode = os.fstat(file.fileno()).st_ino
+            snapshot_map = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        old = (self.catalog, self._map)
+        self.catalog = ColumnarCatalog.from_snapshot(snapshot_map)
+        self._map, self._inode = snapshot_map, inode
+        self._version = self.catalog.meta.get("version", 0)
+        if old[0] is not None:
+            self._retired.append(old)
+        self._close_retired()
+
+    def refresh(self) -> bool:
+        """Switch to a newer snapshot if one was published"""
+        try:
+            inode = os.stat(self.path).st_ino
+        except FileNotFoundError:
+            return False
+        if inode == self._inode:
+            return False
+        self.attach()
+        return True
+
+    def _close_retired(self):
+        # An old map can only close once nothing still views its columns.
+        still_open = []
+        for catalog, snapshot_map in self._retired:
+            catalog.release()
+            try:
+                snapshot_map.close()
+            except BufferError:
+                still_open.append((catalog, snapshot_map))
+        self._retired = still_open
+
+    def lookup(self, resource_id: int) -> Optional[Dict[str, Any]]:
+        row = self.catalog.row_for(resource_id)
+        return None if row is None else self.catalog.record(row)
+
+    def close(self):
+        if self.catalog is not None:
+            self._retired.append((self.catalog, self._map))
+            self.catalog = self._map = None
+        self._close_retired()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def _memory_kb() -> Dict[str, int]:
+    # Resident memory, and the part of it that is this process's own heap;
+    # the rest is the mapped snapshot, which lives once in the page cache.
+    totals = {"Rss": 0, "Anonymous": 0}
+    try:
+        with open("/proc/self/smaps_rollup") as file:
+            for line in file:
+                key, _, value = line.partition(":")
+                if key in totals:
+                    totals[key] = int(value.split()[0])
+    except OSError:
+        pass
+    return totals
+
+
+def _shmem_mb() -> float:
+    # Memory-backed files system-wide: each snapshot version counts once.
+    try:
+        with open("/proc/meminfo") as file:
+            for line in file:
+                if line.startswith("Shmem:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return 0.0
+
+
+def _reader(name: str, directory: str, probes: List[int], connection):
+    before = _memory_kb()
+    start = time.perf_counter()
+    reader = SnapshotReader(name, directory)
+    attach_ms = (time.perf_counter() - start) * 1000
+    lookup_us = []
+    for _ in range(2):  # the first pass faults the pages into this process
+        start = time.perf_counter()
+        for resource_id in probes:
+            reader.lookup(resource_id)
+        lookup_us.append((time.perf_counter() - start) / len(probes) * 1e6)
+    after = _memory_kb()
+    connection.send({"attach_ms": attach_ms, "cold_us": lookup_us[0], "warm_us": lookup_us[1],
+                     "version": reader.version,
+                     "private_mb": (after["Anonymous"] - before["Anonymous"]) / 1024,
+                     "mapped_mb": (after["Rss"] - before["Rss"] - after["Anonymous"] + before["Anonymous"]) / 1024})
+    connection.recv()  # wait for the new version
+    start = time.perf_counter()
+    swapped = reader.refresh()
+    connection.send({"swapped": swapped, "refresh_ms": (time.perf_counter() - start) * 1000,
+                     "version": reader.version})
+    reader.close()
+    connection.close()
+
+
+def benchmark(rows: int = 1_000_000, readers: int = 4) -> Dict[str, Any]:
+    """Several processes attaching to one snapshot, then a version swap"""
+    import multiprocessing
+    import random
+
+    from src.core.columnar import TextColumn, synthetic
+    from src.repository.storage import data_path, read_rows
+
+    # A realistic snapshot: synthetic columns plus titles and authors.
+    catalog = synthetic(rows)
+    templates = [row for row in read_rows(data_path("resources.csv")) if None not in row]
+    titles = [row["title"] for row in templates]
+    authors = [row["author"] for row in templates]
+    catalog.text = {
+        "title": TextColumn([f"{titles[row % len(titles)]} ({row})" for row in range(rows)]),
+        "author": TextColumn([authors[row % len(authors)] for row in range(rows)]),
+    }
+
+    directory = snapshot_dir()
+    name = f"catalog-bench-{os.getpid()}"
+    publisher = SnapshotPublisher(name, directory)
+    start = time.perf_counter()
+    publisher.publish(catalog)
+    publish_seconds = time.perf_counter() - start
+    size_mb = os.path.getsize(publisher.path) / 2 ** 20
+
+    shmem_before = _shmem_mb()
+    rng = random.Random(3)
+    probes = [1 + rng.randrange(rows) for _ in range(20_000)]
+    context = multiprocessing.get_context("spawn")
+    pipes, processes = [], []
+    for _ in range(readers):
+        parent, child = context.Pipe()
+        process = context.Process(target=_reader, args=(name, directory, probes, child))
+        process.start()
+        child.close()
+        pipes.append(parent)
+        processes.append(process)
+    attached = [pipe.recv() for pipe in pipes]
+    shmem_mb = _shmem_mb() - shmem_before
+    catalog.numeric["copies"][0] += 1
+    publisher.publish(catalog)
+    for pipe in pipes:
+        pipe.send("refresh")
+    swaps = [pipe.recv() for pipe in pipes]
+    for process in processes:
+        process.join()
+    publisher.unlink()
+    return {"rows": rows, "readers": readers, "snapshot_mb": size_mb, "publish_seconds": publish_seconds,
+            "shmem_mb": shmem_mb, "attached": attached, "swaps": swaps}
+
+
+if __name__ == "__main__":
+    result = benchmark()
+    print(f"{result['rows']:,} rows: {result['snapshot_mb']:.0f} MB snapshot published in "
+          f"{result['publish_seconds']:.2f} s to {snapshot_dir()}")
+    for number, (attached, swap) in enumerate(zip(result["attached"], result["swaps"]), start=1):
+        print(f"reader {number}: attach {attached['attach_ms']:.2f} ms | lookup {attached['cold_us']:.1f} µs cold, "
+              f"{attached['warm_us']:.1f} µs warm | "
+              f"heap +{attached['private_mb']:.1f} MB, mapped {attached['mapped_mb']:.0f} MB | "
+              f"v{attached['version']} -> v{swap['version']} in {swap['refresh_ms']:.2f} ms")
+    print(f"System shared memory grew {result['shmem_mb']:.0f} MB with {result['readers']} readers attached")
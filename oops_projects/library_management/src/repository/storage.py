@@ -0,0 +1,255 @@
+import csv
+import os
+import random
+import threading
+from array import array
+from bisect import bisect_left
+from typing import Dict, Iterator, List, Optional
+
+from src.models.book import ConditionType, PhysicalCopy, Resource, ResourceFactory
+
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(
+    os.path.abspath(__file__)))), "DATA")
+
+
+def data_path(name: str) -> str:
+    """Path of a CSV file in the DATA directory"""
+    return os.path.join(DATA_DIR, name)
+
+
+def read_rows(path: str) -> Iterator[Dict[str, str]]:
+    """Stream the rows of a CSV file as dicts"""
+    with open(path, newline="", encoding="utf-8") as file:
+        yield from csv.DictReader(file)
+
+
+def load_resources(path: Optional[str] = None) -> Dict[int, Resource]:
+    """Load resources.csv into {id: Resource}, skipping malformed rows"""
+    resources = {}
+    for line, row in enumerate(read_rows(path or data_path("resources.csv")), start=2):
+        try:
+            resource = ResourceFactory.create_from_csv_row(row)
+        except (KeyError, ValueError) as e:
+            print(f"⚠️ Skipping line {line} of resources.csv: {e}")
+            continue
+        resources[resource.id] = resource
+    return resources
+
+
+def copy_from_row(row: Dict[str, str]) -> PhysicalCopy:
+    """Build a PhysicalCopy from a copies.csv row"""
+    copy = PhysicalCopy(
+        copy_id=row["copy_id"],
+        resource_id=int(row["resource_id"]),
+        barcode=row["barcode"],
+        condition=ConditionType(int(row["condition"] or 1)),
+        location=row["location"],
+        status=int(row["status"] or 0),
+        purchase_date=row["purchase_date"] or None,
+        notes=row.get("notes", "")
+    )
+    copy.checkout_count = int(row.get("checkout_count") or 0)
+    copy.last_checkout = row.get("last_checkout") or None
+    return copy
+
+
+def load_copies(resources: Dict[int, Resource], path: Optional[str] = None) -> int:
+    """Replace the generated copies with those recorded in copies.csv"""
+    loaded = {}
+    for row in read_rows(path or data_path("copies.csv")):
+        resource_id = int(row["resource_id"])
+        if resource_id not in resources:
+            continue
+        loaded.setdefault(resource_id, []).append(copy_from_row(row))
+    for resource_id, copies in loaded.items():
+        resources[resource_id].physical_copies = copies
+    return sum(len(copies) for copies in loaded.values())
+
+
+def write_synthetic_resources(path: str, rows: int, seed: int = 5):
+    """A large resources.csv: the sample catalog repeated, with shelves and
+    dates spread like a large library's"""
+    rng = random.Random(seed)
+    templates = [row for row in read_rows(data_path("resources.csv"))
+                 if None not in row and row.get("last_updated")]
+    shelves = [f"{aisle}{bay}-{shelf}-{slot}" for aisle in "ABCDEFGHIJKLMNOPQRSTUVWXYZ"
+               for bay in range(1, 11) for shelf in range(1, 9) for slot in range(1, 9)]
+    dates = [f"20{year:02d}-{month:02d}-{day:02d}" for year in range(15, 25)
+             for month in range(1, 13) for day in range(1, 29)]
+    with open(path, "w", newline="", encoding="utf-8") as file:
+        writer = csv.DictWriter(file, fieldnames=list(templates[0]))
+        writer.writeheader()
+        for number in range(rows):
+            row = dict(templates[number % len(templates)])
+            row["id"] = number + 1
+            row["location"] = rng.choice(shelves)
+            row["date_added"] = row["last_updated"] = rng.choice(dates)
+            writer.writerow(row)
+
+
+def _read_record(file, offset: int) -> bytes:
+    # One CSV record, which may span lines inside a quoted field.
+    file.seek(offset)
+    record = file.readline()
+    while record.count(b'"') % 2:
+        line = file.readline()
+        if not line:
+            break
+        record += line
+    return record
+
+
+def _scan_records(file) -> Iterator[tuple]:
+    # (offset, record) for every record after the header.
+    offset = len(file.readline())
+    record = b""
+    for line in file:
+        record += line
+        if record.count(b'"') % 2:
+            continue
+        yield offset, record
+        offset += len(record)
+        record = b""
+
+
+# Random access to resources.csv and copies.csv: only the byte offset of each
+# record is kept in memory, and a resource is parsed when it is asked for.
+# save() appends the new version of a resource to overlay files next to the
+# originals, which are never rewritten.
+class CsvStore:
+    def __init__(self, resources_path: Optional[str] = None, copies_path: Optional[str] = None):
+        self.resources_path = resources_path or data_path("resources.csv")
+        self.copies_path = copies_path or data_path("copies.csv")
+        self._lock = threading.Lock()
+        self._ids, self._offsets, self._header = self._index(self.resources_path, 0)
+        self._copy_ids, self._copy_offsets, self._copy_header = self._index(self.copies_path, 1)
+        self._overlay: Dict[int, int] = {}            # id -> offset in the resource overlay
+        self._copy_overlay: Dict[int, List[int]] = {}
+        self._files = {}
+        self._load_overlays()
+
+    def _load_overlays(self):
+        # Saves from earlier runs; the last version of a resource wins.
+        path = self.resources_path + ".overlay"
+        if os.path.exists(path):
+            with open(path, "rb") as file:
+                for offset, record in _scan_records(file):
+                    self._overlay[int(record[:record.find(b",")])] = offset
+        path = self.copies_path + ".overlay"
+        if os.path.exists(path):
+            # Each save writes a resource's copies, then a row with no copy id
+            # that closes it; copies without that row are from a torn save.
+            pending: Dict[int, List[int]] = {}
+            with open(path, "rb") as file:
+                for offset, record in _scan_records(file):
+                    row = dict(zip(self._copy_header, next(csv.reader([record.decode("utf-8")]))))
+                    resource_id = int(row["resource_id"])
+                    if row["copy_id"]:
+                        pending.setdefault(resource_id, []).append(offset)
+                    else:
+                        self._copy_overlay[resource_id] = pending.pop(resource_id, [])
+
+    @staticmethod
+    def _index(path: str, key_column: int):
+        # Sorted (key, offset) pairs as two arrays; a key may repeat (copies).
+        pairs = []
+        with open(path, "rb") as file:
+            header = next(csv.reader([file.readline().decode("utf-8")]))
+            file.seek(0)
+            for offset, record in _scan_records(file):
+                if key_column == 0:
+                    key = record[:record.find(b",")]
+                else:
+                    key = next(csv.reader([record.decode("utf-8")]))[key_column]
+                try:
+                    pairs.append((int(key), offset))
+                except ValueError:
+                    continue
+        pairs.sort()
+        return array("q", [key for key, _ in pairs]), array("q", [offset for _, offset in pairs]), header
+
+    def __len__(self):
+        return len(self._ids) + sum(1 for resource_id in self._overlay if not self._in_base(resource_id))
+
+    def _in_base(self, resource_id: int) -> bool:
+        position = bisect_left(self._ids, resource_id)
+        return position < len(self._ids) and self._ids[position] == resource_id
+
+    def ids(self) -> List[int]:
+        return sorted(set(self._ids) | set(self._overlay))
+
+    def _file(self, path: str):
+        if path not in self._files:
+            self._files[path] = open(path, "rb")
+        return self._files[path]
+
+    def _row(self, path: str, header: List[str], offset: int) -> Dict[str, str]:
+        record = _read_record(self._file(path), offset).decode("utf-8")
+        return dict(zip(header, next(csv.reader([record]))))
+
+    def _copy_rows(self, resource_id: int) -> Optional[List[Dict[str, str]]]:
+        if resource_id in self._copy_overlay:
+            return [self._row(self.copies_path + ".overlay", self._copy_header, offset)
+                    for offset in self._copy_overlay[resource_id]]
+        position = bisect_left(self._copy_ids, resource_id)
+        rows = []
+        while position < len(self._copy_ids) and self._copy_ids[position] == resource_id:
+            rows.append(self._row(self.copies_path, self._copy_header, self._copy_offsets[position]))
+            position += 1
+        return rows or None
+
+    def get(self, resource_id: int) -> Optional[Resource]:
+        """Parse one resource and its copies, None if it is not stored"""
+        with self._lock:
+            if resource_id in self._overlay:
+                row = self._row(self.resources_path + ".overlay", self._header, self._overlay[resource_id])
+            elif self._in_base(resource_id):
+                offset = self._offsets[bisect_left(self._ids, resource_id)]
+                row = self._row(self.resources_path, self._header, offset)
+            else:
+                return None
+            try:
+                resource = ResourceFactory.create_from_csv_row(row)
+                copy_rows = self._copy_rows(resource_id)
+            except (KeyError, ValueError) as e:
+                print(f"⚠️ Skipping resource {resource_id}: {e}")
+                return None
+        if copy_rows is not None:
+            resource.physical_copies = [copy_from_row(row) for row in copy_rows]
+        return resource
+
+    def _append(self, path: str, header: List[str], rows: List[Dict]) -> List[int]:
+        new = not os.path.exists(path)
+        with open(path, "a", newline="", encoding="utf-8") as file:
+            writer = csv.DictWriter(file, fieldnames=header, extrasaction="ignore")
+            if new:
+                writer.writeheader()
+            offsets = []
+            for row in rows:
+                file.flush()
+                offsets.append(file.buffer.tell())
+                writer.writerow(row)
+        return offsets
+
+    def save(self, resource: Resource):
+        """Persist the current state of a resource and its copies"""
+        with self._lock:
+            reader = self._files.pop(self.resources_path + ".overlay", None)
+            if reader is not None:
+                reader.close()
+            self._overlay[resource.id] = self._append(self.resources_path + ".overlay", self._header,
+                                                      [resource.to_dict()])[0]
+            # Written even with no copies left, so removed copies stay removed.
+            reader = self._files.pop(self.copies_path + ".overlay", None)
+            if reader is not None:
+                reader.close()
+            rows = [copy.to_dict() for copy in resource.physical_copies]
+            self._copy_overlay[resource.id] = self._append(
+                self.copies_path + ".overlay", self._copy_header,
+                rows + [{"resource_id": resource.id, "copy_id": ""}])[:-1]
+
+    def close(self):
+        for file in self._files.values():
+            file.close()
+        self._files.clear()
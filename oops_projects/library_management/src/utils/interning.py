@@ -0,0 +1,124 @@
+import os
+import sys
+import time
+from typing import Any, Dict, Tuple
+
+
+# Fields whose values repeat across most rows of a catalog.
+RESOURCE_FIELDS = ("genre", "category", "publisher", "language", "edition", "location")
+COPY_FIELDS = ("location", "purchase_date")
+
+
+# One shared object per distinct string.
+class StringPool:
+    def __init__(self):
+        self._values: Dict[str, str] = {}
+
+    def intern(self, value: Any) -> Any:
+        """The pooled copy of value; anything but a str is returned as is"""
+        if type(value) is not str:
+            return value
+        return self._values.setdefault(value, value)
+
+    def __len__(self):
+        return len(self._values)
+
+
+# A pool per field, so each field's distinct values can be counted.
+class Interner:
+    def __init__(self):
+        self.pools: Dict[str, StringPool] = {}
+        self.enabled = True
+
+    def pool(self, field: str) -> StringPool:
+        pool = self.pools.get(field)
+        if pool is None:
+            pool = self.pools.setdefault(field, StringPool())
+        return pool
+
+    def intern(self, field: str, value: Any) -> Any:
+        if not self.enabled:
+            return value
+        return self.pool(field).intern(value)
+
+    def stats(self) -> Dict[str, int]:
+        """Distinct values held per field"""
+        return {field: len(pool) for field, pool in self.pools.items()}
+
+    def clear(self):
+        self.pools.clear()
+
+
+interner = Interner()
+
+
+def intern_value(field: str, value: Any) -> Any:
+    return interner.intern(field, value)
+
+
+def _pooled_bytes(resources) -> Tuple[int, int]:
+    # Bytes held by the pooled fields' strings: (counting every reference, distinct objects).
+    seen = set()
+    total = distinct = 0
+    for resource in resources.values():
+        values = [getattr(resource, field) for field in RESOURCE_FIELDS]
+        for copy in resource.physical_copies:
+            values.extend(getattr(copy, field) for field in COPY_FIELDS)
+        for value in values:
+            size = sys.getsizeof(value)
+            total += size
+            if id(value) not in seen:
+                seen.add(id(value))
+                distinct += size
+    return total, distinct
+
+
+def _measure_load(path: str, pooled: bool, connection):
+    # Runs in a fresh process, so the peak RSS belongs to this load alone.
+    import resource as rusage
+    from src.repository.storage import load_resources
+    from src.utils import interning  # the models' copy, not this module run as __main__
+
+    interning.interner.enabled = pooled
+    before = rusage.getrusage(rusage.RUSAGE_SELF).ru_maxrss
+    start = time.perf_counter()
+    resources = load_resources(path)
+    seconds = time.perf_counter() - start
+    peak = rusage.getrusage(rusage.RUSAGE_SELF).ru_maxrss - before
+    total, distinct = _pooled_bytes(resources)
+    connection.send({"rows": len(resources), "seconds": seconds, "peak_mb": peak / 1024,
+                     "string_mb": total / 2 ** 20, "distinct_string_mb": distinct / 2 ** 20,
+                     "distinct_values": interning.interner.stats()})
+    connection.close()
+
+
+def benchmark(rows: int = 2_000_000) -> Dict[str, Dict[str, Any]]:
+    """Load the same synthetic catalog with and without pooling, each in its own process"""
+    import multiprocessing
+    import tempfile
+    from src.repository.storage import write_synthetic_resources
+
+    context = multiprocessing.get_context("spawn")
+    results = {}
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "resources.csv")
+        write_synthetic_resources(path, rows)
+        for label, pooled in (("plain", False), ("interned", True)):
+            receiver, sender = context.Pipe(duplex=False)
+            process = context.Process(target=_measure_load, args=(path, pooled, sender))
+            process.start()
+            sender.close()
+            results[label] = receiver.recv()
+            process.join()
+    return results
+
+
+if __name__ == "__main__":
+    result = benchmark(int(sys.argv[1]) if len(sys.argv) > 1 else 2_000_000)
+    for label, stats in result.items():
+        print(f"{label:>9}: {stats['rows']:,} rows in {stats['seconds']:.1f} s | "
+              f"peak RSS +{stats['peak_mb']:,.0f} MB | pooled-field strings "
+              f"{stats['distinct_string_mb']:,.1f} MB of {stats['string_mb']:,.1f} MB referenced")
+    saved = result["plain"]["peak_mb"] - result["interned"]["peak_mb"]
+    print(f"Saved {saved:,.0f} MB ({saved / result['plain']['peak_mb']:.0%} of the load)")
+    print(f"Distinct values: {result['interned']['distinct_values']}")
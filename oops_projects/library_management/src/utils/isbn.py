@@ -0,0 +1,31 @@
+import re
+from typing import Optional
+
+
+_NOT_ISBN = re.compile(r"[^0-9Xx]")
+
+
+def clean_isbn(value: Optional[str]) -> str:
+    """Digits (and a check 'X') of an ISBN as written"""
+    return _NOT_ISBN.sub("", value or "").upper()
+
+
+def normalize_isbn(value: Optional[str]) -> Optional[str]:
+    """ISBN-13 digits for any ISBN-10 or ISBN-13 spelling, None if neither.
+    The check digit is recomputed, so a mistyped one still finds the edition"""
+    digits = clean_isbn(value)
+    if len(digits) == 10 and digits[:9].isdigit():
+        digits = "978" + digits[:9]
+    elif len(digits) == 13 and digits.isdigit():
+        digits = digits[:12]
+    else:
+        return None
+    check = -sum(int(char) * (3 if position % 2 else 1)
+                 for position, char in enumerate(digits)) % 10
+    return digits + str(check)
+
+
+def isbn_key(value: Optional[str]) -> str:
+    """Lookup key for an ISBN field: its ISBN-13 form, or its bare digits
+    when it is not shaped like an ISBN"""
+    return normalize_isbn(value) or clean_isbn(value)
@@ -0,0 +1,9 @@
+import os
+import sys
+
+PROJECT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# The package imports itself as `src.*`, as it does when run with
+# `python -m src.X` from the project directory.
+if PROJECT not in sys.path:
+    sys.path.insert(0, PROJECT)
@@ -0,0 +1,37 @@
+from src.core.analytics import CirculationStats
+from src.core.change_bus import AnalyticsSubscriber, ChangeBus
+from src.models.book import Journal, ResearchPaper
+
+
+def _resource(cls, id, **fields):
+    return cls(id=id, title=f"Title {id}", author="Author", genre="Science", pages=10,
+               publisher="Press", type=2, format=0, status=0, copies=2, **fields)
+
+
+def _circulate(resource, stats):
+    bus = ChangeBus()
+    bus.subscribe(AnalyticsSubscriber(stats), AnalyticsSubscriber.types)
+    bus.attach()
+    try:
+        resource.check_out("u1")
+        resource.check_in("C-1")
+        bus.flush()
+    finally:
+        bus.detach()
+
+
+def test_journal_checkin_closes_its_loan():
+    journal = _resource(Journal, 1)
+    stats = CirculationStats({1: journal})
+    _circulate(journal, stats)
+    assert stats.checkouts[1] == 1
+    assert stats._open == {}
+    assert stats._open_by_day == {}
+
+
+def test_paper_checkin_closes_its_loan():
+    paper = _resource(ResearchPaper, 2)
+    stats = CirculationStats({2: paper})
+    _circulate(paper, stats)
+    assert stats.checkouts[2] == 1
+    assert stats._open == {}
@@ -0,0 +1,97 @@
+import pytest
+
+from src.repository.cache import ResourceCache
+from src.repository.storage import CsvStore, data_path, write_synthetic_resources
+
+
+@pytest.fixture
+def paths(tmp_path):
+    resources, copies = str(tmp_path / "resources.csv"), str(tmp_path / "copies.csv")
+    write_synthetic_resources(resources, 20)
+    with open(data_path("copies.csv")) as source, open(copies, "w") as file:
+        file.write(source.readline())
+        file.write("1-001,1,BAR-1-001,1,A1,0,2024-01-15,,0,\n"
+                   "1-002,1,BAR-1-002,1,A1,0,2024-01-15,,0,\n")
+    return resources, copies
+
+
+def _copy_ids(store, resource_id):
+    return [copy.copy_id for copy in store.get(resource_id).physical_copies]
+
+
+def test_removed_copies_stay_removed_after_reload(paths):
+    store = CsvStore(*paths)
+    resource = store.get(1)
+    assert _copy_ids(store, 1) == ["1-001", "1-002"]
+    resource.physical_copies = []
+    store.save(resource)
+    assert _copy_ids(store, 1) == []
+    store.close()
+    assert _copy_ids(CsvStore(*paths), 1) == []
+
+
+def test_each_save_replaces_the_copies_of_the_one_before(paths):
+    store = CsvStore(*paths)
+    resource = store.get(1)
+    first, second = resource.physical_copies
+    resource.physical_copies = [first]
+    store.save(resource)
+    resource.physical_copies = [second]
+    store.save(resource)
+    store.close()
+    reloaded = CsvStore(*paths)
+    assert _copy_ids(reloaded, 1) == ["1-002"]
+    # Other resources keep the copies generated from their counts.
+    assert _copy_ids(reloaded, 2) == ["2-001"]
+
+
+def test_torn_save_is_ignored_on_reload(paths):
+    store = CsvStore(*paths)
+    resource = store.get(1)
+    store.save(resource)
+    store.close()
+    with open(paths[1] + ".overlay", "a") as file:
+        file.write("1-009,1,BAR-1-009,1,A1,0,2024-01-15,,0,\n")
+    assert _copy_ids(CsvStore(*paths), 1) == ["1-001", "1-002"]
+
+
+def test_resources_on_loan_are_pinned_until_returned_and_flushed(paths):
+    store = CsvStore(*paths)
+    cache = ResourceCache(store, capacity=2)
+    loaned = cache.get(3)
+    copy_id = loaned.check_out("u1")
+    cache.mark_dirty(3)
+    for resource_id in range(4, 10):
+        cache.get(resource_id)
+    assert 3 in cache and cache.stats()["pinned"] == 1
+    assert cache.get(3) is loaned
+
+    # Saved, but still on loan: stays pinned.
+    assert cache.flush() == 1
+    assert cache.stats()["pinned"] == 1
+    assert CsvStore(*paths).get(3).copies == 0
+
+    loaned.check_in(copy_id)
+    cache.mark_dirty(3)
+    assert cache.flush() == 1
+    assert cache.stats()["pinned"] == 0 and cache.stats()["dirty"] == 0
+    for resource_id in range(10, 14):
+        cache.get(resource_id)
+    assert 3 not in cache
+    reloaded = cache.get(3)
+    assert reloaded is not loaned
+    assert reloaded.copies == reloaded.total_copies == 1
+
+
+def test_unsaved_changes_are_pinned_until_flushed(paths):
+    store = CsvStore(*paths)
+    cache = ResourceCache(store, capacity=1)
+    resource = cache.get(5)
+    resource.location = "Z9"
+    cache.mark_dirty(5)
+    cache.get(6)
+    assert 5 in cache
+    cache.flush()
+    cache.get(7)
+    assert 5 not in cache
+    assert cache.get(5).location == "Z9"
@@ -0,0 +1,47 @@
+from src.core.change_bus import ChangeBus, CoBorrowSubscriber, IndexSubscriber
+from src.core.columnar import ColumnarCatalog
+from src.core.engine import Catalog
+from src.core.recommendations import CoBorrowModel
+from src.models.book import Journal
+
+
+def _journals(count):
+    return {id: Journal(id=id, title=f"Journal {id}", author="Author", genre="Science", pages=10,
+                        publisher="Press", type=2, format=0, status=0, copies=1, location="A1")
+            for id in range(1, count + 1)}
+
+
+def test_indexes_change_only_when_applied():
+    resources = _journals(3)
+    catalog, columnar = Catalog(resources.values()), ColumnarCatalog.from_resources(resources)
+    indexer = IndexSubscriber(catalog, columnar)
+    bus = ChangeBus()
+    bus.subscribe(indexer)
+    with bus:
+        resources[1].set_location("B2")
+        resources[2].set_location("B2")
+        resources[2].check_out("u1")
+        bus.flush()
+        # Delivered on the bus thread, but not yet visible to queries.
+        assert catalog.count("location = 'B2'") == 0
+        assert indexer.apply() == 2
+    assert catalog.count("location = 'B2'") == 2
+    assert catalog.count("location = 'A1'") == 1
+    assert columnar.group_by("location", {"copies": "sum"}) == {"A1": {"copies": 1},
+                                                                "B2": {"copies": 1}}
+    assert indexer.apply() == 0
+
+
+def test_co_borrows_follow_the_bus():
+    resources = _journals(2)
+    model = CoBorrowModel()
+    bus = ChangeBus()
+    bus.subscribe(CoBorrowSubscriber(model), CoBorrowSubscriber.types)
+    bus.attach()
+    try:
+        resources[1].check_out("u1")
+        resources[2].check_out("u1")
+        bus.flush()
+    finally:
+        bus.detach()
+    assert model.recommend(1) == [(2, 1)]
@@ -0,0 +1,26 @@
+import pytest
+
+from src.core import columnar
+from src.core.columnar import REPORTS, synthetic
+
+
+@pytest.mark.parametrize("key, measures", list(REPORTS.values()) + [("id", {"pages": "max"})])
+def test_numpy_and_python_aggregates_agree(monkeypatch, key, measures):
+    pytest.importorskip("numpy")
+    catalog = synthetic(5_000)
+    catalog.live[7] = 0
+    catalog.dead = 1
+    expected = catalog.group_by(key, measures)
+    monkeypatch.setattr(columnar, "np", None)
+    result = catalog.group_by(key, measures)
+    assert result.keys() == expected.keys()
+    for group, values in expected.items():
+        assert result[group] == pytest.approx(values)
+
+
+def test_sparse_numeric_keys_group_exactly(monkeypatch):
+    pytest.importorskip("numpy")
+    catalog = synthetic(4)
+    catalog.numeric["pages"][:] = columnar.array("q", [-5, 10 ** 9, -5, 3])
+    assert catalog.group_by("pages", {"id": "count"}) == {-5: {"id": 2}, 3: {"id": 1},
+                                                          10 ** 9: {"id": 1}}
@@ -0,0 +1,30 @@
+import pytest
+
+from src.core import dedup
+from src.core.dedup import Deduplicator, dedup_rows
+
+
+def _rows(count):
+    return [{"title": f"Signals and systems {number}", "author": "Oppenheim, Alan",
+             "description": "An introduction to continuous and discrete signals",
+             "edition": "1st", "isbn": ""} for number in range(count)]
+
+
+def test_numpy_and_python_signatures_agree():
+    pytest.importorskip("numpy")
+    deduplicator = Deduplicator()
+    pending = [(0, dedup.shingles("Signals and systems", "discrete time")), (1, []),
+               (2, dedup.shingles("Linear algebra", "matrices and vectors"))]
+    expected = [deduplicator._signature(hashes) for _, hashes in pending]
+    assert deduplicator._signatures_numpy(pending) == expected
+
+
+def test_oversized_buckets_are_counted():
+    capped = dedup_rows(_rows(6), max_bucket=3)
+    capped_pairs = capped.near_duplicates()
+    assert capped.skipped_buckets > 0
+    assert capped.skipped_rows > 3 * capped.skipped_buckets
+
+    full = dedup_rows(_rows(6))
+    assert len(full.near_duplicates()) > len(capped_pairs)
+    assert full.skipped_buckets == 0
@@ -0,0 +1,21 @@
+from src.models.book import Journal
+from src.utils.interning import interner
+
+
+def _journal(id, **fields):
+    return Journal(id=id, title=f"Journal {id}", author="Author", genre="Science", pages=10,
+                   publisher="Press", type=2, format=0, status=0, copies=1, **fields)
+
+
+def test_repeated_fields_share_one_string():
+    first = _journal(1, category="".join(["Stat", "istics"]))
+    second = _journal(2, category="".join(["Statis", "tics"]))
+    assert first.category is second.category
+
+
+def test_timestamps_are_not_pooled():
+    interner.clear()
+    journal = _journal(3, date_added="2024-01-01", last_updated="2024-01-02")
+    journal.update_details(pages=12)
+    assert "date_added" not in interner.pools
+    assert "last_updated" not in interner.pools
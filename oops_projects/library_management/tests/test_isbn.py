@@ -0,0 +1,30 @@
+from src.core.dedup import dedup_rows
+from src.core.engine import Catalog, Condition, parse_query
+from src.models.book import Journal
+from src.utils.isbn import isbn_key, normalize_isbn
+
+
+def _journal(id, isbn):
+    return Journal(id=id, title=f"Journal {id}", author="Author", genre="Science", pages=10,
+                   publisher="Press", type=2, format=0, status=0, copies=1, isbn=isbn)
+
+
+def test_isbn10_and_isbn13_normalize_alike():
+    assert normalize_isbn("0-471-38471-2") == "9780471384717"
+    assert normalize_isbn("978-0471384717") == "9780471384717"
+    # A mistyped check digit still gives the edition's key.
+    assert normalize_isbn("0471384714") == normalize_isbn("978-0471384719") == "9780471384717"
+    assert normalize_isbn("not an isbn") is None
+    assert isbn_key("12-34") == "1234"
+
+
+def test_query_by_isbn10_finds_isbn13():
+    catalog = Catalog([_journal(1, "978-0471384719"), _journal(2, "978-0000000002")])
+    assert [resource.id for resource in catalog.execute(parse_query("isbn = 0471384714"))] == [1]
+    assert Condition("isbn", "=", "0-471-38471-4").matches(catalog.by_id[1])
+
+
+def test_dedup_and_engine_share_the_key():
+    deduplicator = dedup_rows([{"title": "A", "isbn": "0471384714"},
+                               {"title": "B", "isbn": "978-0471384719"}])
+    assert deduplicator.duplicates() == [(1, 0, "same ISBN")]
@@ -0,0 +1,49 @@
+import heapq
+import random
+
+import pytest
+
+from src.core.recommendations import CoBorrowModel, RecommendationIndex
+
+
+def _expected(model, resource_id, k):
+    row = model.rows.get(resource_id, {})
+    return heapq.nsmallest(k, row.items(), key=lambda item: (-item[1], item[0]))
+
+
+def test_cached_top_k_stays_exact_as_counts_grow():
+    rng = random.Random(3)
+    model = CoBorrowModel(k=3, history_limit=5)
+    for step in range(3_000):
+        model.record(f"user_{rng.randrange(40)}", rng.randrange(25))
+        if step % 50 == 0:
+            # Build some caches early so later checkouts update them in place.
+            for resource_id in range(25):
+                model.recommend(resource_id)
+    for resource_id in range(25):
+        assert model.recommend(resource_id, k=3) == _expected(model, resource_id, 3)
+
+
+def test_saved_index_answers_like_the_model(tmp_path):
+    model = CoBorrowModel(k=2)
+    for user, books in {"ann": [5, 1, 9], "bob": [1, 9], "cat": [9, 5, 30]}.items():
+        for book in books:
+            model.record(user, book)
+    path = str(tmp_path / "recommendations.idx")
+    model.save(path)
+    with RecommendationIndex(path) as index:
+        assert len(index) == 4
+        assert index.k == 2
+        for resource_id in (1, 5, 9, 30):
+            assert index.recommend(resource_id) == model.recommend(resource_id)
+        assert index.recommend(9) == [(1, 2), (5, 2)]
+        assert index.recommend(9, k=1) == [(1, 2)]
+        # Ids around, below and above the stored ones.
+        assert index.recommend(0) == index.recommend(7) == index.recommend(99) == []
+
+
+def test_index_rejects_other_files(tmp_path):
+    path = tmp_path / "not-an-index"
+    path.write_bytes(b"\0" * 64)
+    with pytest.raises(ValueError):
+        RecommendationIndex(str(path))
@@ -0,0 +1,141 @@
+import asyncio
+import json
+
+import pytest
+
+from src.core.circulation import CirculationDesk
+from src.core.engine import Condition, QueryError
+from src.main import SEARCH_LIMIT, STREAM_ROWS, LibraryService
+from src.models.book import Journal
+
+
+def _desk(count=3):
+    return CirculationDesk({id: Journal(id=id, title=f"Journal {id:04d}", author="Author", genre="Science",
+                                        pages=10, publisher="Press", type=2, format=0, status=0, copies=1)
+                            for id in range(1, count + 1)})
+
+
+def _exchange(raw: bytes, desk=None) -> list:
+    """Send raw bytes to a fresh service; [(status, body)] for each response"""
+    async def run():
+        service = LibraryService(desk or _desk())
+        server = await asyncio.start_server(service.handle_connection, "127.0.0.1", 0)
+        reader, writer = await asyncio.open_connection(*server.sockets[0].getsockname()[:2])
+        writer.write(raw)
+        writer.write_eof()
+        data = await reader.read()
+        writer.close()
+        server.close()
+        await server.wait_closed()
+        return data
+
+    data = asyncio.run(run())
+    responses = []
+    while data:
+        head, _, data = data.partition(b"\r\n\r\n")
+        lines = head.decode().split("\r\n")
+        headers = dict(line.lower().split(": ", 1) for line in lines[1:])
+        if "content-length" in headers:
+            length = int(headers["content-length"])
+            body, data = data[:length], data[length:]
+        else:
+            body = b""
+            while True:
+                size, _, data = data.partition(b"\r\n")
+                size = int(size, 16)
+                body, data = body + data[:size], data[size + 2:]
+                if not size:
+                    break
+        responses.append((int(lines[0].split()[1]), json.loads(body)))
+    return responses
+
+
+def _post(path: str, payload, close: bool = True) -> bytes:
+    body = json.dumps(payload).encode()
+    headers = [f"POST {path} HTTP/1.1", f"Content-Length: {len(body)}"] + (["Connection: close"] if close else [])
+    return ("\r\n".join(headers) + "\r\n\r\n").encode() + body
+
+
+@pytest.mark.parametrize("length", ["abc", "-5"])
+def test_bad_content_length_is_400(length):
+    [(status, body)] = _exchange(f"POST /checkout HTTP/1.1\r\nContent-Length: {length}\r\n\r\n".encode())
+    assert status == 400
+
+
+def test_overlong_header_is_400():
+    [(status, body)] = _exchange(b"GET /health HTTP/1.1\r\nX-Long: " + b"a" * 70_000 + b"\r\n\r\n")
+    assert status == 400
+
+
+def test_missing_user_is_400():
+    [(status, body)] = _exchange(_post("/checkout", {"resource_id": 1}))
+    assert status == 400
+    assert body == {"error": "user_id is required"}
+
+
+def test_check_in_without_copy_id_is_allowed():
+    [checkout, checkin] = _exchange(_post("/checkout", {"resource_id": 1, "user_id": "u1"}, close=False) +
+                                    _post("/checkin", {"resource_id": 1}))
+    assert checkout == (200, {"ok": True, "copy_id": None, "available": 0})
+    assert checkin[0] == 200 and checkin[1]["ok"] is True
+
+
+def test_batch_reports_bad_items_in_place():
+    [(status, body)] = _exchange(_post("/batch", {"requests": [
+        {"op": "check_out", "args": [1, "u1"]},
+        {"op": "check_out", "args": [2]},
+        {"op": "search", "args": ["x"]},
+        {"op": "lookup", "args": ["two"]},
+    ]}))
+    assert status == 200
+    first, second, third, fourth = body["results"]
+    assert first["ok"] is True
+    assert second == {"ok": False, "error": "check_out takes 2 arguments, got 1"}
+    assert third["ok"] is False and fourth["ok"] is False
+
+
+def test_search_pages_by_default_and_streams_large_pages():
+    desk = _desk(STREAM_ROWS + 50)
+    request = "GET /search?q=genre%20%3D%20Science%20ORDER%20BY%20title{} HTTP/1.1\r\n\r\n"
+    [(_, default), (_, large)] = _exchange(request.format("").encode() +
+                                           request.format("&limit=1000").encode(), desk)
+    assert default["count"] == SEARCH_LIMIT
+    assert large["count"] == STREAM_ROWS + 50
+    assert [row["title"] for row in large["results"]] == sorted(row["title"] for row in large["results"])
+
+
+def test_contains_on_a_number_field_is_a_query_error():
+    with pytest.raises(QueryError):
+        Condition("pages", "CONTAINS", "1")
+    [(status, body)] = _exchange(b"GET /search?q=pages%20CONTAINS%201 HTTP/1.1\r\n\r\n")
+    assert status == 400
+    assert body == {"error": "CONTAINS needs a text field, not pages"}
+
+
+@pytest.mark.parametrize("payload, error", [
+    ({"resource_id": 1, "user_id": 5}, "user_id must be a non-empty string"),
+    ({"resource_id": 1, "user_id": ["u1"]}, "user_id must be a non-empty string"),
+])
+def test_user_id_must_be_a_string(payload, error):
+    [(status, body)] = _exchange(_post("/checkout", payload))
+    assert (status, body) == (400, {"error": error})
+
+
+def test_copy_id_must_be_a_string_when_given():
+    [(status, body)] = _exchange(_post("/checkin", {"resource_id": 1, "copy_id": 7}))
+    assert (status, body) == (400, {"error": "copy_id must be a string"})
+
+
+def test_batch_reports_badly_typed_ids_in_place():
+    [(status, body)] = _exchange(_post("/batch", {"requests": [
+        {"op": "check_out", "args": [1, 5]},
+        {"op": "place_hold", "args": [1, ""]},
+        {"op": "check_in", "args": [1, {"copy": 1}]},
+        {"op": "check_in", "args": [1, None]},
+    ]}))
+    assert status == 200
+    first, second, third, fourth = body["results"]
+    assert first == {"ok": False, "error": "user_id must be a non-empty string"}
+    assert second == {"ok": False, "error": "user_id must be a non-empty string"}
+    assert third == {"ok": False, "error": "copy_id must be a string"}
+    assert fourth["ok"] is True
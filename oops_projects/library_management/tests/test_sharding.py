@@ -0,0 +1,35 @@
+import pytest
+
+from src.core.sharding import ShardedCatalog, ShardError
+
+
+@pytest.fixture
+def catalog():
+    with ShardedCatalog(2) as catalog:
+        yield catalog
+
+
+def test_one_bad_item_keeps_the_others(catalog):
+    first, second, third = catalog.batch([("check_out", (1, "u1")), ("check_out", (2,)),
+                                          ("search", (3,))])
+    assert first['ok'] is True
+    assert second['ok'] is False and "TypeError" in second['error']
+    assert third == {'ok': False, 'error': "search cannot be batched"}
+
+
+def test_dead_worker_raises_shard_error(catalog):
+    catalog._processes[1].kill()
+    catalog._processes[1].join()
+    with pytest.raises(ShardError, match="1"):
+        catalog.count("copies >= 0")
+    # The live shard's reply was consumed, so its next call is answered in step.
+    assert catalog.lookup(2)['id'] == 2
+    with pytest.raises(ShardError):
+        catalog.lookup(1)
+
+
+def test_worker_exits_cleanly_when_parent_goes_away():
+    catalog = ShardedCatalog(1)
+    catalog._connections[0].close()
+    catalog._processes[0].join(30)
+    assert catalog._processes[0].exitcode == 0
@@ -0,0 +1,52 @@
+from src.core.columnar import ColumnarCatalog
+from src.models.book import Journal
+from src.repository.snapshots import SnapshotPublisher, SnapshotReader
+
+
+def _catalog(count, copies=1):
+    return ColumnarCatalog.from_resources({
+        id: Journal(id=id, title=f"Journal {id}", author="Author", genre="Science", pages=10,
+                    publisher="Press", type=2, format=0, status=0, copies=copies, location="A1")
+        for id in range(1, count + 1)})
+
+
+def test_reader_attaches_and_refreshes_to_new_versions(tmp_path):
+    publisher = SnapshotPublisher("catalog", str(tmp_path))
+    assert publisher.publish(_catalog(3)) == 1
+    with SnapshotReader("catalog", str(tmp_path)) as reader:
+        assert reader.version == 1
+        assert reader.lookup(2)["title"] == "Journal 2"
+        assert reader.lookup(4) is None
+        assert not reader.refresh()
+
+        old_map = reader._map
+        assert publisher.publish(_catalog(4, copies=2)) == 2
+        assert reader.refresh()
+        assert reader.version == 2
+        assert reader.lookup(4)["copies"] == 2
+        # Nothing viewed the old version any more, so its map is gone.
+        assert old_map.closed
+        assert reader._retired == []
+    assert reader.version == 2
+    assert reader.catalog is None
+
+
+def test_publisher_continues_the_version_after_a_restart(tmp_path):
+    SnapshotPublisher("catalog", str(tmp_path)).publish(_catalog(1))
+    SnapshotPublisher("catalog", str(tmp_path)).publish(_catalog(1))
+    publisher = SnapshotPublisher("catalog", str(tmp_path))
+    assert publisher.version == 2
+    assert publisher.publish(_catalog(2)) == 3
+    with SnapshotReader("catalog", str(tmp_path)) as reader:
+        assert reader.version == 3
+    publisher.unlink()
+    assert not (tmp_path / "catalog.snap").exists()
+
+
+def test_refresh_without_a_snapshot_keeps_the_current_one(tmp_path):
+    publisher = SnapshotPublisher("catalog", str(tmp_path))
+    publisher.publish(_catalog(2))
+    with SnapshotReader("catalog", str(tmp_path)) as reader:
+        publisher.unlink()
+        assert not reader.refresh()
+        assert reader.lookup(1)["title"] == "Journal 1"
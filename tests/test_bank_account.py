@@ -0,0 +1,105 @@
+import math
+import threading
+
+import pytest
+
+import refactoring_example as bank
+from account_events import EventLog, EventType, Reason
+
+
+@pytest.fixture
+def accounts(monkeypatch):
+    monkeypatch.setattr(bank.BankAccount, "user_validator", lambda self: True)
+    ann = bank.BankAccount("Ann", 30, "1995-01-01", "555", "Street",
+                           balance=100, password="Secret123", user_id="ann_1")
+    bob = bank.BankAccount("Bob", 40, "1985-01-01", "556", "Road",
+                           balance=0, password="Secret456", user_id="bob_1")
+    yield ann, bob
+    bank.bank_users_db.clear()
+    bank.transfer_engine.accounts.clear()
+
+
+def _last(account):
+    return list(account.events.query())[-1]
+
+
+@pytest.mark.parametrize("amount", [0, -5, math.nan, math.inf])
+def test_rejected_deposit_is_not_recorded_as_a_deposit(accounts, amount):
+    ann, _ = accounts
+    ann.deposit(amount)
+    assert ann.balance == 100
+    assert bank.bank_users_db["ann_1"]["balance"] == 100
+    assert _last(ann).kind == EventType.FAILED_DEPOSIT
+    assert _last(ann).reason == Reason.INVALID_AMOUNT
+    assert not any(event.kind == EventType.DEPOSIT
+                   for event in ann.events.query())
+
+
+def test_negative_withdrawal_and_self_transfer_have_their_own_reasons(accounts):
+    ann, _ = accounts
+    ann.withdrawl(-10)
+    assert _last(ann).reason == Reason.INVALID_AMOUNT
+    ann.transfer("ann_1", 10)
+    assert _last(ann).reason == Reason.SELF_TRANSFER
+    ann.withdrawl(500)
+    assert _last(ann).reason == Reason.INSUFFICIENT_FUNDS
+    assert ann.balance == 100
+
+
+def test_engine_refuses_non_finite_amounts(accounts):
+    for amount in (math.nan, math.inf, -math.inf):
+        assert not bank.transfer_engine.deposit("ann_1", amount)
+        assert not bank.transfer_engine.transfer("ann_1", "bob_1", amount)
+    assert bank.transfer_engine.balance("ann_1") == 100
+
+
+def test_busy_account_keeps_its_whole_history(accounts):
+    ann, _ = accounts
+    for _ in range(3_000):
+        ann.record(EventType.BALANCE_CHECK)
+    assert ann.events.dropped == 0
+    assert len(list(ann.events.query())) == 3_000
+
+
+def test_events_spill_beside_the_ledger(tmp_path):
+    bank.open_bank(str(tmp_path))
+    try:
+        ann = bank.BankAccount("Ann", 30, "1995-01-01", "555", "Street",
+                               password="Secret123", user_id="ann_2")
+        assert ann.events.spill_path == str(tmp_path / "events" / "ann_2.events")
+    finally:
+        bank.close_bank()
+        bank.bank_users_db.clear()
+        bank.transfer_engine.accounts.clear()
+
+
+def test_concurrent_appends_lose_no_events(tmp_path):
+    log = EventLog(capacity=64, spill_path=str(tmp_path / "ann.events"))
+
+    def append_many():
+        for _ in range(2_000):
+            log.append(EventType.BALANCE_CHECK)
+
+    threads = [threading.Thread(target=append_many) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(log) == 16_000
+    assert len(list(log.query())) == 16_000
+
+
+def test_close_bank_spills_events_still_in_memory(tmp_path):
+    bank.open_bank(str(tmp_path))
+    try:
+        ann = bank.BankAccount("Ann", 30, "1995-01-01", "555", "Street",
+                               password="Secret123", user_id="ann_3")
+        ann.record(EventType.DEPOSIT, 5, "payroll")
+    finally:
+        bank.close_bank()
+        bank.bank_users_db.clear()
+        bank.transfer_engine.accounts.clear()
+    restored = EventLog(spill_path=ann.events.spill_path)
+    assert [(event.kind, event.amount, event.counterparty)
+            for event in restored.query()] == [
+        (EventType.DEPOSIT, 500, "payroll")]
@@ -0,0 +1,60 @@
+import math
+
+import pytest
+
+from bank_service import AuthenticationError, BankService, hash_password
+from transfers import TransferEngine
+
+
+@pytest.fixture
+def service():
+    db = {"ann": {"password": "pw-ann", "balance": 100.0},
+          "bob": {"password": "pw-bob", "balance": 0.0}}
+    return BankService(db, TransferEngine(db))
+
+
+def test_login_accepts_and_refuses_non_ascii_passwords(service):
+    service.db["ann"]["password"] = "pässwörd-✓"
+    assert service.login("ann", "pässwörd-✓") is not None
+    assert service.login("ann", "passwörd-✓") is None
+    assert service.login("bob", "pw-böb") is None
+    service.db["ann"]["password_hash"] = hash_password("pässwörd-✓")
+    service.db["ann"]["password"] = None
+    assert service.login("ann", "pässwörd-✓") is not None
+    assert service.login("ann", "pässwörd") is None
+
+
+def test_batch_keeps_running_when_the_session_expires_mid_batch(service):
+    token = service.login("ann", "pw-ann")
+
+    def operations():
+        yield {"op": "withdraw", "amount": "10"}
+        service._sessions[token] = ("ann", 0)  # expired from here on
+        yield {"op": "transfer", "to": "bob", "amount": "20"}
+        yield {"op": "deposit", "amount": "5"}
+
+    results = list(service.submit_batch(token, operations()))
+    assert [result['ok'] for result in results] == [True, True, True]
+    assert service.db["ann"]["balance"] == 75.0
+    assert service.db["bob"]["balance"] == 20.0
+    with pytest.raises(AuthenticationError):
+        service.balance(token)
+
+
+@pytest.mark.parametrize("amount", ["nan", "inf", "-inf", "0"])
+def test_batch_rejects_non_finite_and_zero_amounts(service, amount):
+    token = service.login("ann", "pw-ann")
+    rows = [{"op": "deposit", "amount": amount},
+            {"op": "withdraw", "amount": amount},
+            {"op": "transfer", "to": "bob", "amount": amount}]
+    results = list(service.submit_batch(token, rows))
+    assert not any(result['ok'] for result in results)
+    assert service.db["ann"]["balance"] == 100.0
+    assert not math.isnan(service.db["bob"]["balance"])
+
+
+def test_self_transfer_has_its_own_message(service):
+    token = service.login("ann", "pw-ann")
+    result = service.transfer(token, "ann", 10)
+    assert result == {'ok': False, 'balance': 100.0,
+                      'message': "Cannot transfer to your own account."}
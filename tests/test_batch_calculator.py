@@ -0,0 +1,47 @@
+import csv
+import math
+
+import pytest
+
+import batch_calculator
+from batch_calculator import (DIVISION_ERROR, INVALID_OPERATION, evaluate_batch,
+                              evaluate_csv)
+
+
+PATHS = [pytest.param(False, id="python"),
+         pytest.param(True, id="numpy", marks=pytest.mark.skipif(
+             batch_calculator.np is None, reason="numpy is not installed"))]
+
+
+@pytest.mark.parametrize("use_numpy", PATHS)
+def test_evaluate_batch_reports_failed_rows(use_numpy):
+    values, errors = evaluate_batch([6, 6, 6, 6, 6], ['+', '-', '*', '/', '%'],
+                                    [3, 3, 3, 0, 3], use_numpy=use_numpy)
+    assert list(values[:3]) == [9, 3, 18]
+    assert math.isnan(values[3]) and math.isnan(values[4])
+    assert errors == [(3, DIVISION_ERROR), (4, INVALID_OPERATION)]
+
+
+@pytest.mark.parametrize("use_numpy", PATHS)
+def test_evaluate_batch_paths_agree(use_numpy):
+    a = [1.5, -2.0, 8.0, 0.0]
+    b = [2.0, 4.0, -0.5, 0.0]
+    ops = ['/', '*', '/', '/']
+    values, errors = evaluate_batch(a, ops, b, use_numpy=use_numpy)
+    expected, expected_errors = evaluate_batch(a, ops, b, use_numpy=False)
+    assert list(values[:3]) == expected[:3]
+    assert errors == expected_errors
+
+
+def test_evaluate_csv_records_bad_cells_per_row(tmp_path):
+    source = tmp_path / "in.csv"
+    source.write_text("a,op,b\n4,+,1\nfour,+,1\n4,/,\n4,/,0\n10,-,4\n")
+    target = tmp_path / "out.csv"
+
+    assert evaluate_csv(str(source), str(target)) == 5
+    with open(target, newline='') as file:
+        rows = list(csv.DictReader(file))
+    assert [row['result'] for row in rows] == ['5.0', '', '', '', '6.0']
+    assert rows[1]['error'] == "Error: 'four' is not a number."
+    assert rows[2]['error'] == "Error: '' is not a number."
+    assert rows[3]['error'] == DIVISION_ERROR
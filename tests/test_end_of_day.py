@@ -0,0 +1,54 @@
+import os
+
+from end_of_day import POSTED_FILE, run_end_of_day
+from ledger import LOG_FILE, Ledger
+
+
+def _accounts():
+    return {f"user_{number}": {"name": f"User {number}", "balance": 1000.0}
+            for number in range(50)}
+
+
+def _open(directory, db):
+    ledger = Ledger(str(directory))
+    for user_id, record in db.items():
+        ledger.open_account(user_id, record["balance"])
+    return ledger
+
+
+def test_resume_after_crash_before_posted_mark_pays_once(tmp_path):
+    db = _accounts()
+    ledger = _open(tmp_path / "ledger", db)
+    run_end_of_day(db, str(tmp_path / "runs"), "0.365", "2024-01-31",
+                   chunk_size=10, ledger=ledger)
+    paid = dict(ledger.balances)
+    ledger.close()
+    assert paid["user_0"] == 100_000 + 100
+
+    # Crash after the ledger write but before posted.log was appended.
+    os.remove(tmp_path / "runs" / "2024-01-31" / POSTED_FILE)
+    with Ledger(str(tmp_path / "ledger")) as ledger:
+        run_end_of_day(_accounts(), str(tmp_path / "runs"), "0.365",
+                       "2024-01-31", chunk_size=10, ledger=ledger)
+        assert ledger.balances == paid
+
+
+def test_chunk_torn_inside_its_batch_is_paid_exactly_once(tmp_path):
+    db = _accounts()
+    ledger = _open(tmp_path / "ledger", db)
+    ledger.flush()
+    before = os.path.getsize(tmp_path / "ledger" / LOG_FILE)
+    run_end_of_day(db, str(tmp_path / "runs"), "0.365", "2024-01-31",
+                   chunk_size=50, ledger=ledger)
+    ledger.close()
+
+    # Cut the log inside the single chunk's batch, as a crash mid-write.
+    log = tmp_path / "ledger" / LOG_FILE
+    data = log.read_bytes()
+    log.write_bytes(data[:before + (len(data) - before) // 2])
+    with Ledger(str(tmp_path / "ledger")) as ledger:
+        assert ledger.balances["user_0"] == 100_000
+        assert not ledger.batches
+        run_end_of_day(_accounts(), str(tmp_path / "runs"), "0.365",
+                       "2024-01-31", chunk_size=50, ledger=ledger)
+        assert all(balance == 100_100 for balance in ledger.balances.values())
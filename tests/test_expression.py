@@ -0,0 +1,32 @@
+import pytest
+
+from expression import ExpressionError, compile_expression, evaluate
+
+
+def test_variable_named_underscore_compiles():
+    assert evaluate("_ * 2 + __", _=3, __=1, unused=9) == 7
+
+
+def test_variables_named_text_and_self():
+    assert evaluate("text + self", text=1, self=2) == 3
+
+
+def test_missing_values_are_named():
+    with pytest.raises(ExpressionError, match="Missing values for: b."):
+        compile_expression("a + b")(a=1)
+
+
+def test_type_errors_in_values_are_not_reported_as_missing():
+    with pytest.raises(TypeError):
+        evaluate("a + 1", a="one")
+
+
+def test_overflowing_literal_is_infinite():
+    assert evaluate("1e400") == float("inf")
+    assert evaluate("-1e400 * x", x=2) == float("-inf")
+
+
+@pytest.mark.parametrize("text", ["__debug__ + 1", "__class__", "x * __builtins__"])
+def test_dunder_names_are_rejected(text):
+    with pytest.raises(ExpressionError, match="not a valid name"):
+        compile_expression(text)
@@ -0,0 +1,68 @@
+from account_events import EventType
+from bank_service import BankService
+from fraud_rules import (NewRecipientLimit, RulesEngine, SlidingWindow,
+                         VelocityLimit)
+from transfers import TransferEngine
+
+
+def _service(rules, balance=1.0):
+    db = {"ann": {"password": "pw", "balance": balance},
+          "bob": {"password": "pw", "balance": 0.0}}
+    service = BankService(db, TransferEngine(db), rules=RulesEngine(rules))
+    return service, service.login("ann", "pw")
+
+
+def test_failed_transfer_does_not_make_the_recipient_known():
+    service, token = _service([NewRecipientLimit(10)])
+    assert not service.transfer(token, "bob", 5)['ok']  # insufficient funds
+    service.db["ann"]["balance"] = 100.0
+    result = service.transfer(token, "bob", 50)
+    assert not result['ok']
+    assert result['message'] == "First transfer to bob is limited to 10.0."
+    assert service.transfer(token, "bob", 5)['ok']
+    assert service.transfer(token, "bob", 50)['ok']
+
+
+def test_failed_operations_use_no_velocity_budget():
+    service, token = _service([VelocityLimit(60, max_count=2)])
+    for _ in range(5):
+        assert service.withdraw(token, 50)['message'] == "Insufficient balance."
+    assert service.withdraw(token, 0.5)['ok']
+    assert service.withdraw(token, 0.25)['ok']
+    assert "More than 2 operations" in service.withdraw(token, 0.25)['message']
+
+
+def test_default_velocity_rule_ignores_deposits():
+    service, token = _service(None, balance=0.0)
+    for _ in range(30):
+        assert service.deposit(token, 1)['ok']
+    assert service.withdraw(token, 1)['ok']
+
+
+def test_rule_tables_are_bounded():
+    velocity = VelocityLimit(60, max_count=5, max_users=10)
+    recipients = NewRecipientLimit(10, max_users=10, max_recipients=3)
+    engine = RulesEngine([velocity, recipients])
+    for number in range(100):
+        op = engine.operation(EventType.TRANSFER_OUT, f"user_{number}", 1,
+                              f"payee_{number % 7}", now=number)
+        assert engine.check(op) == []
+        engine.commit(op)
+    for number in range(10):
+        op = engine.operation(EventType.TRANSFER_OUT, "user_0", 1,
+                              f"payee_{number}", now=200)
+        engine.commit(op)
+    assert len(velocity._windows) <= 10
+    assert len(recipients._known) <= 10
+    assert len(recipients._known["user_0"]) == 3
+
+
+def test_released_events_leave_the_window():
+    window = SlidingWindow(60)
+    window.add(10.0, 500)
+    window.add(11.0, 200)
+    window.remove(10.0, 500)
+    assert window.totals(12.0) == (1, 200)
+    window.remove(10.0, 500)  # nothing left in that bucket to take back
+    assert window.totals(12.0) == (1, 200)
+    assert window.idle(200.0)
@@ -0,0 +1,37 @@
+import pytest
+
+import id_generator
+from id_generator import MAX_NODE, IdGenerator, claim_node, collision_test
+
+
+def test_generators_without_id_node_lease_distinct_nodes(tmp_path, monkeypatch):
+    monkeypatch.delenv("ID_NODE", raising=False)
+    monkeypatch.setattr(id_generator, "NODE_DIR", str(tmp_path))
+    first, second = IdGenerator(), IdGenerator()
+    assert first.node_id != second.node_id
+    first._lease.close()
+    assert IdGenerator().node_id == first.node_id  # released nodes are reused
+
+
+def test_id_node_out_of_range_is_rejected_not_masked(monkeypatch):
+    monkeypatch.setenv("ID_NODE", str(MAX_NODE + 1))
+    with pytest.raises(ValueError):
+        IdGenerator()
+    monkeypatch.setenv("ID_NODE", "7")
+    assert IdGenerator().node_id == 7
+
+
+def test_claim_node_skips_held_nodes(tmp_path):
+    held = [claim_node(str(tmp_path)) for _ in range(3)]
+    assert [node for node, _ in held] == [0, 1, 2]
+
+
+def test_collision_test_passes_and_catches_repeats():
+    assert collision_test(200_000, block_size=10_000, threads=4)
+
+    class Repeating(IdGenerator):
+        def allocate_block(self, count):
+            return list(range(count))  # every thread gets the same IDs
+
+    assert not collision_test(40_000, block_size=10_000, threads=2,
+                              generator=Repeating(node_id=1))
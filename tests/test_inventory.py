@@ -0,0 +1,68 @@
+import pytest
+
+from inventory import BranchNetwork, Inventory, normalize_isbn, normalize_title
+
+HOBBIT_10 = "0-261-10221-4"
+HOBBIT_13 = "978-0-261-10221-7"
+
+
+@pytest.fixture
+def network():
+    return BranchNetwork()
+
+
+def test_titles_and_isbns_are_normalized():
+    assert normalize_title("The  Hobbit!") == normalize_title("the hobbit")
+    assert normalize_isbn(HOBBIT_10) == normalize_isbn(HOBBIT_13) == \
+        "9780261102217"
+    assert normalize_isbn("0-261-10221-5") is None
+    assert normalize_isbn("not an isbn") is None
+
+
+def test_add_rejects_bad_input(network):
+    branch = Inventory("north", network)
+    with pytest.raises(ValueError):
+        branch.add("The Hobbit", copies=0)
+    with pytest.raises(ValueError):
+        branch.add("The Hobbit", isbn="123")
+
+
+def test_checkout_and_checkin_move_copies(network):
+    branch = Inventory("north", network)
+    key = branch.add("The Hobbit", isbn=HOBBIT_10, copies=2)
+    assert branch.checkout(HOBBIT_13) == key
+    assert branch.checkout("the hobbit") == key
+    assert branch.checkout("The Hobbit") is None
+    assert branch.available("The Hobbit") == 0
+    assert branch.checkin("THE HOBBIT") == key
+    assert branch.checkin("The Hobbit") == key
+    assert branch.checkin("The Hobbit") is None
+    assert list(branch.items()) == [("The Hobbit", 2, 2)]
+
+
+def test_network_tracks_which_branches_have_a_free_copy(network):
+    north = Inventory("north", network)
+    south = Inventory("south", network)
+    north.add("Dune")
+    south.add("dune!", copies=2)
+    assert network.branches_with("Dune") == ["north", "south"]
+    north.checkout("Dune")
+    assert network.branches_with("dune") == ["south"]
+    south.checkout("Dune")
+    south.checkout("Dune")
+    assert network.branches_with("Dune") == []
+    north.checkin("Dune")
+    assert network.branches_with("Dune") == ["north"]
+    assert network.branches_with("Missing") == []
+
+
+def test_every_title_an_isbn_was_added_under_finds_it(network):
+    north = Inventory("north", network)
+    south = Inventory("south", network)
+    north.add("The Hobbit", isbn=HOBBIT_10)
+    south.add("The Hobbit, or There and Back Again", isbn=HOBBIT_13)
+    assert network.branches_with("The Hobbit") == ["north", "south"]
+    assert network.branches_with(
+        "the hobbit or there and back again") == ["north", "south"]
+    assert south.checkout("The Hobbit") == "9780261102217"
+    assert network.titles["9780261102217"] == "The Hobbit"
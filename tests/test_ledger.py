@@ -0,0 +1,116 @@
+import os
+import time
+
+import pytest
+
+import refactoring_example as bank
+from ledger import LOG_FILE, Ledger, LedgerCorruptError
+
+
+def test_last_records_of_a_burst_are_synced_without_another_append(tmp_path):
+    ledger = Ledger(str(tmp_path), sync_every=1_000_000, sync_interval=0.02)
+    try:
+        ledger.deposit("alice", 5.0)
+        deadline = time.monotonic() + 2
+        while (os.path.getsize(tmp_path / LOG_FILE) == 0
+               and time.monotonic() < deadline):
+            time.sleep(0.01)
+        assert os.path.getsize(tmp_path / LOG_FILE) > 0
+    finally:
+        ledger.close()
+
+
+def test_opening_balances_are_part_of_recovery(tmp_path):
+    with Ledger(str(tmp_path)) as ledger:
+        ledger.open_account("alice", 100.0)
+        assert ledger.open_account("alice", 999.0) is None
+        ledger.withdraw("alice", 30.0)
+    with Ledger(str(tmp_path)) as ledger:
+        assert ledger.balance("alice") == 70.0
+
+
+def _write_three_records(directory):
+    with Ledger(str(directory)) as ledger:
+        for amount in (1.0, 2.0, 3.0):
+            ledger.deposit("alice", amount)
+    return (directory / LOG_FILE).read_bytes()
+
+
+def test_torn_tail_is_cut_off(tmp_path):
+    data = _write_three_records(tmp_path)
+    (tmp_path / LOG_FILE).write_bytes(data[:-3])
+    with Ledger(str(tmp_path)) as ledger:
+        assert ledger.balance("alice") == 3.0
+        assert ledger.last_seq == 2
+    assert len((tmp_path / LOG_FILE).read_bytes()) == len(data) * 2 // 3
+
+
+def test_corruption_before_the_tail_raises(tmp_path):
+    data = bytearray(_write_three_records(tmp_path))
+    data[len(data) // 2] ^= 0xFF  # inside the second record
+    (tmp_path / LOG_FILE).write_bytes(bytes(data))
+    with pytest.raises(LedgerCorruptError):
+        Ledger(str(tmp_path))
+    assert (tmp_path / LOG_FILE).read_bytes() == bytes(data)
+
+
+@pytest.fixture
+def fresh_bank():
+    yield
+    bank.close_bank()
+    bank.bank_users_db.clear()
+    bank.transfer_engine.accounts.clear()
+
+
+def test_bank_restores_accounts_and_balances_after_restart(tmp_path, fresh_bank):
+    bank.open_bank(str(tmp_path))
+    bank.BankAccount("Ann", 30, "1995-01-01", "555", "Street", balance=50,
+                     password="Secret123", user_id="ann_1")
+    token = bank.bank_service.login("ann_1", "Secret123")
+    assert bank.bank_service.deposit(token, 25)['ok']
+    bank.close_bank()
+
+    # A restart: nothing in memory but what open_bank() reads back.
+    bank.bank_users_db.clear()
+    bank.transfer_engine.accounts.clear()
+    bank.open_bank(str(tmp_path))
+    assert bank.bank_users_db["ann_1"]["balance"] == 75
+    token = bank.bank_service.login("ann_1", "Secret123")
+    assert bank.bank_service.balance(token) == 75
+
+
+def test_history_reads_synced_records_through_one_handle(tmp_path):
+    with Ledger(str(tmp_path)) as ledger:
+        ledger.open_account("alice", 10.0)
+        ledger.transfer("alice", "bøb", 4.0)
+        ledger.flush()
+        ledger.deposit("alice", 1.0)  # still buffered
+        history = ledger.history("alice")
+        assert [record.amount for record in history] == [1000, 400, 100]
+        assert history[1].counterparty == "bøb"
+        reader = ledger._reader
+        assert ledger.history("bøb")[0].user_id == "alice"
+        assert ledger._reader is reader
+    assert reader.closed
+
+
+def test_saved_accounts_hold_a_password_hash_not_the_password(
+        tmp_path, fresh_bank):
+    bank.open_bank(str(tmp_path))
+    bank.BankAccount("Ann", 30, "1995-01-01", "555", "Street",
+                     password="Secret123", user_id="ann_1")
+    bank.close_bank()
+    saved = (tmp_path / bank.ACCOUNTS_FILE).read_text(encoding="utf-8")
+    assert "Secret123" not in saved
+    assert "password_hash" in saved
+
+    bank.bank_users_db.clear()
+    bank.transfer_engine.accounts.clear()
+    bank.open_bank(str(tmp_path))
+    assert bank.bank_service.login("ann_1", "Secret124") is None
+    # Rebuilding the account after a restart keeps the saved hash.
+    user_data = bank.bank_users_db["ann_1"]
+    bank.BankAccount(user_data['name'], user_data['age'], user_data['dob'],
+                     user_data['number'], user_data['address'],
+                     user_id="ann_1", password=user_data.get('password'))
+    assert bank.bank_service.login("ann_1", "Secret123") is not None
@@ -0,0 +1,89 @@
+import os
+
+import pytest
+
+from log_follow import LevelRates, RollingCounter, follow
+
+
+def test_rolling_counter_expires_old_buckets():
+    counter = RollingCounter(window=10, resolution=1)
+    counter.add("ERROR", now=100)
+    counter.add("ERROR", now=105, count=2)
+    assert counter.count("ERROR", now=109) == 3
+    assert counter.count("ERROR", now=110) == 2
+    assert counter.count("ERROR", now=115) == 0
+    # A jump of more than a whole window clears everything once.
+    counter.add("INFO", now=116)
+    assert counter.count("INFO", now=1_000) == 0
+    assert counter.rate("INFO", now=1_000) == 0
+
+
+def test_rolling_counter_rejects_empty_window():
+    with pytest.raises(ValueError):
+        RollingCounter(window=0)
+
+
+def test_level_rates_per_window():
+    rates = LevelRates(windows=(10, 100))
+    for now in range(50):
+        rates.add("WARNING", now=now)
+    snapshot = rates.snapshot(["WARNING", "ERROR"], now=49)
+    assert snapshot[10] == {"WARNING": 1.0, "ERROR": 0.0}
+    assert snapshot[100] == {"WARNING": 0.5, "ERROR": 0.0}
+    assert rates.totals["WARNING"] == 50
+
+
+class _Done(Exception):
+    pass
+
+
+def _follow(path, steps):
+    """Lines follow() yields while each idle poll runs the next step"""
+    steps = iter(steps)
+    lines = []
+
+    def on_idle():
+        step = next(steps, None)
+        if step is None:
+            raise _Done
+        step()
+
+    try:
+        for line in follow(path, from_start=True, poll_interval=0, on_idle=on_idle):
+            lines.append(line)
+    except _Done:
+        pass
+    return lines
+
+
+def test_follow_keeps_the_old_files_last_line_on_rotation(tmp_path):
+    path = tmp_path / "app.log"
+    path.write_text("one\ntwo")
+
+    def rotate():
+        os.rename(path, tmp_path / "app.log.1")
+        path.write_text("three\n")
+
+    assert _follow(str(path), [rotate]) == ["one\n", "two", "three\n"]
+
+
+def test_follow_rereads_a_truncated_file(tmp_path):
+    path = tmp_path / "app.log"
+    path.write_text("é first line\nsecond line\n")
+
+    def truncate():
+        with open(path, "w", encoding="utf-8") as file:
+            file.write("new\n")
+
+    assert _follow(str(path), [truncate]) == ["é first line\n", "second line\n", "new\n"]
+
+
+def test_follow_joins_a_line_written_in_pieces(tmp_path):
+    path = tmp_path / "app.log"
+    path.write_text("par")
+
+    def finish():
+        with open(path, "a") as file:
+            file.write("tial\r\n")
+
+    assert _follow(str(path), [finish]) == ["partial\r\n"]
@@ -0,0 +1,42 @@
+import io
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from log_pipeline import bounded_map, run_file, run_pipeline
+
+
+LINES = [f"{level} line {number}\n"
+         for number in range(500)
+         for level in ("INFO", "WARNING", "ERROR", "DEBUG")]
+
+
+def test_bounded_map_keeps_order_and_limits_jobs_in_flight():
+    pulled = []
+    done = []
+    lock = threading.Lock()
+
+    def jobs():
+        for job in range(50):
+            with lock:
+                # Never more than the window queued beyond what was consumed.
+                assert len(pulled) - len(done) <= 3
+            pulled.append(job)
+            yield job
+
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        for result in bounded_map(pool, lambda job: job * 2, jobs(), window=3):
+            done.append(result)
+    assert done == [job * 2 for job in range(50)]
+
+
+def test_run_file_matches_stream_pipeline_across_chunks(tmp_path):
+    path = tmp_path / "app.log"
+    path.write_text("".join(LINES))
+    expected_out = io.StringIO()
+    expected = run_pipeline(iter(LINES), keep=["ERROR"], output=expected_out)
+
+    out = io.StringIO()
+    totals = run_file(str(path), keep=["ERROR"], output=out, workers=2,
+                      chunk_size=997, batch_size=7)
+    assert totals == expected
+    assert out.getvalue() == expected_out.getvalue()
@@ -0,0 +1,44 @@
+import pytest
+
+from password_policy import PasswordPolicy, audit_file, audit_rows
+
+
+def test_audit_rows_reads_a_bounded_number_of_chunks_ahead():
+    pulled = 0
+
+    def rows():
+        nonlocal pulled
+        for number in range(100_000):
+            pulled += 1
+            yield f"user{number}", "short" if number % 2 else "Long3nough"
+
+    failures = audit_rows(rows(), chunk_size=1_000, workers=2)
+    assert next(failures) == ("user1", ["Password must be at least 8 characters long.",
+                                        "Password must contain at least one uppercase letter.",
+                                        "Password must contain at least one digit."])
+    # Four chunks in flight plus the one being queued, not the whole input.
+    assert pulled <= 5 * 1_000 + 1
+    assert sum(1 for _ in failures) == 49_999
+    assert pulled == 100_000
+
+
+def test_single_pass_matches_every_rule():
+    policy = PasswordPolicy(min_length=4, max_length=6, require_symbol=True)
+    assert policy.check("Ab1!") == []
+    assert policy.check("abcdefgh") == ["Password must be at most 6 characters long.",
+                                        "Password must contain at least one uppercase letter.",
+                                        "Password must contain at least one digit.",
+                                        "Password must contain at least one special character."]
+
+
+def test_audit_file_checks_the_stored_password(tmp_path):
+    path = tmp_path / "users.csv"
+    path.write_bytes("user_id,password\nana,Sécur1té\n".encode())
+    assert audit_file(str(path)) == {}
+
+
+def test_audit_file_reports_undecodable_lines(tmp_path):
+    path = tmp_path / "users.csv"
+    path.write_bytes(b"user_id,password\nana,Long3nough\nbob,Abc12\xff\n")
+    with pytest.raises(ValueError, match="line 3: not valid UTF-8"):
+        audit_file(str(path))
@@ -0,0 +1,40 @@
+import io
+
+import pytest
+
+from text_stream import graphemes, read_chunks, reverse_file, reverse_lines
+
+TEXT = ("x🇫🇷🇩🇪 café\r\nnaïve 👩‍👩‍👧 é!\n"
+        "🇯🇵🇺🇸🇬🇧 flags same line\n"
+        "Ελληνικά σ\n") * 3
+
+
+@pytest.mark.parametrize("chunk_size", range(1, 40))
+def test_reverse_file_round_trips(tmp_path, chunk_size):
+    source, reversed_path = tmp_path / "in.txt", tmp_path / "out.txt"
+    source.write_bytes(TEXT.encode())
+    reverse_file(str(source), str(reversed_path), chunk_size)
+    result = reversed_path.read_bytes().decode()
+    assert result == "".join(reversed(graphemes(TEXT)))
+
+    again = tmp_path / "again.txt"
+    reverse_file(str(reversed_path), str(again), chunk_size)
+    assert again.read_bytes().decode() == TEXT
+
+
+@pytest.mark.parametrize("chunk_size", [4, 5, 13])
+def test_flags_stay_paired_across_blocks(tmp_path, chunk_size):
+    source, target = tmp_path / "in.txt", tmp_path / "out.txt"
+    source.write_text("x🇫🇷🇩🇪", encoding="utf-8")
+    reverse_file(str(source), str(target), chunk_size)
+    assert target.read_text(encoding="utf-8") == "🇩🇪🇫🇷x"
+
+
+def test_reverse_lines_breaks_only_at_newlines():
+    assert reverse_lines("ab cd\r\nef\x85gh\u2028ij\n") == "dc ba\r\nji\u2028hg\x85fe\n"
+
+
+def test_read_chunks_cut_after_newlines():
+    chunks = list(read_chunks(io.StringIO(TEXT), chunk_size=7))
+    assert "".join(chunks) == TEXT
+    assert all(chunk.endswith("\n") for chunk in chunks)